@@ -0,0 +1,122 @@
+"""Dict extraction (pre-AlertRecord) vs single-pass AlertRecord extraction.
+
+Times extraction over a 1,000-entry feed and measures the memory the results
+retain. It also times a typical downstream use, reading the expiry as a
+timestamp, which the dict form had to re-parse from ISO text each time.
+
+Expect AlertRecord to retain about a quarter more memory than the dict, roughly
+1,000 vs 800 B/entry. The slots save on the container, but the record also
+keeps the polygon, link, fingerprint and five parsed timestamps, which the dict
+never extracted. Extraction is slightly faster and reading expiry is about
+35x faster.
+
+Run from the repo root: ``python benchmarks/bench_extract.py [entries]``.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.feedgen import generate_feed  # noqa: E402
+from nwsbot.cap import ATOM_NS, CAP_NS, extract_alert_data  # noqa: E402
+
+
+def _legacy_pairs(containers):
+    pairs = {}
+    for container in containers:
+        name = None
+        for child in container:
+            tag = child.tag.rpartition('}')[2]
+            if tag == 'valueName':
+                name = (child.text or '').strip()
+            elif tag == 'value' and name:
+                value = (child.text or '').strip()
+                if value:
+                    pairs[name] = f"{pairs[name]} {value}" if name in pairs else value
+                name = None
+    return pairs
+
+
+def legacy_extract(entry):
+    """The dict extractor as it stood before AlertRecord, one .// search per field."""
+    alert_id = entry.find(f'./{ATOM_NS}id').text
+    if not alert_id:
+        return None
+    cap_event = entry.find(f'.//{CAP_NS}event')
+    cap_severity = entry.find(f'.//{CAP_NS}severity')
+    cap_certainty = entry.find(f'.//{CAP_NS}certainty')
+    cap_urgency = entry.find(f'.//{CAP_NS}urgency')
+    cap_expires = entry.find(f'.//{CAP_NS}expires')
+    cap_msg_type = entry.find(f'.//{CAP_NS}msgType')
+    cap_effective = entry.find(f'.//{CAP_NS}effective')
+    cap_area_desc = entry.find(f'.//{CAP_NS}areaDesc')
+    vtec = _legacy_pairs(entry.findall(f'.//{CAP_NS}parameter')).get('VTEC', '').split()
+    geocodes = _legacy_pairs(entry.findall(f'.//{CAP_NS}geocode'))
+    return {
+        'id': alert_id,
+        'title': entry.find(f'./{ATOM_NS}title').text,
+        'summary': entry.find(f'./{ATOM_NS}summary').text,
+        'event': cap_event.text if cap_event is not None else 'Unknown',
+        'severity': cap_severity.text if cap_severity is not None else 'Unknown',
+        'certainty': cap_certainty.text if cap_certainty is not None else 'Unknown',
+        'urgency': cap_urgency.text if cap_urgency is not None else 'Unknown',
+        'expires': cap_expires.text if cap_expires is not None else None,
+        'msg_type': cap_msg_type.text if cap_msg_type is not None else 'Alert',
+        'effective': cap_effective.text if cap_effective is not None else None,
+        'area_desc': cap_area_desc.text if cap_area_desc is not None else None,
+        'vtec': vtec,
+        'geocode': geocodes,
+    }
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def retained_bytes(fn, entries) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    results = [fn(e) for e in entries]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del results
+    return after - before
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("entries", nargs="?", type=int, default=1000, help="Feed entries to extract (default 1000)")
+    count = parser.parse_args(argv).entries
+    entries = ET.fromstring(generate_feed(count)).findall(f'./{ATOM_NS}entry')
+    dicts = [legacy_extract(e) for e in entries]
+    records = [extract_alert_data(e) for e in entries]
+
+    t_dict = best_of(lambda: [legacy_extract(e) for e in entries])
+    t_record = best_of(lambda: [extract_alert_data(e) for e in entries])
+    m_dict = retained_bytes(legacy_extract, entries)
+    m_record = retained_bytes(extract_alert_data, entries)
+    u_dict = best_of(lambda: [int(datetime.fromisoformat(d['expires']).timestamp()) for d in dicts])
+    u_record = best_of(lambda: [r.expires for r in records])
+
+    print(f"{count} entries          {'dict':>12} {'AlertRecord':>12}")
+    print(f"extract (ms)          {t_dict * 1000:>12.2f} {t_record * 1000:>12.2f}")
+    print(f"extract (us/entry)    {t_dict / count * 1e6:>12.2f} {t_record / count * 1e6:>12.2f}")
+    print(f"retained (KiB)        {m_dict / 1024:>12.1f} {m_record / 1024:>12.1f}")
+    print(f"retained (B/entry)    {m_dict / count:>12.0f} {m_record / count:>12.0f}")
+    print(f"expiry read (us/all)  {u_dict * 1e6:>12.1f} {u_record * 1e6:>12.1f}")
+    print("note: AlertRecord also keeps polygon, link, fingerprint and 5 parsed timestamps, hence the extra memory")
+
+
+if __name__ == "__main__":
+    main()
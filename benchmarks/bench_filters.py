@@ -0,0 +1,58 @@
+"""Per-alert filter cost at feed scale.
+
+Compares the old inline severity/certainty/urgency/blocklist checks with a
+compiled FilterSet, both with the plain legacy config and with a handful of
+rules. Run from the repo root: ``python benchmarks/bench_filters.py``.
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.feedgen import generate_feed  # noqa: E402
+from nwsbot.cap import parse_feed  # noqa: E402
+from nwsbot.filters import CERTAINTY_LEVELS, SEVERITY_LEVELS, URGENCY_LEVELS, FilterConfig  # noqa: E402
+
+BLOCKED = ["Test Message", "Administrative Message", "Special Weather Statement"]
+RULES = ['block event="*Statement"', 'allow "event=/^tornado (warning|emergency)$/"',
+         'allow severity=Extreme areas=TXC113,TXZ119,OKC109', 'block type=Cancel severity=Minor',
+         'block hours=03-05 urgency=Future']
+
+
+def legacy_allows(alert_data, blocked, min_sev, min_cert, min_urg):
+    """The pre-compiled check as it was written inline in the bot, over string fields."""
+    event_lower = alert_data.event.lower()
+    return not (event_lower in blocked or
+                SEVERITY_LEVELS.get(alert_data.severity, 0) < SEVERITY_LEVELS.get(min_sev, 0) or
+                CERTAINTY_LEVELS.get(alert_data.certainty, 0) < CERTAINTY_LEVELS.get(min_cert, 0) or
+                URGENCY_LEVELS.get(alert_data.urgency, 0) < URGENCY_LEVELS.get(min_urg, 0))
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    blocked = {e.lower() for e in BLOCKED}
+    plain = FilterConfig("Moderate", "Likely", "Expected", BLOCKED).compile()
+    ruled = FilterConfig("Moderate", "Likely", "Expected", BLOCKED, RULES).compile()
+    now = datetime.now(timezone.utc)
+    print(f"{'alerts':>7} {'legacy ns/alert':>16} {'compiled ns/alert':>18} {'5 rules ns/alert':>17}")
+    for count in (100, 1000, 10000):
+        alerts = parse_feed(generate_feed(count))
+        legacy = best_of(lambda: [legacy_allows(a, blocked, "Moderate", "Likely", "Expected") for a in alerts])
+        compiled = best_of(lambda: [plain.allows(a, now) for a in alerts])
+        rules = best_of(lambda: [ruled.allows(a, now) for a in alerts])
+        print(f"{count:>7} {legacy / count * 1e9:>16.0f} {compiled / count * 1e9:>18.0f} {rules / count * 1e9:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
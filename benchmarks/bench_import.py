@@ -0,0 +1,56 @@
+"""Import cost of the nwsbot modules, each measured in a fresh interpreter.
+
+Benchmarks and process-pool workers import ``nwsbot.cap``/``nwsbot.filters``
+directly, so these should stay cheap and must not pull in discord, aiohttp or
+the config. For each module this prints the cumulative import time reported by
+``python -X importtime`` (median of several runs) and which heavy modules it
+loaded. ``nwsbot.bot`` is only measured when discord.py is installed.
+
+Run from the repo root: ``python benchmarks/bench_import.py``.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ("nwsbot", "nwsbot.settings", "nwsbot.filters", "nwsbot.cap", "nwsbot.pipeline", "nwsbot.state",
+           "nwsbot.snapshot", "nwsbot.lease", "nwsbot.bot")
+HEAVY = ("discord", "aiohttp", "xml.etree.ElementTree", "sqlite3", "requests")
+RUNS = 5
+
+
+def import_once(module: str):
+    """Returns (cumulative µs, heavy modules loaded) for one cold import of `module`."""
+    code = (f"import {module}, sys; "
+            f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1]
+    cumulative = 0
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1])
+    return cumulative, proc.stdout.strip()
+
+
+def main():
+    print(f"{'module':<18} {'import ms':>10}  heavy modules loaded")
+    for module in MODULES:
+        samples = []
+        loaded = ""
+        for _ in range(RUNS):
+            cumulative, loaded = import_once(module)
+            if cumulative is None:
+                break
+            samples.append(cumulative)
+        if not samples:
+            print(f"{module:<18} {'n/a':>10}  ({loaded})")
+            continue
+        print(f"{module:<18} {statistics.median(samples) / 1000:>10.1f}  {loaded or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Inline vs process-pool feed parsing: where is the crossover?
+
+For each feed size this prints the inline parse+match time (all of it blocks
+the event loop), the pool's wall time, and the worst event-loop stall seen
+while the pool worked (pickling the feed and unpickling the results). Offloading
+makes sense once the inline stall is well above the pool stall, while the pool
+wall time is still acceptable; PROCESS_POOL_MIN_BYTES should sit near that size.
+
+Run from the repo root: ``python benchmarks/bench_parse_pool.py``.
+"""
+
+import asyncio
+import functools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.feedgen import generate_feed  # noqa: E402
+from nwsbot.cap import parse_and_match  # noqa: E402
+
+SIZES = (10, 50, 100, 250, 500, 1000, 2500, 5000)
+WATCHED = frozenset(f"{st}{kind}{n:03d}" for st in ("TX", "OK") for kind in "CZ" for n in range(1, 60))
+
+
+async def max_loop_stall(awaitable) -> tuple:
+    """Runs an awaitable while a 1ms ticker records the longest gap between ticks."""
+    worst = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal worst
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            worst = max(worst, now - last - 0.001)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await awaitable
+    elapsed = time.perf_counter() - start
+    done = True
+    await task
+    return elapsed, worst
+
+
+async def main():
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        await loop.run_in_executor(pool, parse_and_match, generate_feed(1), None, WATCHED)  # warm workers
+        print(f"{'entries':>7} {'bytes':>10} {'inline ms':>10} {'pool ms':>9} {'pool stall ms':>14}")
+        for size in SIZES:
+            feed = generate_feed(size, polygon_points=40)
+            start = time.perf_counter()
+            parse_and_match(feed, None, WATCHED)
+            inline = time.perf_counter() - start
+            job = functools.partial(parse_and_match, feed, None, WATCHED)
+            pool_time, stall = await max_loop_stall(loop.run_in_executor(pool, job))
+            print(f"{size:>7} {len(feed):>10} {inline * 1000:>10.1f} {pool_time * 1000:>9.1f} {stall * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""Hot-path benchmark suite with a machine-readable baseline.
+
+Runs each step an alert goes through against synthetic feeds (benchmarks/feedgen.py):
+
+* ``extract``: ``extract_alert_data`` over already-parsed entries
+* ``parse``: ``parse_feed``, i.e. ``ET.fromstring`` plus extraction
+* ``dedup``: posted-id cache lookups with half the ids already posted, plus the fingerprint check on misses
+* ``filter``: a compiled FilterSet with the legacy minimums, a blocklist and five rules
+* ``match``: intersecting each alert's geocodes with ~240 subscribed codes
+* ``render``: ``build_alert_embed``, skipped when discord.py isn't installed
+
+The best of ``--repeat`` runs is kept per step and size, and the results are
+written as JSON. ``--compare`` takes an earlier file and reports each step's
+ratio. It exits 1 if any step is slower than ``--threshold`` times its
+baseline, so CI can gate on it.
+
+Run from the repo root::
+
+    python benchmarks/bench_suite.py --output baseline.json
+    python benchmarks/bench_suite.py --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.feedgen import generate_feed  # noqa: E402
+from nwsbot.cap import ATOM_NS, extract_alert_data, parse_feed  # noqa: E402
+from nwsbot.filters import FilterConfig  # noqa: E402
+from nwsbot.settings import SCRIPT_VERSION  # noqa: E402
+from nwsbot.state import PostedIdCache  # noqa: E402
+
+SIZES = (10, 100, 1000, 10000)
+BLOCKED = ["Test Message", "Administrative Message", "Special Weather Statement"]
+RULES = ['block event="*Statement"', 'allow "event=/^tornado (warning|emergency)$/"',
+         'allow severity=Extreme areas=TXC113,TXZ119,OKC109', 'block type=Cancel severity=Minor',
+         'block hours=03-05 urgency=Future']
+WATCHED = frozenset(f"{st}{kind}{n:03d}" for st in ("TX", "OK") for kind in "CZ" for n in range(1, 61))
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load_renderer():
+    try:
+        from nwsbot.bot import build_alert_embed
+    except ImportError as e:
+        print(f"render: skipped ({e})", file=sys.stderr)
+        return None
+    return build_alert_embed
+
+
+def run_suite(sizes, repeat: int, feed_options: dict):
+    render = load_renderer()
+    now = datetime.now(timezone.utc)
+    filters = FilterConfig("Moderate", "Likely", "Expected", BLOCKED, RULES).compile()
+    results = []
+    for size in sizes:
+        feed = generate_feed(size, **feed_options)
+        entries = ET.fromstring(feed).findall(f"./{ATOM_NS}entry")
+        alerts = parse_feed(feed)
+        posted = PostedIdCache()
+        posted.replace((a.id, "") for a in alerts[::2])
+        fingerprints = {a.fingerprint for a in alerts[::4]}
+
+        def dedup():
+            return [a.id in posted or a.fingerprint in fingerprints for a in alerts]
+
+        steps = {
+            "extract": lambda: [extract_alert_data(e) for e in entries],
+            "parse": lambda: parse_feed(feed),
+            "dedup": dedup,
+            "filter": lambda: [filters.allows(a, now) for a in alerts],
+            "match": lambda: [tuple(code for code in a.geocodes if code in WATCHED) for a in alerts],
+        }
+        if render:
+            steps["render"] = lambda: [render(a) for a in alerts]
+        for name, fn in steps.items():
+            seconds = best_of(fn, repeat)
+            results.append({"step": name, "entries": size, "seconds": seconds,
+                            "us_per_entry": seconds / size * 1e6, "feed_bytes": len(feed)})
+            print(f"{name:<8} {size:>6} entries {seconds * 1000:>10.3f} ms {seconds / size * 1e6:>9.2f} us/entry")
+    return results
+
+
+def compare(results, baseline_path: str, threshold: float) -> bool:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["step"], r["entries"]): r["seconds"] for r in baseline.get("results", [])}
+    print(f"\nvs {baseline_path} (v{baseline.get('version')}, {baseline.get('created')}):")
+    regressed = False
+    for r in results:
+        before = old.get((r["step"], r["entries"]))
+        if not before:
+            continue
+        ratio = r["seconds"] / before
+        flag = "  REGRESSION" if ratio > threshold else ""
+        regressed |= bool(flag)
+        print(f"{r['step']:<8} {r['entries']:>6} {ratio:>6.2f}x{flag}")
+    return not regressed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=lambda v: tuple(int(x) for x in v.split(",")), default=SIZES,
+                        help="Comma-separated entry counts (default 10,100,1000,10000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=38)
+    parser.add_argument("--polygon-points", type=int, default=8)
+    parser.add_argument("--geocodes", type=int, default=6)
+    parser.add_argument("--update-ratio", type=float, default=0.2)
+    parser.add_argument("--cancel-ratio", type=float, default=0.05)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+    feed_options = {"seed": args.seed, "polygon_points": args.polygon_points, "geocodes": args.geocodes,
+                    "update_ratio": args.update_ratio, "cancel_ratio": args.cancel_ratio}
+    results = run_suite(args.sizes, args.repeat, feed_options)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"version": SCRIPT_VERSION, "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "platform": platform.platform(),
+                       "feed": feed_options, "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"Wrote {args.output}")
+    if args.compare:
+        return 0 if compare(results, args.compare, args.threshold) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
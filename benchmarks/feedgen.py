@@ -0,0 +1,106 @@
+"""Deterministic synthetic NWS Atom/CAP feeds for benchmarks.
+
+The same arguments always produce the same document, so timings from
+different versions of the bot can be compared. ``update_ratio`` and
+``cancel_ratio`` turn that share of entries into msgType Update (VTEC CON/EXT)
+or Cancel (VTEC CAN) messages for an earlier entry's event. These messages
+draw from their own random stream, so the default feed is unchanged.
+
+``python benchmarks/feedgen.py 500 --polygon-points 40 > feed.xml`` writes a feed to disk.
+"""
+
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape
+
+EVENTS = [("Tornado Warning", "TO", "W", "Extreme", "Observed", "Immediate"),
+          ("Severe Thunderstorm Warning", "SV", "W", "Severe", "Observed", "Immediate"),
+          ("Flash Flood Warning", "FF", "W", "Severe", "Likely", "Immediate"),
+          ("Winter Storm Warning", "WS", "W", "Moderate", "Likely", "Expected"),
+          ("Heat Advisory", "HT", "Y", "Minor", "Likely", "Expected"),
+          ("Flood Watch", "FA", "A", "Moderate", "Possible", "Future"),
+          ("Wind Advisory", "WI", "Y", "Minor", "Likely", "Expected"),
+          ("Special Weather Statement", None, None, "Moderate", "Observed", "Expected")]
+STATES = ["TX", "OK", "KS", "NE", "MO", "AR", "LA", "IA", "IL", "CO"]
+OFFICES = ["KOUN", "KFWD", "KTSA", "KICT", "KOAX", "KSGF", "KLZK", "KSHV", "KDMX", "KBOU"]
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+
+
+def generate_feed(entries: int, seed: int = 38, polygon_points: int = 8, geocodes: int = 6,
+                  update_ratio: float = 0.0, cancel_ratio: float = 0.0) -> str:
+    """Returns an Atom document with ``entries`` CAP entries in the NWS layout."""
+    if not 0 <= update_ratio + cancel_ratio <= 1:
+        raise ValueError("update_ratio + cancel_ratio must be between 0 and 1")
+    rng = random.Random(seed)
+    kind_rng = random.Random(seed * 7919 + 1)
+    events = []  # (event tuple, office, etn, sent, expires) of NEW entries, for updates and cancels to refer to
+    base = datetime(2025, 5, 1, 18, 0, tzinfo=timezone.utc)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:cap="urn:oasis:names:tc:emergency:cap:1.2">',
+             f'<id>https://alerts.weather.gov/cap/us.atom</id><title>Synthetic feed</title><updated>{_iso(base)}</updated>']
+    for i in range(entries):
+        event, phen, sig, sev, cert, urg = rng.choice(EVENTS)
+        state = rng.choice(STATES)
+        office = rng.choice(OFFICES)
+        sent = base + timedelta(minutes=rng.randint(0, 600))
+        expires = sent + timedelta(minutes=rng.choice([30, 45, 60, 180, 720]))
+        ugc = " ".join(f"{state}{rng.choice('CZ')}{rng.randint(1, 250):03d}" for _ in range(geocodes))
+        fips = " ".join(f"0{rng.randint(10, 56)}{rng.randint(1, 250):03d}" for _ in range(geocodes))
+        lat, lon = rng.uniform(30, 42), rng.uniform(-104, -90)
+        polygon = " ".join(f"{lat + rng.uniform(-0.5, 0.5):.2f},{lon + rng.uniform(-0.5, 0.5):.2f}"
+                           for _ in range(polygon_points))
+        etn = rng.randint(1, 300) if phen else 0
+        msg_type, action, verb = "Alert", "NEW", "issued"
+        roll = kind_rng.random() if events else 1.0
+        if roll < update_ratio + cancel_ratio:
+            (event, phen, sig, sev, cert, urg), office, etn, sent, expires = kind_rng.choice(events)
+            if roll < update_ratio:
+                msg_type, action, verb = "Update", kind_rng.choice(("CON", "EXT")), "continued"
+                if action == "EXT":
+                    expires += timedelta(minutes=30)
+            else:
+                msg_type, action, verb = "Cancel", "CAN", "cancelled"
+            sent += timedelta(minutes=kind_rng.randint(5, 25))
+        elif phen:
+            events.append(((event, phen, sig, sev, cert, urg), office, etn, sent, expires))
+        vtec = (f"/O.{action}.{office}.{phen}.{sig}.{etn:04d}.{sent:%y%m%dT%H%MZ}-{expires:%y%m%dT%H%MZ}/"
+                if phen else "")
+        title = f"{event} {verb} {sent:%B %d at %I:%M%p} UTC until {expires:%B %d at %I:%M%p} UTC by NWS {office[1:]}"
+        parts.append(
+            f'<entry><id>urn:oid:2.49.0.1.840.0.{seed}.{i:06d}</id><updated>{_iso(sent)}</updated>'
+            f'<published>{_iso(sent)}</published><author><name>w-nws.webmaster@noaa.gov</name></author>'
+            f'<title>{escape(title)}</title><link href="https://api.weather.gov/alerts/{seed}.{i}"/>'
+            f'<summary>{escape(("...HAZARD... " + event.upper() + " IN EFFECT. ") * 6)}</summary>'
+            f'<cap:event>{event}</cap:event><cap:sent>{_iso(sent)}</cap:sent><cap:effective>{_iso(sent)}</cap:effective>'
+            f'<cap:onset>{_iso(sent)}</cap:onset><cap:expires>{_iso(expires)}</cap:expires>'
+            f'<cap:status>Actual</cap:status><cap:msgType>{msg_type}</cap:msgType><cap:category>Met</cap:category>'
+            f'<cap:urgency>{urg}</cap:urgency><cap:severity>{sev}</cap:severity><cap:certainty>{cert}</cap:certainty>'
+            f'<cap:areaDesc>{state} county {i % 97}; {state} county {i % 89}</cap:areaDesc>'
+            f'<cap:polygon>{polygon}</cap:polygon>'
+            f'<cap:geocode><valueName>FIPS6</valueName><value>{fips}</value>'
+            f'<valueName>UGC</valueName><value>{ugc}</value></cap:geocode>'
+            f'<cap:parameter><valueName>VTEC</valueName><value>{vtec}</value></cap:parameter></entry>')
+    parts.append("</feed>")
+    return "\n".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Writes a deterministic synthetic NWS Atom/CAP feed to stdout.")
+    parser.add_argument("entries", type=int)
+    parser.add_argument("--seed", type=int, default=38)
+    parser.add_argument("--polygon-points", type=int, default=8)
+    parser.add_argument("--geocodes", type=int, default=6)
+    parser.add_argument("--update-ratio", type=float, default=0.0)
+    parser.add_argument("--cancel-ratio", type=float, default=0.0)
+    args = parser.parse_args(argv)
+    sys.stdout.write(generate_feed(args.entries, args.seed, args.polygon_points, args.geocodes,
+                                   args.update_ratio, args.cancel_ratio))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""Support modules for the NWS Discord alert bot.
+
+No module here reads the config, opens files or touches the database at import
+time. Only ``nwsbot.bot``, the Discord application, imports discord, so the
+other modules can be used directly from benchmarks and worker processes. Run
+the bot with ``python -m nwsbot`` or the ``nwsbot`` console script.
+"""
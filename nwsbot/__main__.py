@@ -0,0 +1,7 @@
+"""``python -m nwsbot``: run the bot."""
+
+import sys
+
+from nwsbot.bot import main
+
+sys.exit(main())
@@ -0,0 +1,230 @@
+"""Read-only local HTTP API over the active-alert snapshot.
+
+Other services can read the bot's parsed feed instead of polling NWS
+themselves. Every response is built from the in-memory ``FeedSnapshot``, and
+SQLite is never touched:
+
+* ``GET /alerts``: active alerts as JSON. Filters are ``code`` (UGC or FIPS6),
+  ``state`` (UGC state prefix), ``event`` (exact name, case-insensitive) and
+  ``severity`` (minimum level). Each filter takes comma-separated values.
+  ``code`` and ``state`` use the snapshot's geocode index, so no scan is needed.
+  Bodies get a strong ETag and are gzipped when the client accepts it. The
+  encoded body is cached per snapshot version and query. With
+  ``If-None-Match`` and ``wait=<seconds>`` (at most 300), the request becomes
+  a long poll. It is answered as soon as a newer snapshot changes the result,
+  or with 304 when the wait runs out.
+* ``GET /alerts/stream``: Server-Sent Events. Each new snapshot sends an
+  ``alerts`` event with the matching alerts it added. A comment is sent every
+  15 s to keep the connection alive.
+* ``GET /health``: snapshot version and age.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from nwsbot.cap import AlertRecord, format_cap_time
+from nwsbot.filters import SEVERITY_LEVELS
+from nwsbot.state import FeedSnapshot
+
+MAX_WAIT_SECONDS = 300
+HEARTBEAT_SECONDS = 15
+GZIP_MIN_BYTES = 1024
+
+
+def record_json(record: AlertRecord) -> Dict[str, Any]:
+    return {"id": record.id, "event": record.event, "headline": record.title, "summary": record.summary,
+            "severity": record.severity, "certainty": record.certainty, "urgency": record.urgency,
+            "msg_type": record.msg_type, "status": record.status, "sent": format_cap_time(record.sent),
+            "effective": format_cap_time(record.effective), "onset": format_cap_time(record.onset),
+            "expires": format_cap_time(record.expires), "area_desc": record.area_desc, "ugc": list(record.ugc),
+            "fips6": list(record.fips6), "vtec": list(record.vtec), "polygon": record.polygon, "link": record.link}
+
+
+def _values(raw: Optional[str], upper: bool = True) -> FrozenSet[str]:
+    if not raw:
+        return frozenset()
+    return frozenset(v.strip().upper() if upper else v.strip().lower() for v in raw.split(",") if v.strip())
+
+
+class AlertQuery:
+    """Normalised filters from a query string; equal filters give equal keys, whatever their order."""
+    __slots__ = ("codes", "states", "events", "min_severity", "key")
+
+    def __init__(self, params: Dict[str, str]):
+        self.codes = _values(params.get("code"))
+        self.states = _values(params.get("state"))
+        self.events = _values(params.get("event"), upper=False)
+        severity = (params.get("severity") or "").strip().capitalize()
+        if severity and severity not in SEVERITY_LEVELS:
+            raise ValueError(f"Unknown severity '{severity}'")
+        self.min_severity = SEVERITY_LEVELS.get(severity, 0)
+        self.key = (self.codes, self.states, self.events, self.min_severity)
+
+    def select(self, snapshot: FeedSnapshot, now: float) -> List[AlertRecord]:
+        if self.codes or self.states:
+            candidates: Dict[str, AlertRecord] = {}
+            for index, keys in ((snapshot.by_code, self.codes), (snapshot.by_state, self.states)):
+                for key in keys:
+                    for record in index.get(key, ()):
+                        candidates[record.id] = record
+            records: Iterable[AlertRecord] = candidates.values()
+        else:
+            records = snapshot.records
+        return [record for record in records
+                if not record.is_expired(now) and record.severity_level >= self.min_severity
+                and (not self.events or record.event.lower() in self.events)]
+
+
+class EncodedBody:
+    __slots__ = ("etag", "body", "gzipped", "valid_until", "ids")
+
+    def __init__(self, body: bytes, ids: Tuple[str, ...], valid_until: float):
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        self.body = body
+        self.gzipped = gzip.compress(body, 6) if len(body) >= GZIP_MIN_BYTES else None
+        self.ids = ids
+        self.valid_until = valid_until  # The earliest expiry among the alerts, after which the list changes
+
+
+class AlertApi:
+    """aiohttp app serving a FeedSnapshot; ``publish()`` is called with each new snapshot."""
+
+    def __init__(self, snapshot: FeedSnapshot, cache_size: int = 128):
+        self.snapshot = snapshot
+        self._changed = asyncio.Event()
+        self._cache: "OrderedDict[Tuple, EncodedBody]" = OrderedDict()
+        self._cache_size = cache_size
+        self._runner = None
+        self.requests = 0
+        self.streams = 0
+
+    def publish(self, snapshot: FeedSnapshot):
+        """Swaps in a new snapshot and wakes every long poll and stream."""
+        self.snapshot = snapshot
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_newer(self, version: int, timeout: float) -> bool:
+        """Waits until the snapshot is newer than `version`; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self.snapshot.version <= version:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def encoded(self, query: AlertQuery, snapshot: FeedSnapshot, now: float) -> EncodedBody:
+        key = (snapshot.version, query.key)
+        cached = self._cache.get(key)
+        if cached is not None and now < cached.valid_until:
+            self._cache.move_to_end(key)
+            return cached
+        records = sorted(query.select(snapshot, now), key=lambda r: (-r.severity_level, r.expires or 0, r.id))
+        payload = {"version": snapshot.version, "fetched_at": format_cap_time(int(snapshot.fetched_at)),
+                   "count": len(records), "alerts": [record_json(record) for record in records]}
+        body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        valid_until = min((r.expires for r in records if r.expires), default=float("inf"))
+        cached = self._cache[key] = EncodedBody(body, tuple(r.id for r in records), valid_until)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return cached
+
+    def _response(self, request, encoded: EncodedBody):
+        from aiohttp import web
+        headers = {"ETag": encoded.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if encoded.gzipped is not None and "gzip" in request.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            headers["ETag"] = encoded.etag[:-1] + '-gz"'  # Strong ETags differ per encoding
+            return web.Response(body=encoded.gzipped, content_type="application/json", headers=headers)
+        return web.Response(body=encoded.body, content_type="application/json", headers=headers)
+
+    @staticmethod
+    def _matches(request, encoded: EncodedBody) -> bool:
+        tags = {tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")}
+        return encoded.etag in tags or encoded.etag[:-1] + '-gz"' in tags
+
+    async def handle_alerts(self, request):
+        from aiohttp import web
+        self.requests += 1
+        try:
+            query = AlertQuery(dict(request.query))
+            wait = min(float(request.query.get("wait", 0)), MAX_WAIT_SECONDS)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        snapshot = self.snapshot
+        encoded = self.encoded(query, snapshot, time.time())
+        deadline = time.monotonic() + wait
+        while self._matches(request, encoded):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not await self.wait_newer(snapshot.version, remaining):
+                return web.Response(status=304, headers={"ETag": encoded.etag, "Vary": "Accept-Encoding"})
+            snapshot = self.snapshot
+            encoded = self.encoded(query, snapshot, time.time())
+        return self._response(request, encoded)
+
+    async def handle_stream(self, request):
+        from aiohttp import web
+        try:
+            query = AlertQuery(dict(request.query))
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        self.streams += 1
+        snapshot = self.snapshot
+        seen = {record.id for record in query.select(snapshot, time.time())}
+        try:
+            await response.write(f"retry: 5000\nevent: hello\ndata: {json.dumps({'version': snapshot.version})}\n\n"
+                                 .encode("utf-8"))
+            while True:
+                if not await self.wait_newer(snapshot.version, HEARTBEAT_SECONDS):
+                    await response.write(b": keep-alive\n\n")
+                    continue
+                snapshot = self.snapshot
+                current = query.select(snapshot, time.time())
+                added = [record for record in current if record.id not in seen]
+                seen = {record.id for record in current}
+                if added:
+                    data = json.dumps({"version": snapshot.version, "alerts": [record_json(r) for r in added]},
+                                      separators=(",", ":"), ensure_ascii=False)
+                    await response.write(f"id: {snapshot.version}\nevent: alerts\ndata: {data}\n\n".encode("utf-8"))
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self.streams -= 1
+        return response
+
+    async def handle_health(self, request):
+        from aiohttp import web
+        snapshot = self.snapshot
+        return web.json_response({"version": snapshot.version, "alerts": len(snapshot.records),
+                                  "age_seconds": round(snapshot.age_seconds, 1) if snapshot.version else None})
+
+    async def start(self, host: str, port: int):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/alerts", self.handle_alerts)
+        app.router.add_get("/alerts/stream", self.handle_stream)
+        app.router.add_get("/health", self.handle_health)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, host, port).start()
+        except OSError:
+            await self._runner.cleanup()
+            self._runner = None
+            raise
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
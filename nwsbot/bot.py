@@ -0,0 +1,3572 @@
+# -*- coding: utf-8 -*-
+# Weather Alert Bot v3.4.3 (Discord Only - Whitespace/Indent Cleaned)
+"""Discord bot application. Importing this module has no side effects: config, logging, the
+database, the leader lease and the Bot itself are all set up by ``main()``."""
+
+import os
+import logging
+import logging.handlers
+import time
+import argparse
+import dataclasses
+import shutil
+import tempfile
+from datetime import datetime, timezone, timedelta
+import discord
+from discord.ext import commands
+import asyncio
+import subprocess
+import sqlite3
+import sys
+import traceback
+from collections import OrderedDict, defaultdict
+import uuid  # For unique error IDs
+import functools
+import io
+import itertools  # For status rotation
+import aiohttp  # Already loaded by discord.py, so importing it here costs nothing extra
+
+# --- Fix type hints for Python 3.9+ compatibility ---
+from typing import TYPE_CHECKING, Optional, List, Tuple, Dict, Set, Any, FrozenSet
+
+from nwsbot.filters import (SEVERITY_LEVELS, CERTAINTY_LEVELS, URGENCY_LEVELS, DEFAULT_DESTINATION,
+                            FilterConfig, FilterRegistry, FilterRuleError)
+from nwsbot.vtec import VtecCode, next_state, parse_vtec
+from nwsbot.pipeline import Pipeline, Stage
+from nwsbot.cap import AlertRecord, format_cap_time, parse_and_match_timed, parse_cap_time
+from nwsbot.lease import AlwaysLeader, FileLockLease, LeaseBackend, SQLiteLease, make_holder_id
+from nwsbot.state import FeedSnapshot, PostedIdCache
+from nwsbot.snapshot import RuntimeSnapshot, SnapshotError, load_snapshot, save_snapshot
+from nwsbot.settings import SCRIPT_VERSION, LazySettings, Settings, SettingsError, load_settings
+import nwsbot.logconfig as logconfig
+from nwsbot.logconfig import configure_logging, stop_logging
+from nwsbot.latency import LatencyHistogram, LatencyTracker, format_duration
+from nwsbot.perf import PERF, SamplingProfiler
+from nwsbot.schedule import PollScheduler
+from nwsbot.enrich import CapDetail, CapEnricher, DetailCache
+from nwsbot.expiry import ExpiryEntry, ExpiryHeap
+from nwsbot.sources import FeedSource, build_sources, merge_records
+from nwsbot.resilience import OPEN, STATE_VALUES, CircuitBreaker, backoff_delays
+from nwsbot.replay import SystemClock
+from nwsbot.metrics import COUNT_BUCKETS, REGISTRY, SIZE_BUCKETS, Counter, Gauge, Histogram, timed
+
+if TYPE_CHECKING:  # Imported where they are used; most runs never start them
+    from concurrent.futures import ProcessPoolExecutor
+    from nwsbot.api import AlertApi
+    from nwsbot.webhooks import WebhookPool
+
+SCRIPT_START = time.monotonic()  # For time-to-first-post
+
+# --- Constants & Settings ---
+# Everything configurable lives on `settings`, loaded from config.json/environment by main()
+# (or lazily on first access when this module is driven some other way).
+settings = LazySettings()
+DISCORD_MAX_LENGTH = 4096
+MAX_LOOKUP_CODES = 10;
+MAX_LOOKUP_RESULTS = 25
+FILTER_STATE_KEY = "filter_config"
+LAST_CYCLE_STATE_KEY = "last_successful_cycle"  # ISO time of the last live cycle whose fetch succeeded
+
+# --- Runtime Globals (set up by main) ---
+bot: Optional[commands.Bot] = None
+discord_channel_obj = None;
+discord_error_channel_obj = None;
+discord_changelog_channel_obj = None
+filter_registry: Optional[FilterRegistry] = None
+DEFAULT_FILTER_CONFIG: Optional[FilterConfig] = None
+INSTANCE_ID = ""
+clock = SystemClock()  # Pipeline timestamps and send pacing; a WarpClock in offline replay
+
+# --- Metrics ---
+# Always collected (each update is a few additions); served as Prometheus text when metrics.enabled is set.
+FEED_FETCH_SECONDS = Histogram("nwsbot_feed_fetch_seconds", "Feed request latency, including the body download.")
+FEED_FETCHES = Counter("nwsbot_feed_fetches_total",
+                       "Feed requests by outcome (200, 304, http_error, error, breaker_open).", ["status"])
+FEED_RETRIES = Counter("nwsbot_feed_retries_total", "Feed requests retried after a transient failure.")
+FEED_BREAKER_STATE = Gauge("nwsbot_feed_breaker_state", "Feed circuit breaker state (0 closed, 1 half-open, 2 open).")
+FEED_BYTES = Counter("nwsbot_feed_bytes_total", "Feed bytes downloaded.")
+FEED_SIZE_BYTES = Histogram("nwsbot_feed_size_bytes", "Size of each downloaded feed.", buckets=SIZE_BUCKETS)
+FEED_NOT_MODIFIED_RATIO = Gauge("nwsbot_feed_not_modified_ratio", "Share of feed requests answered 304 Not Modified.")
+FEED_PARSE_SECONDS = Histogram("nwsbot_feed_parse_seconds", "Feed parse and geocode match time.", ["mode"])
+CYCLE_ENTRIES = Histogram("nwsbot_cycle_entries", "Feed entries parsed per cycle.", buckets=COUNT_BUCKETS)
+DEDUP_HITS = Counter("nwsbot_dedup_hits_total", "Alerts skipped as already posted, by where that was found.", ["source"])
+QUEUE_DEPTH = Gauge("nwsbot_queue_depth", "Items waiting in each pipeline stage's queue.", ["stage"])
+DISCORD_SEND_SECONDS = Histogram("nwsbot_discord_send_seconds", "Discord alert message send latency.")
+ALERTS_POSTED = Counter("nwsbot_alerts_posted_total", "Alerts posted to Discord.")
+ALERTS_EXPIRED = Counter("nwsbot_alerts_expired_total", "Posted alert messages edited to Expired.")
+EXPIRY_PENDING = Gauge("nwsbot_expiry_pending", "Posted alerts waiting in the expiry heap.")
+ALERT_SENDS = Counter("nwsbot_alert_sends_total", "Alert posts by route (webhook or bot token).", ["route"])
+WEBHOOK_POOL_SIZE = Gauge("nwsbot_webhook_pool_size", "Webhooks in the alert output pool.")
+CATCHUP_ALERTS = Counter("nwsbot_catchup_alerts_total",
+                         "Missed alerts in a downtime catch-up cycle by outcome (posted, digest, expired, dropped).",
+                         ["outcome"])
+API_STREAMS = Gauge("nwsbot_api_streams", "Open Server-Sent Events streams on the local alert API.")
+ALERTS_ENRICHED = Counter("nwsbot_alerts_enriched_total", "Posted alerts edited to add their CAP details.")
+CAP_DETAIL_LOOKUPS = Counter("nwsbot_cap_detail_lookups_total",
+                             "CAP detail lookups by outcome (memory, disk, fetched, error).", ["outcome"])
+RATE_LIMIT_HITS = Counter("nwsbot_discord_rate_limits_total", "Discord 429 responses reported by discord.py.")
+RATE_LIMIT_WAIT_SECONDS = Counter("nwsbot_discord_rate_limit_wait_seconds_total",
+                                  "Seconds discord.py was told to wait by 429 responses.")
+DB_QUERY_SECONDS = Histogram("nwsbot_db_query_seconds", "SQLite call time by operation.", ["op"])
+LOOP_LAG_SECONDS = Histogram("nwsbot_event_loop_lag_seconds", "How late the event loop ran a 0.5s timer.")
+POLL_INTERVAL_SECONDS = Gauge("nwsbot_poll_interval_seconds", "Current feed poll interval chosen by the scheduler.")
+LOG_RECORDS_DROPPED = Gauge("nwsbot_log_records_dropped", "Log records dropped because the logging queue was full.")
+ALERT_LATENCY_SECONDS = Histogram("nwsbot_alert_latency_seconds", "CAP sent time to Discord ack, by severity.",
+                                  ["severity"], buckets=(30, 60, 120, 180, 300, 600, 900, 1800, 3600, 7200))
+
+# Rolling 15-minute timers behind !perf, listed in pipeline order
+PERF_TIMERS = ("fetch", "parse", "xml_parse", "extract", "geocode_match", "dedup", "sqlite", "filter", "subscribers",
+               "render", "send", "discord_429_wait", "enrich")
+for _name in PERF_TIMERS:
+    PERF.histogram(_name)
+profile_running = False
+
+
+def db_timed(op: str):
+    """Times a SQLite helper per operation (Prometheus) and in aggregate (!perf)."""
+    def decorator(function):
+        return PERF.timed("sqlite")(timed(DB_QUERY_SECONDS.labels(op))(function))
+    return decorator
+
+
+# --- Logging Setup: Queued, Rotating ---
+def setup_logging(log_dir: str) -> str:
+    """Routes logging through a background thread to the rotating log file and stdout; returns the file path."""
+    return configure_logging(log_dir, level=settings.log_level, json_mode=settings.log_json,
+                             max_bytes=settings.log_max_bytes, backup_count=settings.log_backup_count,
+                             rotate_hours=settings.log_rotate_hours, retention_days=settings.log_retention_days)
+
+
+def configure_filters():
+    """Seeds the default destination's filters from config.json.
+
+    Changes made with !filter are persisted to bot_state and replace these in load_filter_registry().
+    """
+    global DEFAULT_FILTER_CONFIG, filter_registry
+    DEFAULT_FILTER_CONFIG = FilterConfig.from_dict(
+        {"blocked_event_types": ["Test Message", "Administrative Message"], **settings.filtering})
+    try:
+        filter_registry = FilterRegistry(DEFAULT_FILTER_CONFIG)
+    except FilterRuleError as e:
+        logging.error(f"Invalid filter rules in config: {e}. Ignoring config rules.")
+        DEFAULT_FILTER_CONFIG.rules = []
+        filter_registry = FilterRegistry(DEFAULT_FILTER_CONFIG)
+
+
+def log_startup_summary(log_file_path: str):
+    logging.info(f"--- Script Started (v{SCRIPT_VERSION}) ---")
+    logging.info(f"Logging configured to file: {log_file_path}")
+    logging.info(f"Config loaded from {settings.config_path}")
+    logging.info(f"v{SCRIPT_VERSION} | Discord Enabled: Yes")
+    logging.info(
+        f"Interval:{settings.check_interval_seconds}s, PostDelay:{settings.post_delay_seconds}s, DB:{settings.database_file}, MaxProcess:{settings.max_process_per_cycle}, StatusRotation:{settings.status_rotation_minutes}m")
+    logging.info(
+        f"Filters: Sev>='{DEFAULT_FILTER_CONFIG.min_severity}', Cert>='{DEFAULT_FILTER_CONFIG.min_certainty}', Urg>='{DEFAULT_FILTER_CONFIG.min_urgency}', BlockedEvents#: {len(DEFAULT_FILTER_CONFIG.blocked_event_types)}, Rules#: {len(DEFAULT_FILTER_CONFIG.rules)}")
+    logging.info(f"NWS URL: {settings.nws_atom_url}" + (f" ({len(settings.feed_sources)} feed source entries)"
+                                                        if settings.feed_sources else ""))
+    logging.info(f"HA: backend={settings.ha_backend}, instance={INSTANCE_ID}, lease={settings.lease_ttl_seconds}s")
+
+
+# --- Database Setup ---
+def init_db():
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor()
+    except Exception as e:
+        logging.exception(f"DB Connect Fail {settings.database_file}: {e}");
+        raise
+    try:
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS posted_alerts (nws_id TEXT PRIMARY KEY, first_posted_utc TEXT NOT NULL, last_updated_utc TEXT NOT NULL, discord_message_id INTEGER, twitter_tweet_id INTEGER, event_type TEXT, severity TEXT, expires_utc TEXT, content_fingerprint TEXT, reissue_of TEXT, thread_id INTEGER, expired_utc TEXT, webhook_id INTEGER)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_nws_id ON posted_alerts (nws_id)')
+        cursor.execute("PRAGMA table_info(posted_alerts)")
+        alert_columns = [c[1] for c in cursor.fetchall()]
+        for column, column_type in (('content_fingerprint', 'TEXT'), ('reissue_of', 'TEXT'), ('thread_id', 'INTEGER'),
+                                    ('expired_utc', 'TEXT'), ('webhook_id', 'INTEGER')):
+            if column not in alert_columns:
+                logging.warning(f"Adding '{column}' column to posted_alerts.");
+                cursor.execute(f"ALTER TABLE posted_alerts ADD COLUMN {column} {column_type}")
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alert_fingerprint ON posted_alerts (content_fingerprint)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alert_first_posted ON posted_alerts (first_posted_utc)')
+        # One row per geocode of each post; the primary key is the (code, time) index !history pages through
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS alert_locations (code TEXT NOT NULL, posted_utc TEXT NOT NULL, nws_id TEXT NOT NULL, event_type TEXT, PRIMARY KEY (code, posted_utc, nws_id)) WITHOUT ROWID')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_locations_posted ON alert_locations (posted_utc)')
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS subscriptions (user_id INTEGER NOT NULL, location_code TEXT NOT NULL COLLATE NOCASE, event_type TEXT COLLATE NOCASE, subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (user_id, location_code, event_type))')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sub_location_event ON subscriptions (location_code, event_type)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sub_user ON subscriptions (user_id)')
+        cursor.execute("PRAGMA table_info(subscriptions)")
+        columns = [c[1] for c in cursor.fetchall()]
+        if 'event_type' not in columns:
+            logging.warning("Adding 'event_type' column.");
+            cursor.execute("ALTER TABLE subscriptions ADD COLUMN event_type TEXT COLLATE NOCASE");
+            logging.info("Column added.")
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS vtec_events (office TEXT NOT NULL, phenomena TEXT NOT NULL, significance TEXT NOT NULL, etn INTEGER NOT NULL, year INTEGER NOT NULL, state TEXT NOT NULL, is_active INTEGER NOT NULL, event_type TEXT, first_nws_id TEXT, last_nws_id TEXT, discord_message_id INTEGER, thread_id INTEGER, begins_utc TEXT, ends_utc TEXT, updated_utc TEXT NOT NULL, last_sent_utc TEXT, PRIMARY KEY (office, phenomena, significance, etn, year))')
+        cursor.execute("PRAGMA table_info(vtec_events)")
+        if 'last_sent_utc' not in [c[1] for c in cursor.fetchall()]:
+            logging.warning("Adding 'last_sent_utc' column to vtec_events.");
+            cursor.execute("ALTER TABLE vtec_events ADD COLUMN last_sent_utc TEXT")
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_vtec_office_active ON vtec_events (office, is_active)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS bot_state (key TEXT PRIMARY KEY, value TEXT)')
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS alert_latency (nws_id TEXT PRIMARY KEY, severity TEXT, sent_at REAL, seen_at REAL, filter_pass_at REAL, ack_at REAL NOT NULL)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_latency_ack ON alert_latency (ack_at)')
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS latency_histograms (hour INTEGER NOT NULL, severity TEXT NOT NULL, segment TEXT NOT NULL, counts TEXT NOT NULL, PRIMARY KEY (hour, severity, segment))')
+        cursor.execute("INSERT OR IGNORE INTO bot_state (key, value) VALUES ('last_changelog_version', NULL)")
+        conn.commit();
+        logging.info(f"DB {settings.database_file} initialized/verified.")
+    except sqlite3.Error as e:
+        logging.exception(f"DB init error: {e}");
+        raise
+    finally:
+        if conn:
+            conn.close()
+
+
+@db_timed("get_posted_alert_info")
+def get_posted_alert_info(nws_id: str) -> Optional[Dict]:
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        conn.row_factory = sqlite3.Row;
+        cursor = conn.cursor();
+        cursor.execute("SELECT * FROM posted_alerts WHERE nws_id = ?", (nws_id,));
+        row = cursor.fetchone();
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logging.exception(f"DB fetch {nws_id}: {e}");
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+@db_timed("get_posted_ids_since")
+def get_posted_ids_since(since: Optional[str] = None) -> List[Tuple[str, str]]:
+    """(nws_id, last_updated_utc) for rows changed at or after `since` (all rows if None)."""
+    conn = None;
+    rows = []
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        if since:
+            cursor.execute("SELECT nws_id, last_updated_utc FROM posted_alerts WHERE last_updated_utc >= ?", (since,));
+        else:
+            cursor.execute("SELECT nws_id, last_updated_utc FROM posted_alerts");
+        rows = cursor.fetchall()
+    except sqlite3.Error as e:
+        logging.exception(f"DB posted ids since {since}: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return rows
+
+
+@db_timed("record_alert_post")
+def record_alert_post(alert_data: AlertRecord, discord_msg_id: Optional[int], is_update: bool = False,
+                      thread_id: Optional[int] = None, webhook_id: Optional[int] = None):
+    now_utc = datetime.now(timezone.utc).isoformat(timespec='seconds');
+    nws_id = alert_data.id;
+    tw_id = None;
+    conn = None
+    if not nws_id:
+        logging.error("Record alert no ID.");
+        return
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor()
+    except Exception as e:
+        logging.exception(f"DB connect {nws_id}: {e}");
+        return
+    try:
+        if is_update:
+            cursor.execute('UPDATE posted_alerts SET last_updated_utc=?, discord_message_id=?, expires_utc=?, webhook_id=? WHERE nws_id=?',
+                           (now_utc, discord_msg_id, format_cap_time(alert_data.expires) or "N/A", webhook_id, nws_id));
+            logging.info("Updated %s DB.", nws_id)
+        else:
+            cursor.execute('INSERT OR REPLACE INTO posted_alerts (nws_id, first_posted_utc, last_updated_utc, discord_message_id, twitter_tweet_id, event_type, severity, expires_utc, content_fingerprint, thread_id, webhook_id) VALUES (?,?,?,?,?,?,?,?,?,?,?)',
+                           (nws_id, now_utc, now_utc, discord_msg_id, tw_id, alert_data.event,
+                            alert_data.severity, format_cap_time(alert_data.expires) or "N/A",
+                            alert_data.fingerprint, thread_id, webhook_id));
+            cursor.executemany('INSERT OR IGNORE INTO alert_locations (code, posted_utc, nws_id, event_type) VALUES (?,?,?,?)',
+                               [(code, now_utc, nws_id, alert_data.event) for code in sorted(alert_data.geocodes)]);
+            logging.info("Inserted %s DB.", nws_id)
+        conn.commit()
+        posted_alert_ids.add(nws_id)
+    except sqlite3.Error as e:
+        logging.exception(f"DB record {nws_id}: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+@db_timed("get_location_history")
+def get_location_history(location_code: str, since_utc: str, event_type: Optional[str] = None,
+                         before: Optional[Tuple[str, str]] = None, limit: int = 11) -> List[Dict]:
+    """Posts for a geocode since `since_utc`, newest first, starting after the `before` (posted_utc, nws_id) key."""
+    conn = None;
+    rows = []
+    query = ("SELECT l.posted_utc, l.nws_id, l.event_type, p.severity, p.discord_message_id, p.thread_id "
+             "FROM alert_locations l LEFT JOIN posted_alerts p ON p.nws_id = l.nws_id "
+             "WHERE l.code = ? AND l.posted_utc >= ?")
+    params: List[Any] = [location_code, since_utc]
+    if event_type:
+        query += " AND l.event_type = ? COLLATE NOCASE"
+        params.append(event_type)
+    if before:
+        query += " AND (l.posted_utc, l.nws_id) < (?, ?)"
+        params.extend(before)
+    query += " ORDER BY l.posted_utc DESC, l.nws_id DESC LIMIT ?"
+    params.append(limit)
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        conn.row_factory = sqlite3.Row;
+        rows = [dict(row) for row in conn.execute(query, params).fetchall()];
+    except sqlite3.Error as e:
+        logging.exception(f"DB location history {location_code}: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return rows
+
+
+@db_timed("get_posted_alert_by_fingerprint")
+def get_posted_alert_by_fingerprint(fingerprint: str) -> Optional[Dict]:
+    """Returns the original (non-reissue) posted alert with this content fingerprint."""
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        conn.row_factory = sqlite3.Row;
+        cursor = conn.cursor();
+        cursor.execute("SELECT * FROM posted_alerts WHERE content_fingerprint = ? AND reissue_of IS NULL "
+                       "ORDER BY first_posted_utc DESC LIMIT 1", (fingerprint,));
+        row = cursor.fetchone();
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logging.exception(f"DB fetch fingerprint {fingerprint}: {e}");
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+@db_timed("record_alert_reissue")
+def record_alert_reissue(alert_data: AlertRecord, original: dict):
+    """Records a reissued id against the original post so it is never considered again."""
+    now_utc = datetime.now(timezone.utc).isoformat(timespec='seconds');
+    nws_id = alert_data.id;
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        cursor.execute('INSERT OR REPLACE INTO posted_alerts (nws_id, first_posted_utc, last_updated_utc, discord_message_id, event_type, severity, expires_utc, content_fingerprint, reissue_of) VALUES (?,?,?,?,?,?,?,?,?)',
+                       (nws_id, now_utc, now_utc, original.get("discord_message_id"), alert_data.event,
+                        alert_data.severity, format_cap_time(alert_data.expires) or "N/A",
+                        alert_data.fingerprint, original.get("nws_id")));
+        cursor.execute("UPDATE posted_alerts SET last_updated_utc=? WHERE nws_id=?", (now_utc, original.get("nws_id")));
+        conn.commit();
+        posted_alert_ids.add(nws_id)
+        logging.info("Recorded %s as reissue of %s.", nws_id, original.get('nws_id'))
+    except sqlite3.Error as e:
+        logging.exception(f"DB record reissue {nws_id}: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+@db_timed("get_unexpired_posts")
+def get_unexpired_posts(backfill_since: str) -> List[Tuple[str, str, int, Optional[int], Optional[int]]]:
+    """(nws_id, expires_utc, discord_message_id, thread_id, webhook_id) of posts not yet marked expired.
+
+    Posts that expired before `backfill_since` are marked expired without an edit, so a first run
+    doesn't rewrite weeks of history.
+    """
+    conn = None;
+    rows = []
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        now_utc = datetime.now(timezone.utc).isoformat(timespec='seconds');
+        cursor.execute("UPDATE posted_alerts SET expired_utc=? WHERE expired_utc IS NULL AND expires_utc != 'N/A' "
+                       "AND expires_utc < ?", (now_utc, backfill_since));
+        cursor.execute("SELECT nws_id, expires_utc, discord_message_id, thread_id, webhook_id FROM posted_alerts WHERE "
+                       "expired_utc "
+                       "IS NULL AND reissue_of IS NULL AND discord_message_id IS NOT NULL AND expires_utc != 'N/A'");
+        rows = cursor.fetchall();
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.exception(f"DB unexpired posts: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return rows
+
+
+@db_timed("mark_alerts_expired")
+def mark_alerts_expired(nws_ids: List[str]):
+    if not nws_ids:
+        return
+    now_utc = datetime.now(timezone.utc).isoformat(timespec='seconds');
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        conn.executemany("UPDATE posted_alerts SET expired_utc=? WHERE nws_id=?", [(now_utc, i) for i in nws_ids]);
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.exception(f"DB mark expired {nws_ids}: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def alert_vtec_codes(alert_data: AlertRecord) -> List[Tuple[VtecCode, Tuple]]:
+    """Returns the alert's P-VTEC codes paired with their lifecycle keys."""
+    if not alert_data.vtec:
+        return []
+    issued = alert_data.sent or alert_data.effective or alert_data.expires
+    fallback_year = (datetime.fromtimestamp(issued, timezone.utc) if issued else datetime.now(timezone.utc)).year
+    return [(code, code.key(fallback_year)) for code in parse_vtec(alert_data.vtec)]
+
+
+@db_timed("get_vtec_event")
+def get_vtec_event(key: Tuple) -> Optional[Dict]:
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        conn.row_factory = sqlite3.Row;
+        cursor = conn.cursor();
+        cursor.execute("SELECT * FROM vtec_events WHERE office=? AND phenomena=? AND significance=? AND etn=? AND year=?",
+                       key);
+        row = cursor.fetchone();
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logging.exception(f"DB fetch VTEC {key}: {e}");
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+@db_timed("record_vtec_actions")
+def record_vtec_actions(alert_data: AlertRecord, vtec_codes: List[Tuple[VtecCode, Tuple]], discord_msg_id: Optional[int],
+                        thread_id: Optional[int] = None):
+    """Advances each VTEC event's lifecycle state. The first message posted for an event is kept as its anchor.
+
+    Products are applied in issue order: one sent before the last product applied to an event is
+    ignored, so a late or re-read older product cannot roll the event back.
+    """
+    if not vtec_codes:
+        return
+    now_utc = datetime.now(timezone.utc).isoformat(timespec='seconds');
+    nws_id = alert_data.id;
+    sent_utc = format_cap_time(alert_data.sent or alert_data.updated);
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")  # Diff workers record concurrently; read-modify-write one at a time
+        for code, key in vtec_codes:
+            cursor.execute("SELECT state, last_sent_utc FROM vtec_events WHERE office=? AND phenomena=? AND significance=? AND etn=? AND year=?",
+                           key)
+            row = cursor.fetchone()
+            if row and row[1] and sent_utc and sent_utc < row[1]:
+                logging.debug("Ignoring VTEC %s from %s: older than the last product applied", code.action, nws_id)
+                continue
+            state, is_active = next_state(row[0] if row else None, code.action)
+            begins = code.begins.isoformat() if code.begins else None
+            ends = code.ends.isoformat() if code.ends else None
+            cursor.execute(
+                'INSERT INTO vtec_events (office, phenomena, significance, etn, year, state, is_active, event_type, first_nws_id, last_nws_id, discord_message_id, thread_id, begins_utc, ends_utc, updated_utc, last_sent_utc) '
+                'VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?) '
+                'ON CONFLICT (office, phenomena, significance, etn, year) DO UPDATE SET state=excluded.state, is_active=excluded.is_active, '
+                'last_nws_id=excluded.last_nws_id, discord_message_id=COALESCE(vtec_events.discord_message_id, excluded.discord_message_id), '
+                'thread_id=COALESCE(vtec_events.thread_id, excluded.thread_id), begins_utc=COALESCE(vtec_events.begins_utc, excluded.begins_utc), '
+                'ends_utc=COALESCE(excluded.ends_utc, vtec_events.ends_utc), updated_utc=excluded.updated_utc, '
+                'last_sent_utc=COALESCE(excluded.last_sent_utc, vtec_events.last_sent_utc)',
+                key + (state, int(is_active), alert_data.event, nws_id, nws_id, discord_msg_id, thread_id, begins,
+                       ends, now_utc, sent_utc))
+        conn.commit();
+        logging.debug("VTEC lifecycle updated for %s: %s", nws_id, [c.action for c, _ in vtec_codes])
+    except sqlite3.Error as e:
+        logging.exception(f"DB record VTEC {nws_id}: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+@db_timed("attach_vtec_message")
+def attach_vtec_message(vtec_codes: List[Tuple[VtecCode, Tuple]], discord_msg_id: int, thread_id: Optional[int] = None):
+    """Sets the anchor message of events that have none yet; their lifecycle was recorded by the diff stage."""
+    if not vtec_codes:
+        return
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor()
+        for _, key in vtec_codes:
+            cursor.execute("UPDATE vtec_events SET discord_message_id=COALESCE(discord_message_id, ?), "
+                           "thread_id=COALESCE(thread_id, ?) WHERE office=? AND phenomena=? AND significance=? AND etn=? AND year=?",
+                           (discord_msg_id, thread_id) + key)
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.exception(f"DB attach VTEC message {discord_msg_id}: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def get_active_vtec_events(office: str) -> List[Dict]:
+    """Active events for an office that have not run past their VTEC end time, served by idx_vtec_office_active."""
+    events = [];
+    now_utc = datetime.now(timezone.utc).isoformat(timespec='seconds');
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        conn.row_factory = sqlite3.Row;
+        cursor = conn.cursor();
+        cursor.execute("SELECT * FROM vtec_events WHERE office=? AND is_active=1 AND (ends_utc IS NULL OR ends_utc > ?) "
+                       "ORDER BY updated_utc DESC", (office.upper(), now_utc));
+        events = [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logging.exception(f"DB active VTEC {office}: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return events
+
+
+def get_bot_state(key: str) -> Optional[str]:
+    conn = None;
+    value = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        cursor.execute("SELECT value FROM bot_state WHERE key = ?", (key,));
+        row = cursor.fetchone();
+        value = row[0] if row else None
+    except sqlite3.Error as e:
+        logging.exception(f"DB get state '{key}': {e}")
+    finally:
+        if conn:
+            conn.close()
+    return value
+
+
+def set_bot_state(key: str, value: Optional[str]):
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        cursor.execute("INSERT OR REPLACE INTO bot_state (key, value) VALUES (?, ?)", (key, value));
+        conn.commit();
+        logging.info(f"Set bot state '{key}' to '{str(value)[:50]}...'")
+    except sqlite3.Error as e:
+        logging.exception(f"DB set state '{key}': {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def load_filter_registry():
+    """Replaces the config-seeded filters with the ones saved by !filter, if any."""
+    global filter_registry
+    stored = get_bot_state(FILTER_STATE_KEY)
+    if not stored:
+        return
+    try:
+        filter_registry = FilterRegistry.loads(stored, DEFAULT_FILTER_CONFIG)
+        logging.info(f"Loaded saved filters for destinations: {', '.join(filter_registry.destinations())}")
+    except (ValueError, TypeError, AttributeError) as e:
+        logging.error(f"Saved filters unreadable, using config defaults: {e}")
+
+
+def save_filter_registry():
+    set_bot_state(FILTER_STATE_KEY, filter_registry.dumps())
+
+
+alert_latency = LatencyTracker()  # Hourly per-severity histograms behind !latency
+
+
+def observe_alert_latency(alert_data: AlertRecord, seen_at: float, ack_at: float) -> List[Tuple]:
+    """Folds a posted alert into the in-memory hourly histograms; returns the histogram rows to store."""
+    severity = alert_data.severity or "Unknown"
+    alert_latency.observe(severity, alert_data.sent, seen_at, ack_at)
+    if alert_data.sent:
+        ALERT_LATENCY_SECONDS.labels(severity).observe(max(0.0, ack_at - alert_data.sent))
+    return alert_latency.take_dirty()
+
+
+@db_timed("record_alert_latency")
+def record_alert_latency(alert_data: AlertRecord, seen_at: float, filter_pass_at: Optional[float], ack_at: float,
+                         histogram_rows: List[Tuple]):
+    """Stores one posted alert's timestamps and the histogram rows observe_alert_latency() changed."""
+    severity = alert_data.severity or "Unknown"
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        cursor.execute("INSERT OR REPLACE INTO alert_latency (nws_id, severity, sent_at, seen_at, filter_pass_at, ack_at) "
+                       "VALUES (?,?,?,?,?,?)", (alert_data.id, severity, alert_data.sent, seen_at, filter_pass_at, ack_at));
+        cursor.executemany("INSERT OR REPLACE INTO latency_histograms (hour, severity, segment, counts) VALUES (?,?,?,?)",
+                           histogram_rows);
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.exception(f"DB record latency {alert_data.id}: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def load_latency_histograms():
+    """Fills alert_latency from the stored hourly histograms within the retention window."""
+    since = time.time() - settings.database_retention_days * 86400
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        cursor.execute("SELECT hour, severity, segment, counts FROM latency_histograms WHERE hour >= ?", (int(since),));
+        alert_latency.load(cursor.fetchall())
+    except sqlite3.Error as e:
+        logging.exception(f"DB load latency histograms: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+# --- Leader Lease & Warm Caches ---
+def make_lease_backend() -> LeaseBackend:
+    if settings.ha_backend == "sqlite":
+        return SQLiteLease(settings.database_file)
+    if settings.ha_backend == "file":
+        return FileLockLease(settings.ha_lock_file)
+    return AlwaysLeader()
+
+
+lease_backend: Optional[LeaseBackend] = None
+is_leader = False  # Set by main(); with HA enabled, leadership starts once the lease is won
+posted_alert_ids = PostedIdCache()
+latest_snapshot = FeedSnapshot()
+feed_validators: Dict[str, Dict[str, str]] = {}  # Conditional-GET validators (etag, last_modified) per source key
+feed_sources: List[FeedSource] = []  # Built by startup() from feed_sources / nws_atom_url
+source_records: Dict[str, Tuple[AlertRecord, ...]] = {}  # Last parsed records per source key
+replay_records: Dict[str, AlertRecord] = {}  # Re-run through the pipeline before the next live cycle
+warm_started = False
+
+
+def restore_runtime_state():
+    """Loads the runtime snapshot if there is one, otherwise fills the posted-id cache from the DB."""
+    global latest_snapshot, warm_started
+    started = time.perf_counter()
+    try:
+        snapshot = load_snapshot(settings.runtime_snapshot_file)
+    except (SnapshotError, OSError) as e:
+        logging.warning(f"Runtime snapshot unusable, cold start: {e}")
+        snapshot = None
+    if snapshot is None:
+        posted_alert_ids.replace(get_posted_ids_since())
+        logging.info(f"Cold start: posted-id cache loaded from DB ({len(posted_alert_ids)} ids).")
+        return
+    latest_snapshot = snapshot.feed
+    feed_validators.update(snapshot.validators)
+    source_ids = snapshot.source_ids or ({latest_snapshot.source_url: [r.id for r in latest_snapshot.records]}
+                                         if latest_snapshot.source_url else {})
+    for key, ids in source_ids.items():
+        source_records[key] = tuple(latest_snapshot.by_id[i] for i in ids if i in latest_snapshot.by_id)
+    posted_alert_ids.restore(snapshot.posted_ids, snapshot.posted_synced_until)
+    synced = posted_alert_ids.merge(get_posted_ids_since(posted_alert_ids.synced_until))
+    # Alerts from the last feed (or claimed but never sent) whose posting may have been cut short
+    now = time.time()
+    for alert_data in (*latest_snapshot.records, *snapshot.outbox):
+        if alert_data.id not in posted_alert_ids and not alert_data.is_expired(now):
+            replay_records[alert_data.id] = alert_data
+    warm_started = True
+    logging.info(f"Warm start from snapshot saved {int(now - snapshot.saved_at)}s ago: feed v{latest_snapshot.version} "
+                 f"({len(latest_snapshot.records)} alerts), {len(posted_alert_ids)} posted ids (+{synced} from DB), "
+                 f"{len(snapshot.outbox)} in outbox, {len(replay_records)} to recheck, "
+                 f"validators for {len(feed_validators)} feed(s) in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+def persist_runtime_state() -> int:
+    """Writes the runtime snapshot; returns its size in bytes (0 on failure)."""
+    snapshot = RuntimeSnapshot(feed=latest_snapshot, validators=dict(feed_validators),
+                               posted_ids=posted_alert_ids.ids(), posted_synced_until=posted_alert_ids.synced_until,
+                               outbox=list(in_flight_alerts.values()) + list(replay_records.values()),
+                               saved_at=time.time(),
+                               source_ids={key: [r.id for r in records] for key, records in source_records.items()})
+    try:
+        size = save_snapshot(settings.runtime_snapshot_file, snapshot)
+    except OSError as e:
+        logging.error(f"Runtime snapshot save failed: {e}")
+        return 0
+    logging.debug("Runtime snapshot saved (%d bytes).", size)
+    return size
+
+
+def publish_snapshot(records: List[AlertRecord], source_url: str) -> FeedSnapshot:
+    global latest_snapshot
+    latest_snapshot = FeedSnapshot.build(records, latest_snapshot.version + 1, source_url)
+    if alert_api:
+        alert_api.publish(latest_snapshot)
+    return latest_snapshot
+
+
+def feed_label() -> str:
+    """The feed URL, or a count when several sources are configured (the snapshot's source_url)."""
+    if len(feed_sources) == 1:
+        return feed_sources[0].key
+    return f"{len(feed_sources)} sources"
+
+
+async def sync_posted_ids(full: bool = False) -> int:
+    """Pulls posts made by the other instance into the cache (incremental unless `full`)."""
+    if full:
+        return posted_alert_ids.replace(await asyncio.to_thread(get_posted_ids_since))
+    return posted_alert_ids.merge(await asyncio.to_thread(get_posted_ids_since, posted_alert_ids.synced_until))
+
+
+def add_subscription(user_id: int, location_code: str, event_type: Optional[str] = None) -> bool:
+    code = location_code.upper();
+    event = event_type.strip().lower() if event_type else None;
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        cursor.execute("INSERT OR IGNORE INTO subscriptions (user_id, location_code, event_type) VALUES (?, ?, ?)",
+                       (user_id, code, event));
+        conn.commit();
+        logging.info(f"Sub added/ok {user_id}/{code}/'{event}'.");
+        return True
+    except sqlite3.Error as e:
+        logging.exception(f"DB sub add {user_id}/{code}/'{event}': {e}");
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def remove_subscription(user_id: int, location_code: str, event_type: Optional[str] = None) -> bool:
+    code = location_code.upper();
+    event = event_type.strip().lower() if event_type else None;
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor()
+        if event:
+            cursor.execute("DELETE FROM subscriptions WHERE user_id=? AND location_code=? AND event_type=?",
+                           (user_id, code, event))
+        else:
+            cursor.execute("DELETE FROM subscriptions WHERE user_id=? AND location_code=? AND event_type IS NULL",
+                           (user_id, code))
+        rows_affected = cursor.rowcount;
+        conn.commit()
+        if rows_affected > 0:
+            logging.info(f"Sub removed user {user_id} code {code} event '{event}'.")
+        else:
+            logging.info(f"No matching sub found remove user {user_id} code {code} event '{event}'.")
+        return True
+    except sqlite3.Error as e:
+        logging.exception(f"DB sub remove {user_id}/{code}/'{event}': {e}");
+        return False
+    finally:
+        if conn:
+            try:
+                conn.close()
+            except sqlite3.Error as close_err:
+                logging.exception(f"DB close err remove_sub: {close_err}")
+
+
+def remove_all_subscriptions(user_id: int) -> bool:
+    conn = None;
+    count = 0
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        cursor.execute("DELETE FROM subscriptions WHERE user_id = ?", (user_id,));
+        count = cursor.rowcount;
+        conn.commit();
+        logging.info(f"Removed all {count} subs for {user_id}.");
+        return True
+    except sqlite3.Error as e:
+        logging.exception(f"DB remove all subs {user_id}: {e}");
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def get_user_subscriptions(user_id: int) -> List[Tuple[str, Optional[str]]]:
+    subs = [];
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        cursor.execute(
+            "SELECT location_code, event_type FROM subscriptions WHERE user_id=? ORDER BY location_code, event_type",
+            (user_id,));
+        subs = cursor.fetchall();
+    except sqlite3.Error as e:
+        logging.exception(f"DB get subs {user_id}: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return subs
+
+
+def get_subscribers_for_alert(alert_geocodes: Set[str], alert_event_type: str) -> Set[int]:
+    if not alert_geocodes:
+        return set()
+    subscribers = set();
+    event_lower = alert_event_type.lower();
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        placeholders = ','.join('?' * len(alert_geocodes));
+        query = f"SELECT DISTINCT user_id FROM subscriptions WHERE location_code IN ({placeholders}) AND (event_type = ? OR event_type IS NULL)";
+        params = tuple(alert_geocodes) + (event_lower,);
+        cursor.execute(query, params);
+        subscribers = {r[0] for r in cursor.fetchall()};
+        logging.debug("Found %d subs for '%s' in %d codes", len(subscribers), event_lower, len(alert_geocodes))
+    except sqlite3.Error as e:
+        logging.exception(f"DB get subscribers for codes {alert_geocodes}: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return subscribers
+
+
+@db_timed("get_subscribed_codes_for_alert")
+def get_subscribed_codes_for_alert(alert_geocodes: Set[str], alert_event_type: str) -> Set[str]:
+    """Location codes of the alert that have at least one matching subscription (for role pings)."""
+    if not alert_geocodes:
+        return set()
+    codes = set();
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        placeholders = ','.join('?' * len(alert_geocodes));
+        query = f"SELECT DISTINCT location_code FROM subscriptions WHERE location_code IN ({placeholders}) AND (event_type = ? OR event_type IS NULL)";
+        cursor.execute(query, tuple(alert_geocodes) + (alert_event_type.lower(),));
+        codes = {r[0].upper() for r in cursor.fetchall()}
+    except sqlite3.Error as e:
+        logging.exception(f"DB get subscribed codes for {alert_geocodes}: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return codes
+
+
+@db_timed("get_all_subscribed_codes")
+def get_all_subscribed_codes() -> Set[str]:
+    codes = set();
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        cursor.execute("SELECT DISTINCT location_code FROM subscriptions");
+        codes = {r[0].upper() for r in cursor.fetchall()}
+    except sqlite3.Error as e:
+        logging.exception(f"DB get all subscribed codes: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return codes
+
+
+def get_subscribers_for_codes(location_codes: Set[str]):  # Helper used for role mentions
+    if not location_codes:
+        return set()
+    subscribers = set();
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        placeholders = ','.join('?' * len(location_codes));
+        query = f"SELECT DISTINCT user_id FROM subscriptions WHERE location_code IN ({placeholders})";
+        cursor.execute(query, tuple(location_codes));
+        subscribers = {r[0] for r in cursor.fetchall()}
+    except sqlite3.Error as e:
+        logging.exception(f"DB get subscribers for codes (general) {location_codes}: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return subscribers
+
+
+async def check_is_owner(ctx):
+    return await bot.is_owner(ctx.author)
+
+
+# --- Concurrency Lock ---
+alert_processing_lock = asyncio.Lock()
+alert_check_wakeup = asyncio.Event()  # Set to run the next alert check immediately (e.g. on promotion)
+
+
+# --- Embed Helper Function ---
+def create_embed(description: str, title: str = "", color: discord.Color = discord.Color.blue(),
+                 **kwargs) -> discord.Embed:
+    if not description:
+        description = "No description provided.";
+        color = discord.Color.light_grey()
+    if len(description) > DISCORD_MAX_LENGTH:
+        logging.warning(f"Embed desc truncated.");
+        description = description[:DISCORD_MAX_LENGTH - 3] + "..."
+    embed = discord.Embed(title=title, description=description, color=color, **kwargs);
+    embed.timestamp = datetime.now(timezone.utc)
+    return embed
+
+
+# --- Error Reporting Helper ---
+async def report_error(error_message: str, error_id: Optional[str] = None, traceback_info: Optional[str] = None) -> str:
+    if error_id is None:
+        error_id = uuid.uuid4().hex[:8]
+    log_message = f"[Error ID: {error_id}] {error_message}";
+    logging.error(log_message, exc_info=traceback_info)
+    if bot and settings.error_channel_id:
+        global discord_error_channel_obj
+        try:
+            if bot.is_ready() and not discord_error_channel_obj:
+                discord_error_channel_obj = bot.get_channel(settings.error_channel_id) or await bot.fetch_channel(
+                    settings.error_channel_id)
+            if discord_error_channel_obj:
+                embed_desc = f"**Error ID:** `{error_id}`\n```\n{error_message[:1500]}\n```" + (
+                    f"\n**Traceback:**\n```python\n{traceback_info[:1500]}\n```" if traceback_info else "")
+                err_embed = create_embed(embed_desc, title="🚨 Bot Error", color=discord.Color.dark_red())
+                await discord_error_channel_obj.send(embed=err_embed)
+        except Exception as report_err:
+            logging.error(f"Failed sending error report {error_id}: {report_err}")
+    return error_id
+
+
+# --- Changelog Data ---
+CHANGELOGS = {
+    "3.4.0": [  # Version number updated here
+        "- **Removed YouTube integration features.**",
+        "- Implemented **Timestamped Log Files**: Creates a new log file (e.g., `nws_alert_bot_YYYYMMDD_HHMMSS.log`) in the `logs` folder on each startup.",
+        "- Bot's rotating status now includes the version number (e.g., `Listening to !help | v3.4.0`).",
+        "- Includes all previous features (NWS Alerts, Subscriptions, Role Management, Stats/Recent commands, Filtering) and bug fixes.",
+    ],
+    "3.3.3": ["- Fixed various syntax errors & help command `TypeError`."]  # Example previous entry
+}
+
+
+# --- Custom Help Command ---
+class MyHelpCommand(commands.MinimalHelpCommand):
+    async def send_bot_help(self, mapping):
+        embed = create_embed(description=f"Use `{self.context.prefix}help <command>` for more info.",
+                            title=f"{bot.user.name} v{SCRIPT_VERSION} Commands", color=discord.Color.blurple())
+        is_owner = await check_is_owner(self.context);
+        cmd_mapping = defaultdict(list)
+        for cmd in sorted(bot.commands, key=lambda c: c.name):
+            if not cmd.hidden or is_owner:
+                try:
+                    can_run = await cmd.can_run(self.context)
+                except Exception:
+                    can_run = False
+                if can_run:
+                    category = "Owner Only" if any(
+                        check.__qualname__ == check_is_owner.__qualname__ for check in cmd.checks) else "General"
+                    if group := cmd.full_parent_name:
+                        category = f"Group: !{group.title()}"
+                    cmd_mapping[category].append(cmd)
+        for category, command_list in cmd_mapping.items():
+            signatures = [f"`{self.get_command_signature(c)}`\n{c.short_doc or 'No description'}" for c in
+                          command_list]
+            if signatures:
+                embed.add_field(name=category, value="\n".join(signatures), inline=False)
+        await self.get_destination().send(embed=embed)
+
+    async def send_command_help(self, command):
+        embed = create_embed(title=f"`{self.get_command_signature(command)}`",
+                            description=command.help or command.short_doc or "N/A", color=discord.Color.green())
+        if command.aliases:
+            embed.add_field(name="Aliases", value=", ".join(f"`{alias}`" for alias in command.aliases), inline=False)
+        await self.get_destination().send(embed=embed)
+
+    async def send_group_help(self, group):
+        embed = create_embed(title=f"Group: `{self.get_command_signature(group)}`",
+                            description=group.help or group.short_doc or "N/A", color=discord.Color.dark_green())
+        if group.aliases:
+            embed.add_field(name="Aliases", value=", ".join(f"`{alias}`" for alias in group.aliases), inline=False)
+        filtered_commands = await self.filter_commands(group.commands, sort=True);
+        is_owner = await check_is_owner(self.context)
+        subcommands = [f"`{self.get_command_signature(cmd)}` - {cmd.short_doc or 'N/A'}" for cmd in
+                       filtered_commands if not cmd.hidden or is_owner]
+        if subcommands:
+            embed.add_field(name="Subcommands", value="\n".join(subcommands), inline=False)
+        await self.get_destination().send(embed=embed)
+
+
+# --- Discord Commands ---
+@commands.command(name='ping', short_doc="Checks bot latency.")
+async def ping(ctx):
+    latency_ms = round(bot.latency * 1000);
+    await ctx.send(embed=create_embed(f'Pong! Latency: {latency_ms}ms', title="🏓 Ping", color=discord.Color.green()));
+    logging.info(f"Cmd !ping by {ctx.author}. Latency: {latency_ms}ms")
+
+
+@commands.command(name='status', short_doc="Displays current bot status.")
+async def status(ctx):
+    db_count = 0;
+    sub_count = 0;
+    err_msg = None;
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        cursor.execute("SELECT COUNT(*) FROM posted_alerts");
+        db_count = cursor.fetchone()[0];
+        cursor.execute("SELECT COUNT(*) FROM subscriptions");
+        sub_count = cursor.fetchone()[0];
+        conn.close()
+    except Exception as e:
+        logging.error(f"DB count error: {e}");
+        db_count = "Err";
+        sub_count = "Err";
+        err_msg = f"DB Error: {e}"
+    poll_line = f"Interval: `{settings.check_interval_seconds}`s"
+    if poll_scheduler and poll_scheduler.next_due is not None:
+        poll_line += (f" (now `{poll_scheduler.last.interval:.0f}`s: {poll_scheduler.last.reason}; next check in "
+                      f"`{poll_scheduler.seconds_until_due(asyncio.get_running_loop().time()):.0f}`s)")
+    status_lines = [f"NWS Alert Bot v{SCRIPT_VERSION}.", f"Feed: `{feed_label()}`",
+                    f"{poll_line} | Post Delay: `{settings.post_delay_seconds}`s.",
+                    f"Discord: `On`", f"DB Alerts: `{db_count}` | DB Subs: `{sub_count}`"]
+    if err_msg:
+        status_lines.append(f"DB Status: `{err_msg}`")
+
+    def format_task_status(task, name):
+        if task and not task.done():
+            return f"{name}: Running ✅"
+        else:
+            return f"{name}: Not Running ❌"
+
+    status_lines.append(format_task_status(check_alerts_task, "Alert Task"))
+    status_lines.append(format_task_status(cleanup_db_task, "Cleanup Task"))
+    status_lines.append(format_task_status(change_status_task, "Status Task"))
+    if settings.expiry_enabled:
+        next_due = expiry_heap.next_due()
+        status_lines.append(format_task_status(expiry_task, "Expiry Task") + f" (`{len(expiry_heap)}` pending"
+                            + (f", next <t:{int(next_due)}:R>)" if next_due else ")"))
+    if settings.ha_backend != "none":
+        status_lines.append(f"HA: `{'Leader' if is_leader else 'Standby'}` ({settings.ha_backend} lease) | Instance: `{INSTANCE_ID}`")
+    if settings.output_mode == "webhook":
+        status_lines.append(f"Output: `{len(webhook_pool) if webhook_pool else 0}` webhook(s)"
+                            + ("" if webhook_pool else " (bot token fallback)"))
+    breaker = worst_feed_breaker()
+    breaker_line = f"Feed breaker: `{breaker.state}`" if breaker else "Feed breaker: `n/a`"
+    if breaker and breaker.state == OPEN:
+        open_count = sum(b.state == OPEN for b in feed_breakers.values())
+        breaker_line += f" ({open_count} source(s); probe in `{breaker.retry_in():.0f}`s)"
+    if breaker:
+        breaker_line += f" | Consecutive failures: `{breaker.consecutive_failures}` | Trips: `{breaker.trips}`"
+    status_lines.append(f"{breaker_line} | Retries: `{int(FEED_RETRIES.value)}`")
+    if len(feed_sources) > 1:
+        status_lines.append("Sources: " + ", ".join(f"{source.name} `{len(source_records.get(source.key, ()))}`"
+                                                    for source in feed_sources))
+    if latest_snapshot.version:
+        status_lines.append(f"Snapshot: v`{latest_snapshot.version}`, `{len(latest_snapshot.records)}` alerts, "
+                            f"`{int(latest_snapshot.age_seconds)}`s old | Posted-id cache: `{len(posted_alert_ids)}`")
+    if alert_pipeline.running:
+        depths = alert_pipeline.depths()
+        status_lines.append("Queues: " + " → ".join(f"{name} `{depth}`" for name, depth in depths.items()))
+    # Removed YouTube task status line
+    await ctx.send(embed=create_embed("\n".join(status_lines), title="📊 Bot Status", color=discord.Color.blurple()))
+    logging.info(f"Cmd !status by {ctx.author}")
+
+
+@commands.group(name='subscribe', aliases=['sub'], invoke_without_command=True)
+@commands.guild_only()
+async def subscribe_group(ctx):
+    """Manage alert subscriptions (e.g., !sub add NYC061 [Tornado Warning])."""
+    await ctx.send_help(ctx.command)
+
+
+@subscribe_group.command(name='add', help="Subscribe. Usage: !sub add <CODE> [Event Name]")
+@commands.guild_only()
+@commands.bot_has_permissions(manage_roles=True)
+async def sub_add(ctx, location_code: str, *, event_type: Optional[str] = None):
+    code = location_code.upper().strip();
+    event_db = event_type.strip().lower() if event_type else None
+    if not code:
+        await ctx.send(embed=create_embed("Provide code.", color=discord.Color.orange()));
+        return
+    role_name = f"{code} Alerts";
+    role = discord.utils.get(ctx.guild.roles, name=role_name);
+    role_created = False;
+    role_assigned = False;
+    db_added = False;
+    role_error = None;
+    bot_top_role_pos = ctx.guild.me.top_role.position
+    if not role:
+        try:
+            role = await ctx.guild.create_role(name=role_name, mentionable=True,
+                                              reason=f"Alert role by {ctx.author}");
+            logging.info(f"Created role '{role_name}'");
+            role_created = True;
+            await asyncio.sleep(0.5)
+        except discord.Forbidden:
+            role_error = "Bot lacks create role permission.";
+            logging.error(role_error)
+        except Exception as e:
+            role_error = f"Failed role create: {e}";
+            logging.exception(role_error)
+    if role and role.position >= bot_top_role_pos:
+        role_error = "Bot role not high enough.";
+        logging.warning(role_error + f" Role:{role.id}, BotTop:{ctx.guild.me.top_role.id}")
+    if role and not role_error:
+        if add_subscription(ctx.author.id, code, event_db):
+            db_added = True
+            if role not in ctx.author.roles:
+                try:
+                    await ctx.author.add_roles(role, reason=f"Subscribed via bot");
+                    role_assigned = True;
+                    logging.info(f"Assigned '{role_name}' to {ctx.author}")
+                except discord.Forbidden:
+                    role_error = "Bot lacks assign role permission.";
+                    logging.error(role_error);
+                    remove_subscription(ctx.author.id, code, event_db)
+                except Exception as e:
+                    role_error = f"Err assign role: {e}";
+                    logging.exception(role_error);
+                    remove_subscription(ctx.author.id, code, event_db)
+            else:
+                role_assigned = True
+        else:
+            role_error = "DB error."
+    title = "Sub Added" if db_added else "Sub Failed";
+    color = discord.Color.green() if db_added else discord.Color.red();
+    desc = f"Sub for **{code}**" + (f" (`{event_type or 'All Events'}`)" if db_added else "") + (
+        " added." if db_added else f" failed: {role_error or 'Unknown'}");
+    if role_created:
+        desc += "\n🆕 Role created!"
+    if role_assigned and db_added:
+        desc += "\n🔔 Role assigned!"
+        desc += f"\n✅ Role `{role_name}` assigned."
+    elif role and not role_error and db_added and not role_assigned:
+        desc += f"\n⚠️ Role exists but couldn't assign."
+    elif role_error:
+        desc += f"\n❌ Role Error: {role_error}"
+    await ctx.send(embed=create_embed(desc, title=title, color=color))
+
+
+@subscribe_group.command(name='remove', aliases=['rm', 'unsub'],
+                       help="Unsubscribe. Usage: !sub rm <CODE> [Event Name], or !sub rm all")
+@commands.guild_only()
+@commands.bot_has_permissions(manage_roles=True)
+async def sub_remove(ctx, location_code: str, *, event_type: Optional[str] = None):
+    code_raw = location_code.strip();
+    event = event_type.strip() if event_type else None
+    if not code_raw:
+        await ctx.send(embed=create_embed("Provide code or 'all'.", color=discord.Color.orange()));
+        return
+    bot_top_role_pos = ctx.guild.me.top_role.position
+    removed_subs = [];
+    failed_subs = [];
+    role_removal_errors = []
+    if code_raw.lower() == 'all' and event is None:  # Unsub ALL
+        current_subs = get_user_subscriptions(ctx.author.id)
+        if not current_subs:
+            await ctx.send(embed=create_embed("No subscriptions.", color=discord.Color.orange()));
+            return
+        if remove_all_subscriptions(ctx.author.id):
+            removed_subs.append("`all`");
+            loc_roles_to_check = {loc for loc, _ in current_subs}
+            for loc_code in loc_roles_to_check:
+                role = discord.utils.get(ctx.guild.roles, name=f"{loc_code} Alerts")
+                if role and role in ctx.author.roles and role.position < bot_top_role_pos:
+                    try:
+                        await ctx.author.remove_roles(role, reason="Unsub all")
+                    except Exception as e:
+                        role_removal_errors.append(f"`{role.name}` ({e})")
+                elif role and role in ctx.author.roles:
+                    role_removal_errors.append(f"`{role.name}` (Bot role low)")
+        else:
+            failed_subs.append("`all` (DB Error)")
+    else:  # Unsub specific
+        code = code_raw.upper();
+        event_db = event.lower() if event else None
+        if remove_subscription(ctx.author.id, code, event_db):
+            removed_subs.append(f"`{code}`" + (f" (`{event or 'All Events'}`)"))
+            remaining = [sub_code for sub_code, _ in get_user_subscriptions(ctx.author.id) if sub_code == code]
+            if not remaining:  # If no subs left for this code, try removing role
+                role = discord.utils.get(ctx.guild.roles, name=f"{code} Alerts")
+                if role and role in ctx.author.roles and role.position < bot_top_role_pos:
+                    try:
+                        await ctx.author.remove_roles(role, reason=f"Unsub last {code}")
+                    except Exception as e:
+                        role_removal_errors.append(f"`{role.name}` ({e})")
+                elif role and role in ctx.author.roles:
+                    role_removal_errors.append(f"`{role.name}` (Bot role low)")
+        else:
+            failed_subs.append(f"`{code}`" + (f" (`{event or 'All Events'}`)" + " (Not subbed?)"))
+    resp_parts = []
+    if removed_subs:
+        resp_parts.append(f"🗑️ Unsubscribed: {', '.join(removed_subs)}")
+    if failed_subs:
+        resp_parts.append(f"⚠️ Failed/Not Subbed: {', '.join(failed_subs)}")
+    if role_removal_errors:
+        resp_parts.append(f"❌ Role Errors: {', '.join(role_removal_errors)}")
+    await ctx.send(embed=create_embed("\n".join(resp_parts) if resp_parts else "No changes/Not subbed.",
+                                     title="Unsubscribe Results"))
+
+
+@subscribe_group.command(name='list', aliases=['show', 'mine'])
+async def sub_list(ctx):
+    """Lists your current alert subscriptions."""
+    subs = get_user_subscriptions(ctx.author.id)
+    if subs:
+        sub_lines = [f"- `{loc}`" + (f" (`{evt}`)" if evt else " (All)") for loc, evt in sorted(subs)];
+        await ctx.send(embed=create_embed("\n".join(sub_lines), title="📋 My Subscriptions"))
+    else:
+        await ctx.send(embed=create_embed("No subscriptions.", title="📋 My Subscriptions",
+                                         color=discord.Color.orange()))
+
+
+@commands.command(name='fetch', short_doc="Manually fetch NWS alerts (Owner Only).")
+@commands.check(check_is_owner)
+async def fetch(ctx):
+    logging.info(f"Manual fetch by owner {ctx.author} ({ctx.author.id})")
+    await ctx.send(embed=create_embed("Manual fetch triggered...", title="⚙️ Manual Fetch", color=discord.Color.gold()))
+    if not is_leader:
+        await ctx.send(embed=create_embed("This instance is on standby; the leader posts alerts.",
+                                         color=discord.Color.orange()));
+        return
+    if alert_processing_lock.locked():
+        await ctx.send(embed=create_embed("Processing ongoing.", color=discord.Color.orange()));
+        logging.warning(f"Manual fetch by {ctx.author} while locked.");
+        return
+    try:
+        async with alert_processing_lock:
+            processed_count = await process_new_alerts()
+        await ctx.send(
+            embed=create_embed(f"✅ Fetch complete. Queued {processed_count} new/updated alerts for posting.",
+                              title="⚙️ Manual Fetch Result", color=discord.Color.green()));
+        logging.info(f"Manual fetch completed. Processed {processed_count}.")
+    except Exception as e:
+        logging.exception(f"Manual fetch error by {ctx.author}: {e}");
+        error_id = await report_error(f"Manual fetch failed: {e}", traceback_info=traceback.format_exc());
+        await ctx.send(
+            embed=create_embed(f"❌ Error during fetch. Report ID: `{error_id}`", title="⚙️ Manual Fetch Error",
+                              color=discord.Color.red()))
+
+
+@commands.command(name='pipeline', hidden=True, short_doc="Shows alert pipeline queues and stage latency (Owner Only).")
+@commands.check(check_is_owner)
+async def pipeline_status(ctx):
+    if not alert_pipeline.running:
+        await ctx.send(embed=create_embed("Pipeline not started yet.", color=discord.Color.orange()));
+        return
+    lines = ["`stage    queue  busy   done  drop  err   avg ms   max ms  wait ms`"]
+    for st in alert_pipeline.snapshot():
+        lines.append(f"`{st['stage']:<8}{st['depth']:>3}/{st['maxsize']:<4}{st['active']:>2}/{st['concurrency']:<2}"
+                     f"{st['processed']:>6}{st['discarded']:>6}{st['errors']:>4}{st['avg_seconds'] * 1000:>9.1f}"
+                     f"{st['max_seconds'] * 1000:>9.1f}{st['avg_wait_seconds'] * 1000:>9.1f}`")
+    await ctx.send(embed=create_embed("\n".join(lines), title="🛠️ Alert Pipeline", color=discord.Color.blurple()))
+
+
+@commands.command(name='latency', hidden=True, short_doc="Shows NWS-to-Discord alert latency percentiles (Owner Only).")
+@commands.check(check_is_owner)
+async def latency_report(ctx, hours: int = 24):
+    hours = max(1, min(hours, settings.database_retention_days * 24))
+    if not is_leader:  # The leader records posts; read its histograms from the shared database
+        await asyncio.to_thread(load_latency_histograms)
+    now = time.time()
+    totals = alert_latency.window(hours, now, "total")
+    if not totals:
+        await ctx.send(embed=create_embed(f"No alerts posted in the last {hours}h.", title="⏱️ Alert Latency",
+                                         color=discord.Color.orange()));
+        return
+    feed = alert_latency.window(hours, now, "feed")
+    pipeline = alert_latency.window(hours, now, "pipeline")
+    lines = ["`severity      n    p50    p95    p99`"]
+    for severity in sorted(totals, key=lambda s: -SEVERITY_LEVELS.get(s, 0)):
+        hist = totals[severity]
+        lines.append(f"`{severity:<9}{hist.total:>6}" + "".join(
+            f"{format_duration(hist.quantile(q)):>7}" for q in (0.5, 0.95, 0.99)) + "`")
+    lines.append("")
+    lines.append("Median split by severity: NWS → feed / feed → Discord")
+    for severity in sorted(totals, key=lambda s: -SEVERITY_LEVELS.get(s, 0)):
+        feed_p50 = feed[severity].quantile(0.5) if severity in feed else None
+        pipeline_p50 = pipeline[severity].quantile(0.5) if severity in pipeline else None
+        lines.append(f"- {severity}: {format_duration(feed_p50)} / {format_duration(pipeline_p50)}")
+    await ctx.send(embed=create_embed("\n".join(lines), title=f"⏱️ Alert Latency (last {hours}h)",
+                                     color=discord.Color.blurple()))
+
+
+@commands.group(name='perf', hidden=True, invoke_without_command=True,
+                short_doc="Shows hot-path timings for the last 15 minutes (Owner Only).")
+@commands.check(check_is_owner)
+async def perf_group(ctx):
+    lines = ["`timer                n   p50 ms   p95 ms   p99 ms   max ms`"]
+    for name, summary in PERF.report():
+        if not summary["count"]:
+            continue
+        lines.append(f"`{name:<16}{summary['count']:>6}" + "".join(
+            f"{summary[key] * 1000:>9.1f}" for key in ("p50", "p95", "p99", "max")) + "`")
+    if len(lines) == 1:
+        lines.append("No timings recorded in the last 15 minutes.")
+    await ctx.send(embed=create_embed("\n".join(lines), title="🏎️ Hot Path (rolling 15 min)",
+                                     color=discord.Color.blurple()))
+
+
+@perf_group.command(name='profile', short_doc="Samples all thread stacks for N seconds (default 60).")
+async def perf_profile(ctx, seconds: int = 60):
+    global profile_running
+    if profile_running:
+        await ctx.send(embed=create_embed("A profile is already running.", color=discord.Color.orange()));
+        return
+    seconds = max(1, min(seconds, 600))
+    profile_running = True
+    await ctx.send(embed=create_embed(f"Sampling stacks for {seconds}s...", title="🔬 Profiler",
+                                     color=discord.Color.gold()))
+    try:
+        profiler = SamplingProfiler()
+        await asyncio.to_thread(profiler.run, seconds)
+    finally:
+        profile_running = False
+    hot = profiler.top_functions(10, thread_name="MainThread")
+    summary = f"{profiler.samples} samples over {seconds}s. Event loop self time:\n" + "\n".join(
+        f"`{count * 100 / max(1, profiler.samples):5.1f}%` {name}" for name, count in hot)
+    filename = f"nwsbot_profile_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.collapsed.txt"
+    destination = discord_error_channel_obj or ctx.channel
+    await destination.send(embed=create_embed(summary[:DISCORD_MAX_LENGTH], title="🔬 Profile (collapsed stacks)",
+                                             color=discord.Color.blurple()),
+                           file=discord.File(io.BytesIO(profiler.collapsed().encode("utf-8")), filename=filename))
+    if destination is not ctx.channel:
+        await ctx.send(embed=create_embed(f"Profile uploaded to {destination.mention}.", color=discord.Color.green()))
+
+
+@commands.command(name='shutdown', hidden=True, short_doc="Stops the bot script (Owner Only).")
+@commands.check(check_is_owner)
+async def shutdown(ctx):
+    logging.warning(f"Shutdown cmd from owner {ctx.author} ({ctx.author.id}).")
+    await ctx.send(embed=create_embed("Shutting down bot script...", title="🛑 Bot Shutdown",
+                                     color=discord.Color.orange()))
+    tasks_cancelled = []
+    if check_alerts_task and not check_alerts_task.done():
+        check_alerts_task.cancel();
+        tasks_cancelled.append("Check");
+    if cleanup_db_task and not cleanup_db_task.done():
+        cleanup_db_task.cancel();
+        tasks_cancelled.append("Cleanup");
+    if change_status_task and not change_status_task.done():
+        change_status_task.cancel();
+        tasks_cancelled.append("Status");
+    if expiry_task and not expiry_task.done():
+        expiry_task.cancel();
+        tasks_cancelled.append("Expiry");
+    # No YT task to cancel
+    if tasks_cancelled:
+        logging.info(f"Cancelled tasks: {', '.join(tasks_cancelled)}");
+        await asyncio.sleep(1)
+    await release_leader_lease()
+    await asyncio.to_thread(persist_runtime_state)
+    await close_http_session()
+    logging.info("Closing bot connection...");
+    await ctx.send(embed=create_embed("Goodbye!", title="🛑 Bot Shutdown Complete", color=discord.Color.dark_grey()));
+    await bot.close();
+    print("Bot closed via !shutdown.")
+
+
+@commands.command(name='restart', hidden=True, short_doc="Stops bot for external restart (Owner Only).")
+@commands.check(check_is_owner)
+async def restart(ctx):
+    logging.warning(f"Restart cmd from owner {ctx.author} ({ctx.author.id}).")
+    await ctx.send(embed=create_embed("Attempting restart...\n(External tool must restart script)",
+                                     title="🔄 Bot Restart", color=discord.Color.orange()))
+    tasks_cancelled = []
+    if check_alerts_task and not check_alerts_task.done():
+        check_alerts_task.cancel();
+        tasks_cancelled.append("Check");
+    if cleanup_db_task and not cleanup_db_task.done():
+        cleanup_db_task.cancel();
+        tasks_cancelled.append("Cleanup");
+    if change_status_task and not change_status_task.done():
+        change_status_task.cancel();
+        tasks_cancelled.append("Status");
+    if expiry_task and not expiry_task.done():
+        expiry_task.cancel();
+        tasks_cancelled.append("Expiry");
+    # No YT task to cancel
+    if tasks_cancelled:
+        logging.info(f"Cancelled tasks: {', '.join(tasks_cancelled)}");
+        await asyncio.sleep(1)
+    await release_leader_lease()
+    await asyncio.to_thread(persist_runtime_state)
+    await close_http_session()
+    logging.info("Closing connection for restart...");
+    await bot.close();
+    print("Bot closed via !restart.")
+
+
+@commands.command(name='reboot', hidden=True, short_doc="Reboots host machine (Owner Only - RISKY).")
+@commands.check(check_is_owner)
+async def reboot_system(ctx):
+    logging.warning(f"SYS REBOOT by owner {ctx.author} ({ctx.author.id}).")
+    await ctx.send(embed=create_embed("Attempting **host reboot**. Needs `sudo`.", title="🚨 System Reboot 🚨",
+                                     color=discord.Color.dark_red()))
+    try:
+        result = subprocess.run(['sudo', 'reboot'], check=False, capture_output=True, text=True, timeout=15)
+    except Exception as e:
+        logging.exception(f"Reboot exception: {e}");
+        error_id = await report_error(f"Reboot failed: {e}", traceback_info=traceback.format_exc());
+        await ctx.send(
+            embed=create_embed(f"Reboot error (ID: `{error_id}`).\n`{type(e).__name__}: {e}`", title="❌ Reboot Error",
+                              color=discord.Color.red()));
+        return
+    log_msg = f"RC={result.returncode}, Out={result.stdout[:100]}, Err={result.stderr[:200]}";
+    if result.returncode == 0:
+        logging.info(f"Reboot success? {log_msg}")
+    else:
+        logging.error(f"Reboot failed. {log_msg}");
+        await ctx.send(
+            embed=create_embed(f"Reboot fail (RC {result.returncode}).\n```\n{result.stderr or 'N/A'}\n```",
+                              title="❌ Reboot Failed", color=discord.Color.red()))
+
+
+@commands.command(name='sysshutdown', hidden=True, short_doc="Shuts down host machine (Owner Only - RISKY).")
+@commands.check(check_is_owner)
+async def shutdown_system(ctx):
+    logging.warning(f"SYS SHUTDOWN by owner {ctx.author} ({ctx.author.id}).")
+    await ctx.send(embed=create_embed("Attempting **host shutdown NOW**. Needs `sudo`.", title="🚨 System Shutdown 🚨",
+                                     color=discord.Color.dark_red()))
+    try:
+        result = subprocess.run(['sudo', 'shutdown', 'now'], check=False, capture_output=True, text=True, timeout=15)
+    except Exception as e:
+        logging.exception(f"Shutdown exception: {e}");
+        error_id = await report_error(f"Sys Shutdown failed: {e}", traceback_info=traceback.format_exc());
+        await ctx.send(
+            embed=create_embed(f"Shutdown error (ID: `{error_id}`).\n`{type(e).__name__}: {e}`",
+                              title="❌ Shutdown Error", color=discord.Color.red()));
+        return
+    log_msg = f"RC={result.returncode}, Out={result.stdout[:100]}, Err={result.stderr[:200]}"
+    if result.returncode == 0:
+        logging.info(f"Shutdown success? {log_msg}")
+    else:
+        logging.error(f"Shutdown failed. {log_msg}");
+        await ctx.send(
+            embed=create_embed(f"Shutdown fail (RC {result.returncode}).\n```\n{result.stderr or 'N/A'}\n```",
+                              title="❌ Shutdown Failed", color=discord.Color.red()))
+
+
+@commands.group(name='filter', invoke_without_command=True, short_doc="Manage alert filters (Owner Only).")
+@commands.check(check_is_owner)
+async def filter_group(ctx):
+    await ctx.send_help(ctx.command)
+
+
+def filter_destination(channel: Optional[discord.TextChannel]) -> str:
+    return str(channel.id) if channel else DEFAULT_DESTINATION
+
+
+def filter_scope_note(destination: str) -> str:
+    """Posting only ever filters through the alert channel's set; other channels' overrides only shape !wxalerts."""
+    if destination in (DEFAULT_DESTINATION, str(settings.channel_id)):
+        return ""
+    return f"\nAlerts are posted to <#{settings.channel_id}>, so this only changes `!wxalerts` in <#{destination}>."
+
+
+async def apply_filter_change(ctx, destination: str, config: FilterConfig, summary: str) -> bool:
+    """Compiles and swaps in a destination's new filters, then persists them."""
+    try:
+        filter_registry.update(destination, config)
+    except FilterRuleError as e:
+        await ctx.send(embed=create_embed(f"Invalid rule: {e}", color=discord.Color.red()))
+        return False
+    save_filter_registry()
+    logging.warning(f"Filters for '{destination}' changed by {ctx.author}: {summary}")
+    await ctx.send(embed=create_embed(f"✅ {summary}{filter_scope_note(destination)}", color=discord.Color.green()))
+    return True
+
+
+@filter_group.command(name='show', short_doc="Shows current filter settings.")
+@commands.check(check_is_owner)
+async def show_filters(ctx, channel: Optional[discord.TextChannel] = None):
+    destination = filter_destination(channel)
+    cfg = filter_registry.get(destination).config
+    blocked = cfg.blocked_event_types
+    lines = [f"**Current Filters ({channel.mention if channel else 'default'}):**",
+             f"- Min Severity: `{cfg.min_severity}`",
+             f"- Min Certainty: `{cfg.min_certainty}`", f"- Min Urgency: `{cfg.min_urgency}`",
+             f"- Blocked Events ({len(blocked)}): `{'`, `'.join(sorted(blocked)) if blocked else 'None'}`"]
+    if cfg.rules:
+        lines.append(f"- Rules ({len(cfg.rules)}):")
+        lines.extend(f"  {i}. `{rule}`" for i, rule in enumerate(cfg.rules, 1))
+    else:
+        lines.append("- Rules: `None`")
+    others = [d for d in filter_registry.destinations() if d != DEFAULT_DESTINATION]
+    if others and not channel:
+        lines.append(f"- Channel overrides: {', '.join(f'<#{d}>' for d in others)}")
+    note = filter_scope_note(destination)
+    if note:
+        lines.append(note.strip())
+    await ctx.send(embed=create_embed("\n".join(lines), title="🔎 Alert Filters", color=discord.Color.blue()))
+
+
+@filter_group.command(name='set', short_doc="Set filter level (severity/certainty/urgency).")
+@commands.check(check_is_owner)
+async def set_filter(ctx, channel: Optional[discord.TextChannel], filter_type: str.lower, *, value: str):
+    value_title = value.title()
+    tables = {'severity': SEVERITY_LEVELS, 'certainty': CERTAINTY_LEVELS, 'urgency': URGENCY_LEVELS}
+    if filter_type not in tables:
+        await ctx.send(embed=create_embed("Invalid type. Use 'severity', 'certainty', or 'urgency'.",
+                          color=discord.Color.red()));
+        return
+    if value_title not in tables[filter_type]:
+        await ctx.send(embed=create_embed(f"Invalid {filter_type}. Options: {', '.join(tables[filter_type].keys())}",
+                          color=discord.Color.red()));
+        return
+    destination = filter_destination(channel)
+    cfg = filter_registry.config_for(destination)
+    setattr(cfg, f"min_{filter_type}", value_title)
+    if await apply_filter_change(ctx, destination, cfg, f"Min {filter_type} updated to `{value_title}`."):
+        await show_filters(ctx, channel)
+
+
+@filter_group.command(name='addblock', short_doc="Add event type to blocklist.")
+@commands.check(check_is_owner)
+async def add_block(ctx, channel: Optional[discord.TextChannel] = None, *, event_name: str):
+    event_lower = event_name.lower().strip();
+    if not event_lower:
+        await ctx.send(embed=create_embed("Provide event name.", color=discord.Color.orange()));
+        return
+    destination = filter_destination(channel)
+    cfg = filter_registry.config_for(destination)
+    if event_lower in cfg.blocked_event_types:
+        await ctx.send(embed=create_embed(f"`{event_name}` already blocked.", color=discord.Color.orange()))
+        return
+    cfg.blocked_event_types.add(event_lower)
+    if await apply_filter_change(ctx, destination, cfg, f"`{event_name}` added to blocklist."):
+        await show_filters(ctx, channel)
+
+
+@filter_group.command(name='removeblock', aliases=['rmblock'], short_doc="Remove event type from blocklist.")
+@commands.check(check_is_owner)
+async def remove_block(ctx, channel: Optional[discord.TextChannel] = None, *, event_name: str):
+    event_lower = event_name.lower().strip();
+    if not event_lower:
+        await ctx.send(embed=create_embed("Provide event name.", color=discord.Color.orange()));
+        return
+    destination = filter_destination(channel)
+    cfg = filter_registry.config_for(destination)
+    if event_lower not in cfg.blocked_event_types:
+        await ctx.send(embed=create_embed(f"`{event_name}` not found in blocklist.",
+                          color=discord.Color.orange()))
+        return
+    cfg.blocked_event_types.remove(event_lower)
+    if await apply_filter_change(ctx, destination, cfg, f"`{event_name}` removed from blocklist."):
+        await show_filters(ctx, channel)
+
+
+@filter_group.group(name='rule', invoke_without_command=True, short_doc="Manage filter rules.")
+@commands.check(check_is_owner)
+async def rule_group(ctx):
+    """Rules: `allow|block key=value ...` with keys event, severity, certainty, urgency, areas, hours, type.
+    First matching rule wins, e.g. `!filter rule add allow event="Tornado*"`."""
+    await ctx.send_help(ctx.command)
+
+
+@rule_group.command(name='add', short_doc="Append a rule. Usage: !filter rule add [#channel] <rule>")
+@commands.check(check_is_owner)
+async def add_rule(ctx, channel: Optional[discord.TextChannel] = None, *, rule: str):
+    destination = filter_destination(channel)
+    cfg = filter_registry.config_for(destination)
+    cfg.rules.append(rule.strip())
+    if await apply_filter_change(ctx, destination, cfg, f"Rule {len(cfg.rules)} added."):
+        await show_filters(ctx, channel)
+
+
+@rule_group.command(name='remove', aliases=['rm'], short_doc="Remove rule by number.")
+@commands.check(check_is_owner)
+async def remove_rule(ctx, channel: Optional[discord.TextChannel] = None, number: int = 0):
+    destination = filter_destination(channel)
+    cfg = filter_registry.config_for(destination)
+    if not 1 <= number <= len(cfg.rules):
+        await ctx.send(embed=create_embed(f"Rule number must be 1-{len(cfg.rules)}.", color=discord.Color.orange()))
+        return
+    removed = cfg.rules.pop(number - 1)
+    if await apply_filter_change(ctx, destination, cfg, f"Rule {number} removed: `{removed}`"):
+        await show_filters(ctx, channel)
+
+
+@rule_group.command(name='clear', short_doc="Drop a channel's filter override, or all default rules.")
+@commands.check(check_is_owner)
+async def clear_rules(ctx, channel: Optional[discord.TextChannel] = None):
+    if channel:
+        if filter_registry.remove(str(channel.id)):
+            save_filter_registry()
+            logging.warning(f"Filter override for {channel.id} removed by {ctx.author}.")
+            await ctx.send(embed=create_embed(f"✅ {channel.mention} now uses the default filters.",
+                                             color=discord.Color.green()))
+        else:
+            await ctx.send(embed=create_embed(f"{channel.mention} has no override.", color=discord.Color.orange()))
+        return
+    cfg = filter_registry.config_for(DEFAULT_DESTINATION)
+    cfg.rules = []
+    await apply_filter_change(ctx, DEFAULT_DESTINATION, cfg, "Default rules cleared.")
+
+
+@commands.command(name='wxalerts', short_doc="Look up active alerts for UGC/FIPS codes.")
+async def wxalerts(ctx, *, location_codes: str):
+    codes_to_check = frozenset(code.strip().upper() for code in location_codes.split() if code.strip())
+    if not codes_to_check:
+        await ctx.send(embed=create_embed("Provide UGC/FIPS codes.", title="⚠️ Missing Codes",
+                          color=discord.Color.orange()));
+        return
+    if len(codes_to_check) > MAX_LOOKUP_CODES:
+        await ctx.send(embed=create_embed(f"Max {MAX_LOOKUP_CODES} codes.", title="⚠️ Too Many Codes",
+                          color=discord.Color.orange()));
+        return
+    snapshot, stale_age = await get_nws_alerts()
+    if snapshot is None:
+        await ctx.send(embed=create_embed("Failed fetch.", title="❌ Lookup Failed", color=discord.Color.red()))
+        return
+    result = lookup_alerts(snapshot, codes_to_check, filter_registry.get(ctx.channel.id))
+    if not result.alerts:
+        await ctx.send(embed=create_embed(f"No active alerts matching codes & filters.", title="✅ Lookup Complete",
+                          color=discord.Color.green()));
+        return
+    logging.info(f"Found {len(result.alerts)} alerts for lookup by {ctx.author}. Codes: {sorted(codes_to_check)}")
+    view = LookupView(ctx.author.id, result, stale_age)
+    if result.page_count > 1:
+        view.message = await ctx.send(embed=view.embed(), view=view)
+    else:
+        view.stop()
+        await ctx.send(embed=view.embed())
+
+
+@commands.command(name='post', hidden=True, short_doc="Make bot say something (Owner Only).")
+@commands.check(check_is_owner)
+async def post_message(ctx, *, message_content: str):
+    if discord_channel_obj:
+        try:
+            # Fixed accidental line break in variable name
+            if len(message_content) > 2000:
+                await ctx.send(embed=create_embed("Msg too long (>2000).", color=discord.Color.orange()))
+                return
+            await discord_channel_obj.send(message_content)
+            await ctx.message.add_reaction('✅')
+            logging.info(f"Owner {ctx.author} posted msg via !post.")
+        except discord.Forbidden:
+            await ctx.send(embed=create_embed("Error: Bot lacks permission.", color=discord.Color.red()))
+        except Exception as e:
+            logging.exception(f"Error in !post: {e}")
+            error_id = await report_error(f"!post fail: {e}", traceback_info=traceback.format_exc())
+            await ctx.send(embed=create_embed(f"Failed. Error ID: `{error_id}`", color=discord.Color.red()))
+    else:
+        await ctx.send(embed=create_embed("Alert channel not found.", color=discord.Color.red()))
+
+
+@commands.command(name='announce', hidden=True, short_doc="Sends announcement embed (Owner Only).")
+@commands.check(check_is_owner)
+async def make_announcement(ctx, *, content: str):
+    if not discord_channel_obj:
+        await ctx.send(embed=create_embed("Alert channel not found.", color=discord.Color.red()));
+        return
+    allowed_mentions = discord.AllowedMentions.none();
+    mention_text = None
+    if '@everyone' in content:
+        allowed_mentions.everyone = True;
+        mention_text = '@everyone'
+    if '@here' in content:
+        allowed_mentions.here = True;
+        mention_text = '@here'
+    embed = create_embed(description=content, title="📢 Announcement", color=discord.Color.gold());
+    embed.set_author(name=f"Sent by {ctx.author.display_name}",
+                     icon_url=ctx.author.display_avatar.url if ctx.author.display_avatar else None)
+    try:
+        await discord_channel_obj.send(content=mention_text, embed=embed, allowed_mentions=allowed_mentions);
+        await ctx.message.add_reaction('✅');
+        logging.info(f"Sent announcement by {ctx.author}: {content[:100]}...")
+    except discord.Forbidden:
+        await ctx.send(embed=create_embed("Error: Bot lacks permission.", color=discord.Color.red()))
+    except Exception as e:
+        logging.exception(f"Error in !announce: {e}");
+        error_id = await report_error(f"!announce fail: {e}", traceback_info=traceback.format_exc());
+        await ctx.send(embed=create_embed(f"Failed. Error ID: `{error_id}`", color=discord.Color.red()))
+
+
+# YouTube commands removed
+@commands.command(name='stats', short_doc="Shows posted alert statistics.")
+async def alert_stats(ctx):
+    stats_data = {};
+    total_count = 0;
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        cursor = conn.cursor();
+        cursor.execute("SELECT event_type, COUNT(*) FROM posted_alerts WHERE reissue_of IS NULL GROUP BY event_type ORDER BY COUNT(*) DESC");
+        stats_data = {row[0] if row[0] else 'N/A': row[1] for row in cursor.fetchall()};
+        cursor.execute("SELECT COUNT(*) FROM posted_alerts WHERE reissue_of IS NULL");
+        total_count = cursor.fetchone()[0];
+    except Exception as e:
+        logging.exception(f"Error getting stats: {e}");
+        error_id = await report_error(f"Stats DB error: {e}", traceback_info=traceback.format_exc());
+        await ctx.send(embed=create_embed(f"Error fetching stats. ID: `{error_id}`", color=discord.Color.red()));
+        return
+    finally:
+        if conn:
+            conn.close()
+    if not stats_data:
+        await ctx.send(embed=create_embed("No stats yet.", title="📊 Alert Stats"));
+        return
+    desc = f"**Total Alerts Recorded:** {total_count}\n\n**Breakdown by Type:**\n";
+    lines = [f"- `{event}`: {count}" for event, count in stats_data.items()]
+    desc += "\n".join(lines[:20]);
+    if len(lines) > 20:
+        desc += "\n..."
+    await ctx.send(embed=create_embed(desc, title="📊 Alert Statistics"))
+
+
+@commands.command(name='recent', short_doc="Shows recently posted alerts.")
+async def recent_alerts(ctx, count: int = 5):
+    if not 1 <= count <= 10:
+        await ctx.send(embed=create_embed("Count 1-10.", color=discord.Color.orange()));
+        return
+    alerts = [];
+    conn = None
+    try:
+        conn = sqlite3.connect(settings.database_file);
+        conn.row_factory = sqlite3.Row;
+        cursor = conn.cursor();
+        cursor.execute("SELECT nws_id, first_posted_utc, event_type FROM posted_alerts WHERE reissue_of IS NULL ORDER BY first_posted_utc DESC LIMIT ?",
+                       (count,));
+        alerts = [dict(row) for row in cursor.fetchall()];
+    except Exception as e:
+        logging.exception(f"Error getting recent: {e}");
+        error_id = await report_error(f"Recent DB error: {e}", traceback_info=traceback.format_exc());
+        await ctx.send(embed=create_embed(f"Error fetching recent. ID: `{error_id}`",
+                          color=discord.Color.red()));
+        return
+    finally:
+        if conn:
+            conn.close()
+    if not alerts:
+        await ctx.send(embed=create_embed("No recent alerts found.", title="🕒 Recent Alerts"));
+        return
+    desc_lines = []
+
+    def format_t(ts):
+        return f"<t:{int(datetime.fromisoformat(ts).timestamp())}:R>" if ts else 'Invalid Time'
+
+    for alert in alerts:
+        ts_fmt = format_t(alert.get('first_posted_utc'));
+        desc_lines.append(
+            f"- `{alert.get('event_type', 'N/A')}` ({ts_fmt}) - ID: `{alert.get('nws_id', 'N/A')[-10:]}...`")
+    await ctx.send(embed=create_embed("\n".join(desc_lines), title=f"🕒 Last {len(alerts)} Recorded Alerts"))
+
+
+HISTORY_PAGE_SIZE = 10
+
+
+class HistoryView(discord.ui.View):
+    """Newer/Older buttons over a location's post history; each page is a keyset query, never an OFFSET."""
+
+    def __init__(self, author_id: int, location_code: str, days: int, event_type: Optional[str],
+                 guild_id: Optional[int]):
+        super().__init__(timeout=300)
+        self.author_id = author_id
+        self.location_code = location_code
+        self.days = days
+        self.event_type = event_type
+        self.guild_id = guild_id
+        self.since_utc = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat(timespec='seconds')
+        self.cursors: List[Optional[Tuple[str, str]]] = [None]  # Start key of each page so far (None = newest)
+        self.rows: List[Dict] = []
+        self.message: Optional[discord.Message] = None
+
+    async def load(self):
+        rows = await asyncio.to_thread(get_location_history, self.location_code, self.since_utc, self.event_type,
+                                       self.cursors[-1], HISTORY_PAGE_SIZE + 1)
+        self.rows = rows[:HISTORY_PAGE_SIZE]
+        self.newer.disabled = len(self.cursors) == 1
+        self.older.disabled = len(rows) <= HISTORY_PAGE_SIZE
+
+    def embed(self) -> discord.Embed:
+        lines = []
+        for row in self.rows:
+            posted = int(datetime.fromisoformat(row['posted_utc']).timestamp())
+            link = ""
+            if self.guild_id and row.get('discord_message_id'):
+                link = (f" [post](https://discord.com/channels/{self.guild_id}/"
+                        f"{row.get('thread_id') or settings.channel_id}/{row['discord_message_id']})")
+            lines.append(f"- <t:{posted}:f> `{row.get('event_type') or 'N/A'}` ({row.get('severity') or 'N/A'}){link}")
+        scope = f"last {self.days} day(s)" + (f", `{self.event_type}`" if self.event_type else "")
+        embed = create_embed("\n".join(lines) or f"No alerts posted for `{self.location_code}` in the {scope}.",
+                             title=f"📜 Alert History for {self.location_code}")
+        embed.set_footer(text=f"Page {len(self.cursors)} • {scope.replace('`', '')}")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.author_id
+
+    @discord.ui.button(label="◀ Newer", style=discord.ButtonStyle.secondary)
+    async def newer(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cursors.pop()
+        await self.load()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="Older ▶", style=discord.ButtonStyle.secondary)
+    async def older(self, interaction: discord.Interaction, button: discord.ui.Button):
+        last = self.rows[-1]
+        self.cursors.append((last['posted_utc'], last['nws_id']))
+        await self.load()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+
+@commands.command(name='history', short_doc="Shows alerts posted for a UGC/FIPS code over recent days.")
+async def location_history(ctx, location_code: str, days: Optional[int] = None, *, event_type: Optional[str] = None):
+    # Optional[int] lets the converter skip `days`, so `!history TXC201 Tornado Warning` reads as an event type
+    if days is None:
+        days = 7
+    if not 1 <= days <= settings.database_retention_days:
+        await ctx.send(embed=create_embed(f"Days 1-{settings.database_retention_days}.",
+                                         color=discord.Color.orange()));
+        return
+    view = HistoryView(ctx.author.id, location_code.strip().upper(), days,
+                       event_type.strip() if event_type else None, ctx.guild.id if ctx.guild else None)
+    await view.load()
+    view.message = await ctx.send(embed=view.embed(), view=view)
+
+
+@commands.command(name='vtec', short_doc="Lists active VTEC events for an NWS office.")
+async def vtec_events(ctx, office: str):
+    office = office.strip().upper()
+    if len(office) == 3:
+        office = f"K{office}"
+    if len(office) != 4 or not office.isalpha():
+        await ctx.send(embed=create_embed("Provide a 3 or 4 letter office id (e.g. `OUN` or `KOUN`).",
+                                         color=discord.Color.orange()));
+        return
+    events = get_active_vtec_events(office)
+    if not events:
+        await ctx.send(embed=create_embed(f"No active VTEC events for `{office}`.", title="📡 VTEC Events"));
+        return
+    lines = []
+    for event in events[:MAX_LOOKUP_RESULTS]:
+        link = (f" [post](https://discord.com/channels/{ctx.guild.id}/{settings.channel_id}/{event['discord_message_id']})"
+                if ctx.guild and event.get('discord_message_id') else "")
+        lines.append(f"- `{event['phenomena']}.{event['significance']}.{event['etn']:04d}` "
+                     f"{event.get('event_type') or 'N/A'} ({event['state']}){link}")
+    await ctx.send(embed=create_embed("\n".join(lines), title=f"📡 Active VTEC Events for {office}"))
+
+
+# --- Event Handlers ---
+async def on_ready():
+    logging.info(f'Discord bot logged in as {bot.user.name} ({bot.user.id})');
+    print(f'Discord bot logged in as {bot.user.name}')
+    global discord_channel_obj, discord_error_channel_obj, discord_changelog_channel_obj
+    # Fetch Discord channel objects
+    if settings.channel_id:
+        try:
+            discord_channel_obj = bot.get_channel(settings.channel_id) or await bot.fetch_channel(
+                settings.channel_id)
+        except Exception as e:
+            logging.error(f"Failed fetch alert channel {settings.channel_id}: {e}")
+        if not discord_channel_obj:
+            logging.error(f"Could not find alert channel: {settings.channel_id}")
+    if settings.error_channel_id:
+        try:
+            discord_error_channel_obj = bot.get_channel(settings.error_channel_id) or await bot.fetch_channel(
+                settings.error_channel_id)
+        except Exception as e:
+            logging.error(f"Failed fetch error channel {settings.error_channel_id}: {e}")
+        if not discord_error_channel_obj:
+            logging.warning(f"Could not find error channel: {settings.error_channel_id}")
+        else:
+            await discord_error_channel_obj.send(
+                embed=create_embed(f"Bot v{SCRIPT_VERSION} connected.", title="✅ Bot Online",
+                                  color=discord.Color.green()))
+    if settings.changelog_channel_id:
+        try:
+            discord_changelog_channel_obj = bot.get_channel(
+                settings.changelog_channel_id) or await bot.fetch_channel(settings.changelog_channel_id)
+        except Exception as e:
+            logging.error(f"Failed fetch changelog channel {settings.changelog_channel_id}: {e}")
+        if not discord_changelog_channel_obj:
+            logging.warning(f"Could not find changelog channel: {settings.changelog_channel_id}.")
+
+    # --- Post Changelog If New Version ---
+    if settings.changelog_channel_id and discord_changelog_channel_obj:
+        try:
+            last_posted_version = get_bot_state('last_changelog_version')
+            if SCRIPT_VERSION != last_posted_version:
+                logging.info(f"New version ({SCRIPT_VERSION} vs {last_posted_version}). Posting changelog.")
+                changelog_text = "\n".join(
+                    [f"- {item}" for item in CHANGELOGS.get(SCRIPT_VERSION, ["No specific changes listed for this version."])])
+                await discord_changelog_channel_obj.send(
+                    embed=create_embed(changelog_text, title=f"📢 Changelog v{SCRIPT_VERSION}", color=discord.Color.gold()))
+                set_bot_state('last_changelog_version', SCRIPT_VERSION)
+        except Exception as e:
+            logging.exception(f"Failed post changelog: {e}")
+
+    # on_ready fires again after every reconnect; start the background tasks only once
+    if check_alerts_task is None:
+        await setup_tasks()
+        logging.info('Tasks setup complete')
+
+
+check_alerts_task = cleanup_db_task = change_status_task = leader_lease_task = expiry_task = None
+
+
+async def setup_tasks():
+    global check_alerts_task, cleanup_db_task, change_status_task, leader_lease_task, expiry_task
+    if settings.ha_backend != "none":
+        leader_lease_task = bot.loop.create_task(maintain_leader_lease())
+    check_alerts_task = bot.loop.create_task(check_alerts())
+    if settings.snapshot_save_seconds > 0:
+        bot.loop.create_task(save_runtime_state_periodically())
+    if settings.metrics_enabled:
+        bot.loop.create_task(monitor_event_loop_lag())
+        await start_metrics_server()
+    if settings.api_enabled:
+        await start_alert_api()
+    if settings.output_mode == "webhook" and discord_channel_obj:
+        await setup_webhook_pool()
+    cleanup_db_task = bot.loop.create_task(cleanup_database())
+    change_status_task = bot.loop.create_task(change_status())
+    if settings.expiry_enabled:
+        expiry_task = bot.loop.create_task(expire_posted_alerts())
+
+# --- Feed Fetching ---
+http_session: Optional[aiohttp.ClientSession] = None  # Shared by feed fetches; created on first use
+feed_breakers: Dict[str, CircuitBreaker] = {}  # One per feed URL
+RETRYABLE_STATUSES = {0, 429, 500, 502, 503, 504}
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """The pooled session for feed requests, with connect/read timeouts from settings."""
+    global http_session
+    if http_session is None or http_session.closed:
+        timeout = aiohttp.ClientTimeout(connect=settings.fetch_connect_timeout,
+                                        sock_read=settings.fetch_read_timeout)
+        http_session = aiohttp.ClientSession(timeout=timeout, headers={'User-Agent': settings.user_agent})
+    return http_session
+
+
+async def close_http_session():
+    global http_session, webhook_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    http_session = None
+    if webhook_session is not None and not webhook_session.closed:
+        await webhook_session.close()
+    webhook_session = None
+
+
+def feed_breaker(url: str) -> CircuitBreaker:
+    breaker = feed_breakers.get(url)
+    if breaker is None:
+        breaker = feed_breakers[url] = CircuitBreaker(settings.breaker_failure_threshold,
+                                                      settings.breaker_reset_seconds,
+                                                      settings.breaker_max_reset_seconds)
+    return breaker
+
+
+def worst_feed_breaker() -> Optional[CircuitBreaker]:
+    """The breaker furthest from closed (open, then half-open) across feed URLs, for status and metrics."""
+    if not feed_breakers:
+        return None
+    return max(feed_breakers.values(), key=lambda breaker: STATE_VALUES[breaker.state])
+
+
+def feed_breaker_state() -> int:
+    breaker = worst_feed_breaker()
+    return STATE_VALUES[breaker.state] if breaker else 0
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """A Retry-After header in seconds (delta-seconds or HTTP-date form)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+async def fetch_feed_once(url: str, headers: Dict[str, str], validators: Optional[Dict[str, str]]
+                          ) -> Tuple[int, Optional[str], Dict[str, str], Optional[float]]:
+    """One GET attempt; returns ``(status, text, validators, retry_after)``."""
+    started = time.perf_counter()
+    try:
+        async with get_http_session().get(url, headers=headers) as response:
+            if response.status == 304:
+                FEED_FETCHES.labels("304").inc()
+                return 304, None, validators or {}, None
+            if response.status == 200:
+                new_validators = {k: v for k, v in (("etag", response.headers.get("ETag")),
+                                                    ("last_modified", response.headers.get("Last-Modified"))) if v}
+                body = await response.read()
+                FEED_FETCHES.labels("200").inc()
+                FEED_BYTES.inc(len(body))
+                FEED_SIZE_BYTES.observe(len(body))
+                return 200, await response.text(), new_validators, None
+            FEED_FETCHES.labels("http_error").inc()
+            logging.error("NWS fetch failed: %s", response.status)
+            return response.status, None, validators or {}, retry_after_seconds(response.headers.get("Retry-After"))
+    except Exception as e:
+        FEED_FETCHES.labels("error").inc()
+        logging.error("NWS fetch error: %s", e or type(e).__name__)
+        return 0, None, validators or {}, None
+    finally:
+        elapsed = time.perf_counter() - started
+        FEED_FETCH_SECONDS.observe(elapsed)
+        PERF.observe("fetch", elapsed)
+
+
+async def fetch_feed_document(url: str, validators: Optional[Dict[str, str]] = None
+                              ) -> Tuple[int, Optional[str], Dict[str, str]]:
+    """GETs a feed, conditionally if validators are given, retrying transient failures.
+
+    Network errors, 429 and 5xx are retried with jittered exponential backoff (honouring Retry-After) while
+    they fit in the retry budget. The URL's circuit breaker counts a fetch that still fails as one failure;
+    while it is open no request is made at all.
+
+    Returns ``(status, text, validators)``: status 304 means unchanged (text None), 0 a network error or an
+    open breaker.
+    """
+    breaker = feed_breaker(url)
+    if not breaker.allow():
+        FEED_FETCHES.labels("breaker_open").inc()
+        logging.warning("NWS fetch skipped: circuit open for %s (next probe in %.0fs)", url, breaker.retry_in())
+        return 0, None, validators or {}
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers['If-None-Match'] = validators["etag"]
+        if validators.get("last_modified"):
+            headers['If-Modified-Since'] = validators["last_modified"]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.fetch_retry_budget_seconds
+    # A half-open probe gets a single attempt, so a still-failing upstream reopens the breaker quickly
+    delays = backoff_delays(settings.fetch_backoff_seconds, settings.fetch_retry_budget_seconds,
+                            0 if breaker.probing else settings.fetch_max_retries)
+    while True:
+        status, text, new_validators, retry_after = await fetch_feed_once(url, headers, validators)
+        if status in (200, 304):
+            breaker.record_success()
+            return status, text, new_validators
+        delay = next(delays, None) if status in RETRYABLE_STATUSES else None
+        if delay is not None and retry_after is not None:
+            delay = max(delay, retry_after)
+        if delay is None or loop.time() + delay > deadline:
+            breaker.record_failure()
+            if breaker.state == OPEN:
+                logging.error("NWS feed circuit open for %s after %d failed fetches; retrying in %.0fs", url,
+                              breaker.consecutive_failures, breaker.retry_in())
+            return status, None, new_validators
+        FEED_RETRIES.inc()
+        logging.warning("Retrying NWS fetch in %.1fs (status %s)", delay, status)
+        await asyncio.sleep(delay)
+
+
+def build_alert_embed(alert_data: AlertRecord, detail: Optional[CapDetail] = None) -> discord.Embed:
+    """Renders an extracted alert as the embed posted to the alert channel, with its CAP details if known."""
+    color = discord.Color.red() if alert_data.severity_level >= SEVERITY_LEVELS['Severe'] else discord.Color.gold()
+    if detail and detail.description:
+        description = detail.description[:4000]
+    else:
+        description = alert_data.summary[:2000] if alert_data.summary else "No details available"
+    embed = discord.Embed(
+        title=f"⚠️ {alert_data.title}"[:256],
+        description=description,
+        color=color
+    )
+
+    # Add fields
+    embed.add_field(name="Event Type", value=alert_data.event, inline=True)
+    embed.add_field(name="Severity", value=alert_data.severity, inline=True)
+    embed.add_field(name="Urgency", value=alert_data.urgency, inline=True)
+
+    if alert_data.expires:
+        embed.add_field(name="Expires", value=f"<t:{alert_data.expires}:R>", inline=True)
+    if detail and detail.instruction:
+        embed.add_field(name="Instructions", value=detail.instruction[:1024], inline=False)
+    return embed
+
+
+async def send_alert_message(alert_data: AlertRecord, vtec_codes: List[Tuple[VtecCode, Tuple]],
+                             embed: Optional[discord.Embed] = None, content: Optional[str] = None):
+    """Posts an alert, replying to (or in a thread on) the first message of an ongoing VTEC event.
+
+    Returns ``(message, thread_id)``; thread_id is only set when a thread was created or used.
+    """
+    embed = embed or build_alert_embed(alert_data)
+    allowed_mentions = discord.AllowedMentions(roles=True, everyone=False, users=False)
+    anchor = None
+    if settings.vtec_threading != "off":
+        for code, key in vtec_codes:
+            if code.action == "NEW":
+                continue
+            event = get_vtec_event(key)
+            if event and event.get("discord_message_id"):
+                anchor = event
+                break
+    if anchor:
+        embed.set_footer(text=f"{vtec_codes[0][0].action_name} • follow-up to an earlier post")
+        try:
+            if settings.vtec_threading == "thread":
+                thread = None
+                if anchor.get("thread_id"):
+                    thread = discord_channel_obj.get_thread(anchor["thread_id"])
+                if thread is None:
+                    thread = await discord_channel_obj.get_partial_message(anchor["discord_message_id"]).create_thread(
+                        name=f"{anchor.get('event_type') or alert_data.event} {anchor['office']} #{anchor['etn']}"[:100])
+                return await post_alert_message(thread, content, embed, allowed_mentions), thread.id
+            reference = discord.MessageReference(message_id=anchor["discord_message_id"],
+                                                 channel_id=discord_channel_obj.id, fail_if_not_exists=False)
+            return await discord_channel_obj.send(content=content, embed=embed, reference=reference,
+                                                  allowed_mentions=allowed_mentions, mention_author=False), None
+        except discord.HTTPException as e:
+            logging.warning("VTEC follow-up threading failed for %s, posting standalone: %s", alert_data.id, e)
+    return await post_alert_message(discord_channel_obj, content, embed, allowed_mentions), None
+
+
+async def post_alert_message(target, content: Optional[str], embed: discord.Embed,
+                             allowed_mentions: discord.AllowedMentions):
+    """Sends to the alert channel or one of its threads, through the webhook pool when there is one."""
+    if webhook_pool:
+        from nwsbot.webhooks import WebhookPoolEmpty
+        thread = target if isinstance(target, discord.Thread) else discord.utils.MISSING
+        try:
+            message = await webhook_pool.send(content=content, embed=embed, allowed_mentions=allowed_mentions,
+                                              thread=thread)
+            ALERT_SENDS.labels("webhook").inc()
+            return message
+        except WebhookPoolEmpty:
+            pass
+    message = await target.send(content=content, embed=embed, allowed_mentions=allowed_mentions)
+    ALERT_SENDS.labels("bot").inc()
+    return message
+
+
+async def handle_alert_reissue(alert_data: AlertRecord, original: dict):
+    """Suppresses an unchanged reissue, or in 'edit' mode refreshes the original message in place."""
+    message_id = original.get("discord_message_id")
+    if settings.reissue_mode == "edit" and message_id and discord_channel_obj:
+        embed = build_alert_embed(alert_data, cap_enricher.cached(alert_data) if cap_enricher else None)
+        embed.set_footer(text=f"Reissued {datetime.now(timezone.utc).strftime('%H:%MZ')}")
+        try:
+            if original.get("webhook_id"):
+                await edit_webhook_message(original["webhook_id"], message_id, original.get("thread_id"), embed=embed)
+            else:
+                await discord_channel_obj.get_partial_message(message_id).edit(embed=embed)
+        except discord.HTTPException as e:
+            logging.warning("Reissue edit of message %s failed: %s", message_id, e)
+    record_alert_reissue(alert_data, original)
+    logging.info("Suppressed reissue %s (same content as %s, mode=%s).", alert_data.id, original.get('nws_id'),
+                 settings.reissue_mode)
+
+
+# --- Webhook Output ---
+webhook_pool: Optional["WebhookPool"] = None  # Set up by setup_tasks() when discord.output_mode is "webhook"
+webhook_session: Optional[aiohttp.ClientSession] = None  # Webhook executes carry no bot token; own connection pool
+
+
+async def setup_webhook_pool():
+    """Finds (or creates) the bot's webhooks on the alert channel and pools them; bot-token posting if that fails."""
+    from nwsbot.webhooks import WebhookPool
+    global webhook_pool, webhook_session
+    try:
+        existing = [webhook for webhook in await discord_channel_obj.webhooks()
+                    if webhook.user and webhook.user.id == bot.user.id and webhook.name == settings.webhook_name
+                    and webhook.token]
+        while len(existing) < settings.webhook_count:
+            existing.append(await discord_channel_obj.create_webhook(name=settings.webhook_name,
+                                                                     reason="NWS alert output pool"))
+    except discord.HTTPException as e:  # Forbidden without Manage Webhooks
+        await report_error(f"Webhook output unavailable, posting with the bot token: {e}")
+        return
+    if webhook_session is None or webhook_session.closed:
+        webhook_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=settings.webhook_count * 2))
+    webhook_pool = WebhookPool((discord.Webhook.partial(webhook.id, webhook.token, session=webhook_session)
+                                for webhook in existing[:settings.webhook_count]), on_removed=on_webhook_removed)
+    WEBHOOK_POOL_SIZE.set_function(lambda: len(webhook_pool) if webhook_pool else 0)
+    logging.info(f"Posting alerts through {len(webhook_pool)} webhook(s) on #{discord_channel_obj}.")
+
+
+def on_webhook_removed(webhook: discord.Webhook):
+    message = f"Alert webhook {webhook.id} was deleted; {len(webhook_pool)} left in the pool."
+    if not webhook_pool:
+        message += " Posting with the bot token until restart."
+    asyncio.create_task(report_error(message))
+
+
+async def edit_webhook_message(webhook_id: int, message_id: int, thread_id: Optional[int] = None, **fields) -> bool:
+    """Edits a post made through the pool; False when its webhook is no longer pooled."""
+    if not webhook_pool or webhook_id not in webhook_pool:
+        return False
+    return await webhook_pool.edit(webhook_id, message_id,
+                                   thread=discord.Object(thread_id) if thread_id else discord.utils.MISSING, **fields)
+
+
+# --- CAP Detail Enrichment ---
+cap_enricher: Optional[CapEnricher] = None  # Built by startup() when enrichment.enabled
+enrichment_tasks: Set[asyncio.Task] = set()  # Pending post-then-edit tasks (kept referenced until done)
+
+
+def build_cap_enricher() -> CapEnricher:
+    return CapEnricher(fetch_cap_detail, DetailCache(settings.enrich_cache_size, settings.enrich_cache_dir),
+                       settings.enrich_concurrency, lambda outcome: CAP_DETAIL_LOOKUPS.labels(outcome).inc())
+
+
+async def fetch_cap_detail(url: str) -> Optional[str]:
+    """GETs an alert's CAP document over the shared session; None on any failure."""
+    try:
+        with PERF.timer("enrich"):
+            async with get_http_session().get(url, headers={'Accept': "application/cap+xml, application/xml;q=0.9, "
+                                                                      "application/geo+json;q=0.5"}) as response:
+                if response.status != 200:
+                    logging.debug("CAP detail fetch %s failed: %s", url, response.status)
+                    return None
+                return await response.text()
+    except Exception as e:
+        logging.debug("CAP detail fetch %s error: %s", url, e)
+        return None
+
+
+def schedule_enrichment_edit(message, item: "AlertItem"):
+    task = asyncio.create_task(apply_cap_detail(message, item.alert_data, item.embed))
+    enrichment_tasks.add(task)
+    task.add_done_callback(enrichment_tasks.discard)
+
+
+async def apply_cap_detail(message, alert_data: AlertRecord, posted_embed: Optional[discord.Embed]):
+    """Edits an alert posted with only its summary once the CAP details arrive (nothing if they add nothing)."""
+    detail = await cap_enricher.get(alert_data)
+    if detail is None or not (detail.instruction or (detail.description and detail.description != alert_data.summary)):
+        return
+    embed = build_alert_embed(alert_data, detail)
+    footer = posted_embed.footer.text if posted_embed is not None else None
+    if footer:
+        embed.set_footer(text=footer)
+    try:
+        await message.edit(embed=embed)
+        ALERTS_ENRICHED.inc()
+    except discord.HTTPException as e:
+        logging.warning("Enrichment edit of %s failed: %s", alert_data.id, e)
+
+
+# --- Feed Parsing (inline or process pool) ---
+parse_pool: Optional["ProcessPoolExecutor"] = None
+
+
+def get_parse_pool() -> "ProcessPoolExecutor":
+    global parse_pool
+    if parse_pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn: workers import only nwsbot.cap, and never inherit the event loop's threads or sockets
+        parse_pool = ProcessPoolExecutor(max_workers=max(1, settings.process_pool_workers),
+                                         mp_context=multiprocessing.get_context("spawn"))
+        logging.info(f"Started feed parse pool with {settings.process_pool_workers} workers.")
+    return parse_pool
+
+
+async def parse_feed_content(feed_content: str, limit: Optional[int] = None, watched_codes: Optional[Set[str]] = None,
+                             fmt: str = "atom") -> List[Tuple[AlertRecord, Tuple[str, ...]]]:
+    """Parses and geocode-matches a feed, offloading to the process pool above process_pool_min_bytes."""
+    job = functools.partial(parse_and_match_timed, feed_content, limit, frozenset(watched_codes or ()), fmt)
+    result = None
+    with PERF.timer("parse"):
+        if settings.process_pool_min_bytes > 0 and len(feed_content) >= settings.process_pool_min_bytes:
+            try:
+                with FEED_PARSE_SECONDS.labels("pool").time():
+                    result = await asyncio.get_running_loop().run_in_executor(get_parse_pool(), job)
+            except (OSError, RuntimeError) as e:  # BrokenProcessPool is a RuntimeError
+                global parse_pool
+                logging.error(f"Parse pool failed ({e}); parsing inline.")
+                parse_pool = None
+        if result is None:
+            with FEED_PARSE_SECONDS.labels("inline").time():
+                result = job()
+    parsed, (xml_seconds, extract_seconds, match_seconds) = result
+    PERF.observe("xml_parse", xml_seconds)
+    PERF.observe("extract", extract_seconds)
+    PERF.observe("geocode_match", match_seconds)
+    return parsed
+
+
+FeedDocument = Tuple[FeedSource, str, Dict[str, str]]  # (source, content, validators to keep once parsed)
+
+
+async def fetch_feed_sources(sources: List[FeedSource], conditional: bool = True) -> Tuple[int, List[FeedDocument]]:
+    """Fetches every source concurrently; returns ``(status, changed documents)``.
+
+    Status is 200 if any source changed, 304 if all were unchanged, otherwise a failure status. A source
+    is only fetched conditionally once its records are known, so a 304 never hides alerts.
+    """
+    async def fetch_one(source: FeedSource):
+        validators = feed_validators.get(source.key) if conditional and source.key in source_records else None
+        return await source.fetch(fetch_feed_document, validators)
+
+    results = await asyncio.gather(*(fetch_one(source) for source in sources))
+    documents = [(source, text, validators) for source, (status, text, validators) in zip(sources, results)
+                 if status == 200 and text]
+    if documents:
+        return 200, documents
+    failures = [status for status, _, _ in results if status != 304]
+    return (failures[0] if failures else 304), []
+
+
+async def parse_feed_documents(documents: List[FeedDocument], watched_codes: Optional[Set[str]] = None,
+                               full: bool = False) -> List[Tuple[AlertRecord, Tuple[str, ...]]]:
+    """Parses fetched documents concurrently and republishes the merged snapshot of all sources.
+
+    Returns the changed sources' alerts with their matched codes, one per alert id. Only the first
+    max_process_per_cycle entries of each document are read unless `full` is set.
+    """
+    limit = None if full else settings.max_process_per_cycle
+    results = await asyncio.gather(*(parse_feed_content(text, limit, watched_codes, source.fmt)
+                                     for source, text, _ in documents))
+    matched = {}
+    for (source, _, validators), parsed in zip(documents, results):
+        source_records[source.key] = tuple(alert_data for alert_data, _ in parsed)
+        feed_validators[source.key] = validators  # Only once the content has been parsed
+        matched.update((id(alert_data), codes) for alert_data, codes in parsed)
+    publish_snapshot(merge_records(source_records.get(source.key, ()) for source in feed_sources), feed_label())
+    changed = merge_records(source_records[source.key] for source, _, _ in documents)
+    return [(alert_data, matched[id(alert_data)]) for alert_data in changed]
+
+
+# --- Alert Pipeline ---
+# fetch -> parse -> diff -> filter -> match -> render -> send, each stage with its own bounded
+# queue and workers. Only fetch..render runs under alert_processing_lock; sends (and their
+# post_delay_seconds spacing) drain in the background while the next fetch proceeds.
+class AlertCycle:
+    """One fetch cycle. `done` is set once every entry has been dropped or handed to the send queue."""
+
+    def __init__(self, sources: List[FeedSource], records: Optional[List[AlertRecord]] = None,
+                 documents: Optional[List[FeedDocument]] = None, catchup_since: Optional[float] = None):
+        self.sources = sources
+        self.records = records  # Set for replay cycles, which skip fetch and parse
+        self.catchup_since = catchup_since  # Last successful cycle before a downtime; set for a catch-up cycle
+        self.digest: List["AlertItem"] = []  # Catch-up alerts collapsed into one summary post
+        self.status = 0
+        self.started = time.perf_counter()
+        self.seen_at = clock.time()  # Feed-seen time for latency; fetched cycles reset it once the fetch returns
+        self.documents = documents  # Preset by offline replay, which skips the fetch
+        self.not_modified = False
+        self.entries = 0
+        self.duplicates = 0
+        self.reissues = 0
+        self.fingerprints: Set[str] = set()  # Claimed by this cycle's diff stage
+        self.filtered = 0
+        self.queued = 0
+        self._pending = 0
+        self.done = asyncio.Event()
+
+    def expect(self, count: int):
+        self._pending = count
+        if count == 0:
+            self.done.set()
+
+    def settle(self):
+        self._pending -= 1
+        if self._pending <= 0:
+            self.done.set()
+
+
+class AlertItem:
+    """An extracted alert moving through the pipeline."""
+    __slots__ = ("cycle", "alert_data", "claimed", "settled", "vtec_codes", "mention_codes", "embed", "content",
+                 "filter_pass_at", "detail", "digest", "superseded")
+
+    def __init__(self, cycle: AlertCycle, alert_data: AlertRecord):
+        self.cycle = cycle
+        self.alert_data = alert_data
+        self.claimed = False
+        self.settled = False
+        self.digest = False
+        self.vtec_codes = []
+        self.superseded: List[Tuple[str, str]] = []
+        self.mention_codes: Set[str] = set()
+        self.embed = None
+        self.content = None
+        self.filter_pass_at: Optional[float] = None
+        self.detail: Optional[CapDetail] = None
+
+
+in_flight_alerts: Dict[str, AlertRecord] = {}  # Claimed by the diff stage, released once sent or dropped
+vtec_recorded_ids: "OrderedDict[str, None]" = OrderedDict()  # Products whose VTEC actions are recorded, oldest first
+VTEC_RECORDED_MAX = 4096
+
+
+def release_pipeline_item(item):
+    """Discard hook shared by all stages."""
+    if isinstance(item, AlertCycle):
+        item.done.set()
+        return
+    if item.claimed:
+        in_flight_alerts.pop(item.alert_data.id, None)
+    settle_pipeline_item(item)
+
+
+def settle_pipeline_item(item: AlertItem):
+    if not item.settled:
+        item.settled = True
+        item.cycle.settle()
+
+
+async def stage_fetch(cycle: AlertCycle):
+    if cycle.records is not None or cycle.documents is not None:
+        return cycle
+    status, cycle.documents = await fetch_feed_sources(cycle.sources)
+    note_feed_status(status)
+    cycle.status = status
+    cycle.seen_at = clock.time()
+    cycle.not_modified = status == 304
+    return cycle if cycle.documents else None
+
+
+async def stage_parse(cycle: AlertCycle):
+    watched_codes = await asyncio.to_thread(get_all_subscribed_codes)
+    if cycle.records is not None:
+        parsed = [(alert_data, tuple(code for code in alert_data.geocodes if code in watched_codes))
+                  for alert_data in cycle.records]
+    else:
+        # A catch-up cycle parses the whole feed so it can post by priority instead of feed order
+        parsed = await parse_feed_documents(cycle.documents, watched_codes, full=cycle.catchup_since is not None)
+        cycle.documents = None
+    if cycle.catchup_since is not None:
+        plan = plan_catchup(parsed, cycle.catchup_since)
+    else:
+        plan = [(alert_data, matched_codes, False) for alert_data, matched_codes in parsed]
+    items = []
+    for alert_data, matched_codes, digest in plan:
+        item = AlertItem(cycle, alert_data)
+        item.mention_codes = set(matched_codes)
+        item.digest = digest
+        items.append(item)
+    cycle.entries = len(items)
+    if cycle.records is None:
+        CYCLE_ENTRIES.observe(len(items))
+    cycle.expect(len(items))
+    return items
+
+
+def advance_vtec_events(alert_data: AlertRecord, vtec_codes: List[Tuple[VtecCode, Tuple]]) -> List[Tuple[str, str]]:
+    """Records a product's VTEC actions; returns the earlier posts it supersedes, read before the update."""
+    superseded = vtec_superseded_posts(vtec_codes) if settings.expiry_enabled else []
+    record_vtec_actions(alert_data, vtec_codes, None)
+    return superseded
+
+
+@PERF.timed("dedup")
+async def stage_diff(item: AlertItem):
+    alert_data = item.alert_data
+    item.vtec_codes = alert_vtec_codes(alert_data)
+    # Every product moves its events along, posted or not: a CAN or EXP that the filters drop (urgency
+    # Past) or a suppressed reissue still ends the event
+    if item.vtec_codes and alert_data.id not in vtec_recorded_ids:
+        vtec_recorded_ids[alert_data.id] = None
+        while len(vtec_recorded_ids) > VTEC_RECORDED_MAX:
+            vtec_recorded_ids.popitem(last=False)
+        item.superseded = await asyncio.to_thread(advance_vtec_events, alert_data, item.vtec_codes)
+    if alert_data.id in posted_alert_ids:
+        duplicate_source = "cache"
+    elif alert_data.id in in_flight_alerts:
+        duplicate_source = "in_flight"
+    elif await asyncio.to_thread(get_posted_alert_info, alert_data.id):
+        duplicate_source = "db"
+    else:
+        duplicate_source = None
+    if duplicate_source:
+        DEDUP_HITS.labels(duplicate_source).inc()
+        item.cycle.duplicates += 1
+        return None
+    # Reissued under a new id with unchanged content: no new message. A copy with the same content
+    # earlier in this cycle or still in flight has no post to point at yet, so it is just dropped.
+    fingerprint = alert_data.fingerprint
+    if fingerprint and (fingerprint in item.cycle.fingerprints
+                        or any(other.fingerprint == fingerprint for other in in_flight_alerts.values())):
+        item.cycle.reissues += 1
+        DEDUP_HITS.labels("fingerprint").inc()
+        return None
+    item.cycle.fingerprints.add(fingerprint)
+    in_flight_alerts[alert_data.id] = alert_data
+    item.claimed = True
+    original = await asyncio.to_thread(get_posted_alert_by_fingerprint, fingerprint)
+    if original:
+        item.cycle.reissues += 1
+        DEDUP_HITS.labels("fingerprint").inc()
+        await handle_alert_reissue(alert_data, original)
+        return None
+    return item
+
+
+@PERF.timed("filter")
+async def stage_filter(item: AlertItem):
+    if not filter_registry.get(settings.channel_id).allows(item.alert_data, clock.utcnow() if clock.warped else None):
+        item.cycle.filtered += 1
+        logging.debug("Alert %s filtered out", item.alert_data.id)
+        return None
+    item.filter_pass_at = clock.time()
+    if cap_enricher:
+        cap_enricher.prefetch(item.alert_data)  # Runs in the background; render only uses it if already done
+    return item
+
+
+@PERF.timed("subscribers")
+async def stage_match(item: AlertItem):
+    # The parse step already narrowed mention_codes to subscribed codes; apply per-event subscriptions.
+    if item.mention_codes:
+        item.mention_codes = await asyncio.to_thread(get_subscribed_codes_for_alert, item.mention_codes,
+                                                     item.alert_data.event)
+    return item
+
+
+@PERF.timed("render")
+async def stage_render(item: AlertItem):
+    if item.digest:
+        item.cycle.digest.append(item)
+        item.claimed = False  # The in-flight claim is held until the digest is posted
+        settle_pipeline_item(item)
+        return None
+    item.detail = cap_enricher.cached(item.alert_data) if cap_enricher else None
+    item.embed = build_alert_embed(item.alert_data, item.detail)
+    if item.mention_codes and discord_channel_obj and getattr(discord_channel_obj, 'guild', None):
+        roles = [discord.utils.get(discord_channel_obj.guild.roles, name=f"{code} Alerts")
+                 for code in sorted(item.mention_codes)]
+        item.content = " ".join(role.mention for role in roles if role) or None
+    item.cycle.queued += 1
+    settle_pipeline_item(item)
+    return item
+
+
+def record_sent_alert(item: AlertItem, message_id: int, thread_id: Optional[int], webhook_id: Optional[int],
+                      ack_at: float, histogram_rows: List[Tuple]):
+    """A post's database writes, run together in one worker thread so the send loop never blocks on SQLite."""
+    record_alert_post(item.alert_data, message_id, thread_id=thread_id, webhook_id=webhook_id)
+    record_alert_latency(item.alert_data, item.cycle.seen_at, item.filter_pass_at, ack_at, histogram_rows)
+    attach_vtec_message(item.vtec_codes, message_id, thread_id)
+
+
+async def stage_send(item: AlertItem):
+    if not is_leader:  # Lease lost while this was queued; the new leader will post it
+        logging.warning("Dropping queued alert %s: no longer leader", item.alert_data.id)
+        in_flight_alerts.pop(item.alert_data.id, None)
+        item.claimed = False
+        return None
+    webhook_id = None
+    try:
+        with DISCORD_SEND_SECONDS.time(), PERF.timer("send"):
+            msg, thread_id = await send_alert_message(item.alert_data, item.vtec_codes, item.embed, item.content)
+        ack_at = clock.time()
+        ALERTS_POSTED.inc()
+        if item.cycle.catchup_since is not None:
+            CATCHUP_ALERTS.labels("posted").inc()
+        webhook_id = getattr(msg, "webhook_id", None)
+        histogram_rows = observe_alert_latency(item.alert_data, item.cycle.seen_at, ack_at)
+        await asyncio.to_thread(record_sent_alert, item, msg.id, thread_id, webhook_id, ack_at, histogram_rows)
+        if settings.expiry_enabled:
+            track_alert_expiry(item.alert_data, msg.id, thread_id, item.superseded, webhook_id)
+        if cap_enricher and item.detail is None:
+            schedule_enrichment_edit(msg, item)
+        logging.info("Posted alert %s", item.alert_data.id)
+        log_time_to_first_post()
+    finally:
+        in_flight_alerts.pop(item.alert_data.id, None)
+        item.claimed = False
+    if not webhook_id:  # The pool paces its own webhooks
+        await clock.sleep(settings.post_delay_seconds)
+    return None
+
+
+# --- Downtime Catch-up ---
+catchup_checked = False  # Set once a live cycle has succeeded; only the first one can be a catch-up cycle
+digest_tasks: Set[asyncio.Task] = set()
+CATCHUP_DIGEST_LINES = 25
+
+
+async def downtime_catchup_since() -> Optional[float]:
+    """The last successful cycle's time, if the bot was down long enough since then to need a catch-up cycle."""
+    last_at = parse_cap_time(await asyncio.to_thread(get_bot_state, LAST_CYCLE_STATE_KEY))
+    if last_at is None or clock.time() - last_at < settings.catchup_min_gap_seconds:
+        return None
+    logging.warning(f"Last successful cycle was {format_duration(clock.time() - last_at)} ago; catching up.")
+    return last_at
+
+
+def alert_priority(alert_data: AlertRecord) -> Tuple[int, int, int, int]:
+    return alert_data.severity_level, alert_data.urgency_level, alert_data.certainty_level, alert_data.sent or 0
+
+
+def plan_catchup(parsed: List[Tuple[AlertRecord, Tuple[str, ...]]], since: float
+                 ) -> List[Tuple[AlertRecord, Tuple[str, ...], bool]]:
+    """Orders a catch-up cycle's alerts by priority, flagging the ones to collapse into the digest.
+
+    Expired alerts and ones last issued before `since` (which the last good cycle already handled) are
+    dropped. At most max_process_per_cycle alerts are posted on their own; low-priority ones (below
+    catchup.digest_below and not Immediate) and the overflow go into the digest, or are left for later
+    cycles when the digest is off.
+    """
+    now = clock.time()
+    missed = [(alert_data, codes) for alert_data, codes in parsed
+              if not alert_data.is_expired(now) and (alert_data.updated or alert_data.sent or now) >= since]
+    CATCHUP_ALERTS.labels("expired").inc(sum(1 for alert_data, _ in parsed if alert_data.is_expired(now)))
+    missed.sort(key=lambda pair: alert_priority(pair[0]), reverse=True)
+    below = SEVERITY_LEVELS[settings.catchup_digest_below]
+    plan = []
+    individual = digest = 0
+    for alert_data, codes in missed:
+        low = alert_data.severity_level < below and alert_data.urgency_level < URGENCY_LEVELS["Immediate"]
+        if (low and settings.catchup_digest) or individual >= settings.max_process_per_cycle:
+            if not settings.catchup_digest:
+                continue
+            plan.append((alert_data, codes, True))
+            digest += 1
+        else:
+            plan.append((alert_data, codes, False))
+            individual += 1
+    CATCHUP_ALERTS.labels("dropped").inc(len(missed) - individual - digest)
+    logging.info("Catch-up: %d missed alerts (%d expired or already seen), %d to post by priority, %d to the digest",
+                 len(missed), len(parsed) - len(missed), individual, digest)
+    return plan
+
+
+def schedule_catchup_digest(items: List[AlertItem]):
+    task = asyncio.create_task(post_catchup_digest(items))
+    digest_tasks.add(task)
+    task.add_done_callback(digest_tasks.discard)
+
+
+async def post_catchup_digest(items: List[AlertItem]):
+    """Posts a catch-up cycle's low-priority alerts as one summary once the individual posts have gone out."""
+    await alert_pipeline['send'].queue.join()
+    try:
+        if not is_leader or not discord_channel_obj:
+            return
+        lines = []
+        for item in items[:CATCHUP_DIGEST_LINES]:
+            alert_data = item.alert_data
+            expires_fmt = f" (expires <t:{alert_data.expires}:R>)" if alert_data.expires else ""
+            lines.append(f"- **{alert_data.event}**: {(alert_data.area_desc or alert_data.title or 'N/A')[:100]}"
+                         f"{expires_fmt}")
+        if len(items) > CATCHUP_DIGEST_LINES:
+            lines.append(f"...and {len(items) - CATCHUP_DIGEST_LINES} more.")
+        embed = create_embed("\n".join(lines)[:4000], color=discord.Color.light_grey(),
+                             title=f"🕒 {len(items)} alert(s) issued while the bot was offline")
+        msg = await post_alert_message(discord_channel_obj, None, embed, discord.AllowedMentions.none())
+        for item in items:
+            record_alert_post(item.alert_data, msg.id, webhook_id=getattr(msg, "webhook_id", None))
+        CATCHUP_ALERTS.labels("digest").inc(len(items))
+        logging.info("Posted catch-up digest of %d alerts", len(items))
+    except discord.HTTPException as e:
+        logging.warning("Catch-up digest failed: %s", e)
+    finally:
+        for item in items:
+            in_flight_alerts.pop(item.alert_data.id, None)
+
+
+def build_alert_pipeline() -> Pipeline:
+    return Pipeline([
+        Stage("fetch", stage_fetch, concurrency=1, maxsize=2, on_discard=release_pipeline_item),
+        Stage("parse", stage_parse, concurrency=1, maxsize=2, fan_out=True, on_discard=release_pipeline_item),
+        Stage("diff", stage_diff, concurrency=4, maxsize=200, on_discard=release_pipeline_item),
+        Stage("filter", stage_filter, concurrency=1, maxsize=200, on_discard=release_pipeline_item),
+        Stage("match", stage_match, concurrency=4, maxsize=200, on_discard=release_pipeline_item),
+        Stage("render", stage_render, concurrency=1, maxsize=100, on_discard=release_pipeline_item),
+        Stage("send", stage_send, concurrency=1, maxsize=settings.max_process_per_cycle,
+              on_discard=release_pipeline_item),
+    ])
+
+
+alert_pipeline: Optional[Pipeline] = None  # Built by main()
+
+
+async def process_new_alerts(documents: Optional[List[FeedDocument]] = None):
+    """Runs one fetch cycle through the pipeline and returns how many alerts were queued for posting.
+
+    Returns once every entry has been filtered out or queued; the posts themselves are sent
+    by the send stage afterwards. `documents` skips the fetch (offline replay).
+    """
+    if not discord_channel_obj:
+        logging.error("No Discord channel configured")
+        return 0
+    global catchup_checked
+    if not alert_pipeline.running:
+        alert_pipeline.start()
+    catchup_since = None
+    if settings.catchup_enabled and not catchup_checked and documents is None:
+        catchup_since = await downtime_catchup_since()
+    cycles = []
+    if replay_records:
+        # Restored or inherited alerts that may not have been posted; unchanged feeds now answer 304
+        cycles.append(AlertCycle(feed_sources, records=list(replay_records.values()), catchup_since=catchup_since))
+        replay_records.clear()
+    live_cycle = AlertCycle(feed_sources, documents=documents, catchup_since=catchup_since)
+    cycles.append(live_cycle)
+    queued = 0
+    for cycle in cycles:
+        try:
+            await alert_pipeline.submit(cycle)
+            await cycle.done.wait()
+        except Exception as e:
+            error_id = await report_error(f"Error processing alerts: {e}", traceback_info=traceback.format_exc())
+            logging.error(f"Failed to process alerts (ID: {error_id}): {e}")
+            continue
+        kind = "Replay cycle" if cycle.records is not None else "Cycle"
+        if cycle.not_modified:
+            logging.info("Cycle: feed not modified (304) in %.2fs", time.perf_counter() - cycle.started)
+        else:
+            logging.info("%s: %d entries, %d dup, %d reissue, %d filtered, %d queued in %.2fs (send queue: %d)",
+                         kind, cycle.entries, cycle.duplicates, cycle.reissues, cycle.filtered, cycle.queued,
+                         time.perf_counter() - cycle.started, alert_pipeline['send'].depth())
+        queued += cycle.queued
+        if cycle.digest:
+            schedule_catchup_digest(cycle.digest)
+    if documents is None and live_cycle.status in (200, 304):
+        catchup_checked = True
+        await asyncio.to_thread(set_bot_state, LAST_CYCLE_STATE_KEY,
+                                datetime.now(timezone.utc).isoformat(timespec='seconds'))
+    log_time_to_first_post(cycle_only=True)
+    return queued
+
+
+first_cycle_logged = False
+first_post_logged = False
+
+
+def log_time_to_first_post(cycle_only: bool = False):
+    """Logs, once each, how long after startup the first cycle finished and the first alert was posted."""
+    global first_cycle_logged, first_post_logged
+    start_kind = "warm" if warm_started else "cold"
+    elapsed = time.monotonic() - SCRIPT_START
+    if cycle_only:
+        if not first_cycle_logged:
+            first_cycle_logged = True
+            logging.info(f"Time to first completed cycle: {elapsed:.2f}s ({start_kind} start)")
+    elif not first_post_logged:
+        first_post_logged = True
+        logging.info(f"Time to first post: {elapsed:.2f}s ({start_kind} start)")
+
+
+async def warm_standby_cycle():
+    """Standby instance: fetch and parse without posting, and pull in the leader's posts.
+
+    Keeps the feed snapshot and posted-id cache current so a promotion can post on its first cycle.
+    """
+    status, documents = await fetch_feed_sources(feed_sources)
+    note_feed_status(status)
+    if documents:
+        await parse_feed_documents(documents)
+    synced = await sync_posted_ids()
+    logging.info("Standby cycle: snapshot v%d (%d alerts), %d posted ids synced", latest_snapshot.version,
+                 len(latest_snapshot.records), synced)
+
+
+# --- Poll Scheduling ---
+poll_scheduler: Optional[PollScheduler] = None  # Built by main()
+feed_not_modified_streak = 0  # Consecutive 304s from the scheduled feed fetch
+
+
+def note_feed_status(status: int):
+    global feed_not_modified_streak
+    if status == 304:
+        feed_not_modified_streak += 1
+    elif status == 200:
+        feed_not_modified_streak = 0
+
+
+def build_poll_scheduler() -> PollScheduler:
+    return PollScheduler(settings.check_interval_seconds, settings.poll_min_seconds, settings.poll_max_seconds,
+                         settings.poll_jitter, settings.poll_adaptive)
+
+
+async def poll_pressure() -> Tuple[bool, int]:
+    """(urgent, active): whether a Severe/Extreme or Immediate alert is active in a subscribed area, and how
+    many alerts are active there. Without any subscriptions every alert in the feed counts."""
+    watched = await asyncio.to_thread(get_all_subscribed_codes)
+    now = clock.time()
+    urgent = False
+    active = 0
+    for alert_data in latest_snapshot.records:
+        if alert_data.is_expired(now) or alert_data.msg_type == "Cancel":
+            continue
+        if watched and not any(code in watched for code in alert_data.geocodes):
+            continue
+        active += 1
+        if (alert_data.severity_level >= SEVERITY_LEVELS["Severe"]
+                or alert_data.urgency_level >= URGENCY_LEVELS["Immediate"]):
+            urgent = True
+    return urgent, active
+
+
+async def check_alerts():
+    """Task to check for new alerts on the scheduler's cadence (the standby only keeps its caches warm)."""
+    await bot.wait_until_ready()
+    loop = asyncio.get_running_loop()
+    while not bot.is_closed():
+        try:
+            async with alert_processing_lock:
+                if is_leader:
+                    count = await process_new_alerts()
+                    if count > 0:
+                        logging.info("Queued %d new alerts", count)
+                else:
+                    await warm_standby_cycle()
+        except Exception as e:
+            logging.error(f"Check alerts error: {e}")
+        previous_reason = poll_scheduler.last.reason
+        try:
+            decision = poll_scheduler.decide(*await poll_pressure(), feed_not_modified_streak)
+        except Exception as e:
+            logging.error(f"Poll scheduling error: {e}")
+            decision = poll_scheduler.decide(False, 1, 0)
+        delay = poll_scheduler.schedule(loop.time(), decision)
+        POLL_INTERVAL_SECONDS.set(poll_scheduler.last.interval)
+        if decision.reason != previous_reason:
+            logging.info("Poll interval now %.0fs (%s)", poll_scheduler.last.interval, decision.reason)
+        try:
+            await asyncio.wait_for(alert_check_wakeup.wait(), timeout=delay)
+            poll_scheduler.next_due = loop.time()  # Woken early: the cadence restarts from now
+        except asyncio.TimeoutError:
+            pass
+        alert_check_wakeup.clear()
+
+
+async def maintain_leader_lease():
+    """Acquires/renews the leader lease every third of its TTL and handles role changes."""
+    global is_leader
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        try:
+            acquired = await asyncio.to_thread(lease_backend.try_acquire, INSTANCE_ID, settings.lease_ttl_seconds)
+        except Exception as e:
+            logging.error(f"Leader lease error: {e}")
+            acquired = False
+        if acquired and not is_leader:
+            # Catch up on anything the old leader posted, then recheck whatever in our snapshot it didn't
+            await sync_posted_ids()
+            for alert_data in latest_snapshot.records:
+                if alert_data.id not in posted_alert_ids:
+                    replay_records[alert_data.id] = alert_data
+            is_leader = True
+            logging.warning(f"Instance {INSTANCE_ID} is now leader; posting alerts.")
+            alert_check_wakeup.set()
+            if settings.expiry_enabled:
+                await asyncio.to_thread(load_expiry_heap)  # Pick up the old leader's posts
+                expiry_wakeup.set()
+        elif not acquired and is_leader:
+            is_leader = False
+            logging.warning(f"Instance {INSTANCE_ID} lost the leader lease; standing by.")
+            await report_error(f"Instance {INSTANCE_ID} lost the leader lease (held by "
+                               f"{await asyncio.to_thread(lease_backend.current_holder)}).")
+        await asyncio.sleep(max(1, settings.lease_ttl_seconds / 3))
+
+
+# --- Expiry Timer ---
+expiry_heap = ExpiryHeap()
+expiry_wakeup = asyncio.Event()  # Set when the heap's head may have moved earlier (or on promotion)
+EXPIRED_PREFIX = "[Expired] "
+SUPERSEDING_ACTIONS = {"CAN", "EXP", "UPG"}  # Earlier posts of the event are over now
+
+
+def load_expiry_heap() -> int:
+    """Rebuilds the heap from posted_alerts; returns how many posts are waiting to expire."""
+    backfill_since = datetime.now(timezone.utc) - timedelta(hours=settings.expiry_backfill_hours)
+    expiry_heap.clear()
+    for nws_id, expires_utc, message_id, thread_id, webhook_id in get_unexpired_posts(
+            backfill_since.isoformat(timespec='seconds')):
+        expires = parse_cap_time(expires_utc)
+        if expires is not None:
+            expiry_heap.push(ExpiryEntry(nws_id, expires, message_id, thread_id, webhook_id=webhook_id))
+    return len(expiry_heap)
+
+
+def vtec_superseded_posts(vtec_codes: List[Tuple[VtecCode, Tuple]]) -> List[Tuple[str, str]]:
+    """(nws_id, action) for the earlier posts of each continued VTEC event; read before its lifecycle advances."""
+    posts = []
+    for code, key in vtec_codes:
+        if code.action == "NEW":
+            continue
+        event = get_vtec_event(key)
+        if event:
+            posts.extend((nws_id, code.action) for nws_id in {event.get("first_nws_id"), event.get("last_nws_id")}
+                         if nws_id)
+    return posts
+
+
+def track_alert_expiry(alert_data: AlertRecord, message_id: int, thread_id: Optional[int],
+                       superseded: List[Tuple[str, str]], webhook_id: Optional[int] = None):
+    """Heap bookkeeping for a post: the alert itself, and the earlier posts of its VTEC events.
+
+    A cancelled, expired or upgraded event's earlier posts are due now; an updated event's earlier
+    posts now expire along with this one.
+    """
+    now = clock.time()
+    for nws_id, action in superseded:
+        if action in SUPERSEDING_ACTIONS:
+            expiry_heap.reschedule(nws_id, now)
+        elif alert_data.expires:
+            expiry_heap.reschedule(nws_id, alert_data.expires)
+    if alert_data.expires and message_id:
+        expiry_heap.push(ExpiryEntry(alert_data.id, alert_data.expires, message_id, thread_id, webhook_id=webhook_id))
+    expiry_wakeup.set()
+
+
+async def archive_expired_message(entry: ExpiryEntry) -> bool:
+    """Greys out a posted alert and marks it Expired; False if the edit should be retried later."""
+    try:
+        channel = discord_channel_obj
+        if entry.thread_id:
+            channel = discord_channel_obj.get_thread(entry.thread_id) or await bot.fetch_channel(entry.thread_id)
+        message = await channel.fetch_message(entry.message_id)
+        if not message.embeds:
+            return True
+        embed = message.embeds[0]
+        if embed.title and not embed.title.startswith(EXPIRED_PREFIX):
+            embed.title = f"{EXPIRED_PREFIX}{embed.title}"[:256]
+        embed.color = discord.Color.dark_grey()
+        embed.set_footer(text=f"Expired {datetime.fromtimestamp(entry.expires, timezone.utc).strftime('%b %d %H:%MZ')}")
+        if entry.webhook_id:
+            if not await edit_webhook_message(entry.webhook_id, entry.message_id, entry.thread_id, embed=embed):
+                return True  # Its webhook is gone, and nothing else may edit the message
+        else:
+            await message.edit(embed=embed)
+        ALERTS_EXPIRED.inc()
+        return True
+    except (discord.NotFound, discord.Forbidden):
+        return True  # Deleted, or in a thread we can no longer edit
+    except discord.HTTPException as e:
+        logging.warning("Expiry edit of %s failed: %s", entry.nws_id, e)
+        return False
+
+
+async def expire_posted_alerts():
+    """The single expiry timer: sleeps until the earliest expiry, then edits due posts in paced batches.
+
+    Only the leader edits. Edits are spaced by expiry.edit_spacing_seconds on top of discord.py's own
+    rate limiting, so a burst of expiries never crowds out new alert posts.
+    """
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        try:
+            expiry_wakeup.clear()
+            next_due = expiry_heap.next_due()
+            if not is_leader:
+                timeout = 60
+            else:  # Capped so a wall-clock jump can't leave the timer asleep for long
+                timeout = None if next_due is None else min(next_due - clock.time(), 3600)
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(expiry_wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            done = []
+            for entry in expiry_heap.pop_due(clock.time(), max(1, settings.expiry_batch_size)):
+                if await archive_expired_message(entry):
+                    done.append(entry.nws_id)
+                elif entry.attempts < 3:
+                    expiry_heap.push(dataclasses.replace(entry, expires=clock.time() + 600, attempts=entry.attempts + 1))
+                await clock.sleep(settings.expiry_edit_spacing_seconds)
+            await asyncio.to_thread(mark_alerts_expired, done)
+            if done:
+                logging.info("Marked %d posted alert(s) expired; %d pending", len(done), len(expiry_heap))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Expiry task error: {e}")
+            await asyncio.sleep(60)
+
+
+# --- Metrics Endpoint ---
+class RateLimitMetricsHandler(logging.Handler):
+    """Counts the 429 waits discord.py logs (it has no rate-limit hook); the wait is the last log arg."""
+
+    def emit(self, record: logging.LogRecord):
+        if "rate limit" not in str(record.msg).lower():
+            return
+        RATE_LIMIT_HITS.inc()
+        if record.args and isinstance(record.args, tuple) and isinstance(record.args[-1], (int, float)):
+            RATE_LIMIT_WAIT_SECONDS.inc(record.args[-1])
+            PERF.observe("discord_429_wait", record.args[-1])
+
+
+def not_modified_ratio() -> float:
+    ok, not_modified = FEED_FETCHES.labels("200").value, FEED_FETCHES.labels("304").value
+    return not_modified / (ok + not_modified) if ok + not_modified else 0.0
+
+
+def register_metric_sources():
+    """Scrape-time gauges and the discord.py rate-limit log hook."""
+    for stage in alert_pipeline.stages:
+        QUEUE_DEPTH.labels(stage.name).set_function(stage.depth)
+    FEED_NOT_MODIFIED_RATIO.set_function(not_modified_ratio)
+    FEED_BREAKER_STATE.set_function(feed_breaker_state)
+    EXPIRY_PENDING.set_function(lambda: len(expiry_heap))
+    LOG_RECORDS_DROPPED.set_function(lambda: logconfig.queue_handler.dropped if logconfig.queue_handler else 0)
+    logging.getLogger("discord.http").addHandler(RateLimitMetricsHandler(level=logging.WARNING))
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - started - interval))
+
+
+async def start_metrics_server():
+    """Serves GET /metrics on metrics.host:metrics.port with the aiohttp already loaded by discord.py."""
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(body=REGISTRY.render().encode("utf-8"),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, settings.metrics_host, settings.metrics_port).start()
+    except OSError as e:
+        await report_error(f"Metrics endpoint failed to bind {settings.metrics_host}:{settings.metrics_port}: {e}")
+        await runner.cleanup()
+        return
+    logging.info(f"Metrics endpoint on http://{settings.metrics_host}:{settings.metrics_port}/metrics")
+
+
+alert_api: Optional["AlertApi"] = None  # Local read-only JSON API, when api.enabled
+
+
+async def start_alert_api():
+    """Serves the active-alert snapshot on api.host:api.port (see nwsbot/api.py)."""
+    from nwsbot.api import AlertApi
+    global alert_api
+    api = AlertApi(latest_snapshot)
+    try:
+        await api.start(settings.api_host, settings.api_port)
+    except OSError as e:
+        await report_error(f"Alert API failed to bind {settings.api_host}:{settings.api_port}: {e}")
+        return
+    alert_api = api
+    API_STREAMS.set_function(lambda: api.streams)
+    logging.info(f"Alert API on http://{settings.api_host}:{settings.api_port}/alerts")
+
+
+async def save_runtime_state_periodically():
+    """Writes the runtime snapshot every snapshot_save_seconds (the shutdown commands also save it)."""
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        await asyncio.sleep(settings.snapshot_save_seconds)
+        await asyncio.to_thread(persist_runtime_state)
+
+
+async def release_leader_lease():
+    """Hands leadership over right away on a clean shutdown instead of waiting for the TTL."""
+    global is_leader
+    if settings.ha_backend != "none" and is_leader:
+        is_leader = False
+        await asyncio.to_thread(lease_backend.release, INSTANCE_ID)
+        logging.info(f"Released leader lease held by {INSTANCE_ID}.")
+
+
+async def on_command_error(ctx, error):
+    if isinstance(error, commands.CommandNotFound):
+        await ctx.send("That command does not exist.  Please check your spelling and try again.")
+    elif isinstance(error, commands.MissingRequiredArgument):
+        await ctx.send("You are missing a required argument.  Please check the help command for more information.")
+    elif isinstance(error, commands.BadArgument):
+        await ctx.send("You have provided a bad argument.  Please check the help command for more information.")
+    elif isinstance(error, commands.TooManyArguments):
+        await ctx.send("You have provided too many arguments.  Please check the help command for more information.")
+    elif isinstance(error, commands.MissingPermissions):
+        await ctx.send("You do not have the required permissions to use this command.")
+    elif isinstance(error, commands.BotMissingPermissions):
+        await ctx.send("I do not have the required permissions to execute this command.")
+    elif isinstance(error, commands.NoPrivateMessage):
+        await ctx.send("This command cannot be used in a private message.")
+    elif isinstance(error, commands.PrivateMessageOnly):
+        await ctx.send("This command can only be used in a private message.")
+    elif isinstance(error, commands.CheckFailure):
+        await ctx.send("You do not have the required roles to use this command.")
+    elif isinstance(error, commands.CommandOnCooldown):
+        await ctx.send(f"This command is on cooldown.  Please try again in {error.retry_after:.2f} seconds.")
+    elif isinstance(error, commands.DisabledCommand):
+        await ctx.send("This command is disabled.")
+    elif isinstance(error, commands.CommandInvokeError):
+        await ctx.send(f"An error occurred while invoking this command.  Please try again later.  Error details: {error}")
+    else:
+        await ctx.send(f"An unexpected error occurred: {error}")
+
+
+async def add_alert(location, event, message):
+    try:
+        await bot.db.execute("INSERT INTO alerts (location, event, message) VALUES ($1, $2, $3)", location, event, message)
+        print(f"Alert added for {location} when {event} occurs.")
+    except Exception as e:
+        print(f"An error occurred while adding the alert: {e}")
+
+
+async def get_alerts(location):
+    try:
+        alerts = await bot.db.fetch("SELECT event, message FROM alerts WHERE location = $1", location)
+        return alerts
+    except Exception as e:
+        return []
+
+
+async def remove_alert(location, event):
+    try:
+        await bot.db.execute("DELETE FROM alerts WHERE location = $1 AND event = $2", location, event)
+        print(f"Alert removed for {location} when {event} occurs.")
+    except Exception as e:
+        print(f"An error occurred while removing the alert: {e}")
+
+
+# Commands
+@commands.command(name='add_alert', help='Add a new weather alert.')
+async def add_alert_command(ctx, location, event, message):
+    """Add a new weather alert."""
+    await add_alert(location, event, message)
+    await ctx.send(f"Alert added for {location} when {event} occurs.")
+
+
+@commands.command(name='get_alerts', help='Get all weather alerts for a location.')
+async def get_alerts_command(ctx, location):
+    """Get all weather alerts for a location."""
+    alerts = await get_alerts(location)
+    if alerts:
+        for alert in alerts:
+            await ctx.send(f"When {alert['event']} occurs in {location}: {alert['message']}")
+    else:
+        await ctx.send(f"No alerts found for {location}.")
+
+
+@commands.command(name='remove_alert', help='Remove a weather alert.')
+async def remove_alert_command(ctx, location, event):
+    """Remove a weather alert."""
+    await remove_alert(location, event)
+    await ctx.send(f"Alert removed for {location} when {event} occurs.")
+
+# --- Alert Lookup Cache ---
+# !wxalerts reads its own snapshot of the whole feed: the pipeline's keeps only max_process_per_cycle entries
+lookup_snapshot = FeedSnapshot()
+lookup_validators: Dict[str, Dict[str, str]] = {}  # Conditional-GET validators per source key, lookups only
+lookup_source_records: Dict[str, Tuple[AlertRecord, ...]] = {}
+lookup_results: "OrderedDict[Tuple[int, FrozenSet[str]], LookupResult]" = OrderedDict()
+lookup_refresh_lock = asyncio.Lock()  # Concurrent lookups share one refresh
+LOOKUP_FRESH_SECONDS = 60  # Lookups within this long of the last refresh don't touch the network
+LOOKUP_CACHE_SIZE = 64
+LOOKUP_PAGE_SIZE = 5
+
+
+class LookupResult:
+    """Filtered, sorted alerts for one code set and snapshot version; pages are rendered on first view."""
+    __slots__ = ("codes", "alerts", "filters", "valid_until", "pages")
+
+    def __init__(self, codes: FrozenSet[str], alerts: List[AlertRecord], filters, valid_until: float):
+        self.codes = codes
+        self.alerts = alerts
+        self.filters = filters  # The channel's compiled FilterSet; a filter change swaps in a new one
+        self.valid_until = valid_until  # When the list can next change: an expiry, or an hours= rule's boundary
+        self.pages: Dict[int, str] = {}
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-len(self.alerts) // LOOKUP_PAGE_SIZE))
+
+    def page(self, number: int) -> str:
+        text = self.pages.get(number)
+        if text is None:
+            lines = []
+            for alert in self.alerts[number * LOOKUP_PAGE_SIZE:(number + 1) * LOOKUP_PAGE_SIZE]:
+                expires_fmt = f"<t:{alert.expires}:R>" if alert.expires else 'N/A'
+                lines.append(f"**• {alert.event}:** {alert.title or 'N/A'} (Expires: {expires_fmt})")
+            text = self.pages[number] = "\n".join(lines)
+        return text
+
+
+def lookup_alerts(snapshot: FeedSnapshot, codes: FrozenSet[str], alert_filters) -> LookupResult:
+    """Alerts in `snapshot` for any of `codes` that pass `alert_filters`, cached per snapshot version and code set."""
+    key = (snapshot.version, codes)
+    now = time.time()
+    result = lookup_results.get(key)
+    if result is not None and result.filters is alert_filters and now < result.valid_until:
+        lookup_results.move_to_end(key)
+        return result
+    candidates = {alert.id: alert for code in codes for alert in snapshot.by_code.get(code, ())}
+    now_dt = datetime.fromtimestamp(now, timezone.utc)
+    alerts = [alert for alert in candidates.values() if not alert.is_expired(now) and alert_filters.allows(alert, now_dt)]
+    alerts.sort(key=lambda x: (x.severity_level, x.effective or 0), reverse=True)
+    valid_until = min((alert.expires for alert in alerts if alert.expires), default=float("inf"))
+    if alert_filters.hourly:  # An hours= window may open or close at the next UTC hour
+        valid_until = min(valid_until, (int(now) // 3600 + 1) * 3600)
+    result = lookup_results[key] = LookupResult(codes, alerts, alert_filters, valid_until)
+    while len(lookup_results) > LOOKUP_CACHE_SIZE:
+        lookup_results.popitem(last=False)
+    return result
+
+
+class LookupView(discord.ui.View):
+    """Previous/Next buttons over a cached LookupResult."""
+
+    def __init__(self, author_id: int, result: LookupResult, stale_age: Optional[float] = None):
+        super().__init__(timeout=300)
+        self.author_id = author_id
+        self.result = result
+        self.stale_age = stale_age
+        self.number = 0
+        self.message: Optional[discord.Message] = None
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.number == 0
+        self.next_page.disabled = self.number >= self.result.page_count - 1
+
+    def embed(self) -> discord.Embed:
+        embed = create_embed(self.result.page(self.number),
+                             title=f"Active Alerts for {', '.join(sorted(self.result.codes))}")
+        footer = f"Page {self.number + 1}/{self.result.page_count} • {len(self.result.alerts)} alert(s)"
+        if self.stale_age is not None:
+            footer += f" • NWS feed unavailable, data {format_duration(self.stale_age)} old"
+        embed.set_footer(text=footer)
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.author_id
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.number -= 1
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.number += 1
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+
+async def refresh_lookup_source(source: FeedSource) -> int:
+    """Conditionally re-fetches one source for lookups and re-parses it only when it changed; returns the status."""
+    validators = lookup_validators.get(source.key) if source.key in lookup_source_records else None
+    status, text, validators = await source.fetch(fetch_feed_document, validators)
+    if status == 200 and text:
+        try:
+            parsed = await parse_feed_content(text, fmt=source.fmt)
+        except Exception as e:
+            logging.error(f"Failed to parse NWS feed: {e}")
+            return 0
+        lookup_source_records[source.key] = tuple(alert_data for alert_data, _ in parsed)
+        lookup_validators[source.key] = validators
+    return status
+
+
+async def get_nws_alerts() -> Tuple[Optional[FeedSnapshot], Optional[float]]:
+    """The whole active-alert feed for lookups, refreshed at most every LOOKUP_FRESH_SECONDS.
+
+    Returns ``(snapshot, stale_age)``. An unchanged feed costs one 304 per source and no parsing, and keeps
+    its snapshot version (and so the cached lookup results). If the feed can't be fetched (or its circuit
+    is open) the last good snapshot is served instead and `stale_age` is its age in seconds; snapshot is
+    None when there is none.
+    """
+    global lookup_snapshot
+    async with lookup_refresh_lock:
+        if lookup_snapshot.version and lookup_snapshot.age_seconds < LOOKUP_FRESH_SECONDS:
+            return lookup_snapshot, None
+        statuses = await asyncio.gather(*(refresh_lookup_source(source) for source in feed_sources))
+        if statuses and all(status in (200, 304) for status in statuses):
+            if 200 in statuses or not lookup_snapshot.version:
+                records = merge_records(lookup_source_records.get(source.key, ()) for source in feed_sources)
+                lookup_snapshot = FeedSnapshot.build(records, lookup_snapshot.version + 1, feed_label())
+            else:
+                lookup_snapshot = dataclasses.replace(lookup_snapshot, fetched_at=time.time())
+            return lookup_snapshot, None
+    fallback = lookup_snapshot if lookup_snapshot.version else latest_snapshot
+    if fallback.version:
+        return fallback, fallback.age_seconds
+    return None, None
+
+
+async def cleanup_database():
+    """Clean up old alerts from database periodically (leader only; every instance resyncs its id cache)."""
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        try:
+            if not is_leader:
+                await sync_posted_ids(full=True)
+                await asyncio.sleep(86400)
+                continue
+            retention_date = (datetime.now(timezone.utc) - timedelta(days=settings.database_retention_days))
+            conn = None
+            try:
+                conn = sqlite3.connect(settings.database_file)
+                cursor = conn.cursor()
+                retention_utc = retention_date.isoformat(timespec='seconds')
+                cursor.execute("DELETE FROM posted_alerts WHERE first_posted_utc < ?", (retention_utc,))
+                deleted = cursor.rowcount
+                cursor.execute("DELETE FROM alert_locations WHERE posted_utc < ?", (retention_utc,))
+                # Closed events, and open ones whose end time has passed, once untouched for the retention period
+                cursor.execute("DELETE FROM vtec_events WHERE updated_utc < ? AND (is_active = 0 OR ends_utc < ?)",
+                               (retention_utc, datetime.now(timezone.utc).isoformat(timespec='seconds')))
+                cutoff = retention_date.timestamp()
+                cursor.execute("DELETE FROM alert_latency WHERE ack_at < ?", (cutoff,))
+                cursor.execute("DELETE FROM latency_histograms WHERE hour < ?", (int(cutoff) // 3600 * 3600,))
+                conn.commit()
+                if deleted > 0:
+                    logging.info(f"Cleaned up {deleted} old alerts")
+            except sqlite3.Error as e:
+                logging.error(f"Database cleanup error: {e}")
+            finally:
+                if conn:
+                    conn.close()
+            await sync_posted_ids(full=True)
+            alert_latency.prune(retention_date.timestamp())
+            if cap_enricher:
+                await asyncio.to_thread(cap_enricher.cache.prune, settings.database_retention_days * 86400)
+        except Exception as e:
+            logging.error(f"Cleanup task error: {e}")
+        await asyncio.sleep(86400)  # Run once per day
+
+
+async def change_status():
+    """Rotate bot status message."""
+    await bot.wait_until_ready()
+    status_messages = [
+        f"!help | v{SCRIPT_VERSION}",
+        "!sub add <CODE>",
+        "!wxalerts <CODE>",
+        "National Weather Service"
+    ]
+    status_cycle = itertools.cycle(status_messages)
+    while not bot.is_closed():
+        try:
+            status_text = next(status_cycle)
+            await bot.change_presence(activity=discord.Activity(
+                type=discord.ActivityType.listening,
+                name=status_text
+            ))
+        except Exception as e:
+            logging.error(f"Status rotation error: {e}")
+        await asyncio.sleep(settings.status_rotation_minutes * 60)
+
+
+# --- Offline Replay ---
+def replay_settings(loaded: Settings, scratch_dir: str) -> Settings:
+    """The configured settings on a scratch copy of the database, with HA, metrics and CAP enrichment off."""
+    database_file = os.path.join(scratch_dir, "replay.db")
+    if os.path.exists(loaded.database_file):
+        shutil.copyfile(loaded.database_file, database_file)  # Keeps subscriptions and saved filters
+    return dataclasses.replace(loaded, database_file=database_file, ha_backend="none", metrics_enabled=False,
+                               enrich_enabled=False, catchup_enabled=False,
+                               runtime_snapshot_file=os.path.join(scratch_dir, "replay_snapshot.bin"),
+                               nws_atom_url=loaded.nws_atom_url or "replay://feeds")
+
+
+def reset_replay_database():
+    """Forgets what the live bot posted, so every captured alert goes through the pipeline again."""
+    conn = sqlite3.connect(settings.database_file)
+    try:
+        for table in ("posted_alerts", "vtec_events", "alert_latency", "latency_histograms"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+async def run_replay(feed_dir: str, speed: float, use_http: bool, output_path: str) -> int:
+    """Plays captured feeds through the pipeline into a FakeChannel and prints a throughput report."""
+    from nwsbot.replay import (FakeChannel, FakeGuild, FeedReplayServer, WarpClock, load_feed_directory, read_feed,
+                               write_messages)
+    global clock, discord_channel_obj, is_leader
+    feeds = load_feed_directory(feed_dir)
+    if not feeds:
+        logging.critical(f"No feed files in {feed_dir}")
+        return 1
+    clock = WarpClock(feeds[0][0], speed)
+    channel = FakeChannel(clock, FakeGuild(await asyncio.to_thread(get_all_subscribed_codes)))
+    discord_channel_obj = channel
+    is_leader = True
+    server = FeedReplayServer(feeds, clock) if use_http else None
+    source_url = await server.start() if server else None
+    fmt = "json" if feeds[0][1].endswith(".json") else "atom"
+    feed_sources[:] = [FeedSource("replay", source_url or settings.nws_atom_url, fmt)]
+    logging.info(f"Replaying {len(feeds)} feeds from {feed_dir} at {speed:g}x"
+                 + (f" via {source_url}" if source_url else ""))
+    started = time.perf_counter()
+    queued = 0
+    try:
+        for at, path in feeds:
+            await clock.sleep_until(at)
+            async with alert_processing_lock:
+                if server:
+                    queued += await process_new_alerts()
+                else:
+                    content = await asyncio.to_thread(read_feed, path)
+                    source = dataclasses.replace(feed_sources[0], fmt="json" if path.endswith(".json") else "atom")
+                    queued += await process_new_alerts([(source, content, {})])
+        await alert_pipeline.drain()
+    finally:
+        alert_pipeline.stop()
+        if server:
+            await close_http_session()
+            await server.stop()
+    wall_seconds = time.perf_counter() - started
+    simulated_seconds = clock.time() - feeds[0][0]
+    posted = write_messages(output_path, channel.messages)
+    hours = int(simulated_seconds // 3600) + 2
+    queue_latency = LatencyHistogram()
+    for histogram in alert_latency.window(hours, clock.time(), "pipeline").values():
+        queue_latency.merge(histogram)
+    send = alert_pipeline["send"].stats
+    print(f"Replayed {len(feeds)} feeds spanning {format_duration(simulated_seconds)} in {wall_seconds:.1f}s "
+          f"({speed:g}x)")
+    print(f"Queued {queued}, posted {posted}: {posted / max(wall_seconds, 1e-9):.2f} alerts/s wall, "
+          f"{posted / max(simulated_seconds / 60, 1e-9):.2f} alerts/min simulated")
+    print(f"Feed-seen to post (simulated): p50 {format_duration(queue_latency.quantile(0.5))}, "
+          f"p95 {format_duration(queue_latency.quantile(0.95))}, p99 {format_duration(queue_latency.quantile(0.99))}")
+    print(f"Send queue wait (wall): avg {send.avg_wait_seconds * 1000:.0f} ms, max {send.max_wait_seconds * 1000:.0f} ms")
+    print(f"Simulated 429s: {channel.rate_limited} ({channel.rate_limit_wait:.1f}s simulated wait)")
+    if server:
+        print(f"Stand-in server: {server.requests} requests, {server.not_modified} answered 304")
+    print(f"Would-be messages written to {output_path}")
+    return 0
+
+
+def replay_main(args) -> int:
+    """`--replay DIR`: no Discord login; scratch database; report to stdout."""
+    global alert_pipeline
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        loaded = load_settings(args.config, offline=True)
+    except SettingsError as e:
+        logging.critical(f"{e} Exiting.")
+        return 1
+    with tempfile.TemporaryDirectory(prefix="nwsbot-replay-") as scratch_dir:
+        settings.configure(replay_settings(loaded, scratch_dir))
+        configure_filters()
+        init_db()
+        reset_replay_database()
+        load_filter_registry()
+        alert_pipeline = build_alert_pipeline()
+        return asyncio.run(run_replay(args.replay, args.speed, args.replay_http, args.replay_output))
+
+
+def serve_feeds_main(directory: str, port: int) -> int:
+    """`--serve-feeds DIR`: a local stand-in for the feed endpoints until interrupted."""
+    from nwsbot.replay import FeedDirectoryServer
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = FeedDirectoryServer(directory)
+
+    async def serve():
+        base_url = await server.start(port=port)
+        logging.info(f"Serving {directory} at {base_url} (e.g. {base_url}/alerts/active?area=NY -> active_NY.json)")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def create_bot() -> commands.Bot:
+    """Builds the Bot and registers the module's commands and event handlers on it."""
+    intents = discord.Intents.default();
+    intents.message_content = True;
+    intents.guilds = True
+    new_bot = commands.Bot(command_prefix=commands.when_mentioned_or("!"), intents=intents,
+                           owner_ids=set(settings.owner_ids), help_command=None)
+    new_bot.help_command = MyHelpCommand()
+    # Top-level commands and groups defined above; subcommands ride along with their group
+    for command in [obj for obj in globals().values() if isinstance(obj, commands.Command)]:
+        if command.parent is None:
+            new_bot.add_command(command)
+    new_bot.event(on_ready)
+    new_bot.event(on_command_error)
+    return new_bot
+
+
+def startup(log_file_path: str):
+    """Everything the old module body did at import: database, filters, lease, warm state, Bot."""
+    global INSTANCE_ID, lease_backend, is_leader, alert_pipeline, poll_scheduler, cap_enricher, bot
+    INSTANCE_ID = settings.instance_id or make_holder_id()
+    feed_sources[:] = build_sources(settings.feed_sources, settings.nws_atom_url, settings.base_dir)
+    configure_filters()
+    log_startup_summary(log_file_path)
+    init_db()
+    load_filter_registry()
+    load_latency_histograms()
+    if settings.expiry_enabled:
+        logging.info(f"Expiry heap: {load_expiry_heap()} posted alerts waiting to expire.")
+    lease_backend = make_lease_backend()
+    is_leader = settings.ha_backend == "none"
+    restore_runtime_state()
+    alert_pipeline = build_alert_pipeline()
+    poll_scheduler = build_poll_scheduler()
+    cap_enricher = build_cap_enricher() if settings.enrich_enabled else None
+    register_metric_sources()
+    bot = create_bot()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="nwsbot", description="NWS alert bot for Discord.")
+    parser.add_argument("-c", "--config", help="Path to config.json (default: $NWSBOT_CONFIG or ./config.json)")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {SCRIPT_VERSION}")
+    parser.add_argument("--replay", metavar="DIR", help="Replay captured feeds from DIR into a fake channel and exit")
+    parser.add_argument("--speed", type=float, default=60.0, help="Replay time warp factor (default 60)")
+    parser.add_argument("--replay-http", action="store_true", help="Fetch replayed feeds from a local stand-in server")
+    parser.add_argument("--replay-output", default="replay_messages.jsonl",
+                        help="Where to write the would-be messages (JSON lines)")
+    parser.add_argument("--serve-feeds", metavar="DIR", help="Serve the feed files in DIR as a local stand-in and exit")
+    parser.add_argument("--port", type=int, default=8089, help="Port for --serve-feeds (default 8089)")
+    args = parser.parse_args(argv)
+    if args.serve_feeds:
+        return serve_feeds_main(args.serve_feeds, args.port)
+    if args.replay:
+        return replay_main(args)
+    try:
+        loaded = load_settings(args.config)
+    except SettingsError as e:
+        logging.basicConfig(level=logging.INFO)
+        logging.critical(f"{e} Exiting.")
+        return 1
+    settings.configure(loaded)
+    startup(setup_logging(settings.log_dir))
+    try:
+        bot.run(settings.discord_token, log_handler=None)  # discord.py logs through the root logger's queue
+    finally:
+        persist_runtime_state()  # Also on Ctrl+C / SIGTERM, once bot.run has returned
+        stop_logging()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
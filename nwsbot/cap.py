@@ -0,0 +1,260 @@
+"""NWS Atom/CAP and api.weather.gov GeoJSON feed parsing.
+
+Each feed entry (or GeoJSON feature) is read in a single pass into an
+``AlertRecord``, a frozen, slotted record. Times are epoch seconds, levels are
+small ints and geocodes are interned tuples, so nothing downstream re-parses
+strings. Records pickle compactly, so ``parse_and_match`` can run in a
+ProcessPoolExecutor worker without ElementTree objects leaving this module.
+"""
+
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from nwsbot.filters import CERTAINTY_LEVELS, SEVERITY_LEVELS, URGENCY_LEVELS
+from nwsbot.fingerprint import content_fingerprint
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+CAP_NS = "{urn:oasis:names:tc:emergency:cap:1.2}"
+
+_intern = sys.intern
+
+
+@dataclass(frozen=True, slots=True)
+class AlertRecord:
+    id: str
+    title: str
+    summary: str
+    event: str
+    severity: str
+    certainty: str
+    urgency: str
+    severity_level: int
+    certainty_level: int
+    urgency_level: int
+    msg_type: str = "Alert"
+    status: str = "Actual"
+    updated: Optional[int] = None
+    sent: Optional[int] = None
+    effective: Optional[int] = None
+    onset: Optional[int] = None
+    expires: Optional[int] = None
+    area_desc: str = ""
+    polygon: str = ""
+    link: str = ""
+    ugc: Tuple[str, ...] = ()
+    fips6: Tuple[str, ...] = ()
+    vtec: Tuple[str, ...] = ()
+    fingerprint: str = ""
+
+    @property
+    def geocodes(self) -> Tuple[str, ...]:
+        return self.ugc + self.fips6
+
+    def is_expired(self, now: float) -> bool:
+        return self.expires is not None and self.expires <= now
+
+
+def parse_cap_time(value: Optional[str]) -> Optional[int]:
+    """ISO-8601 CAP/Atom timestamp -> epoch seconds (None if missing or invalid)."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def format_cap_time(epoch: Optional[int]) -> Optional[str]:
+    """Epoch seconds -> ISO-8601 UTC string, as stored in the database."""
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat(timespec="seconds")
+
+
+_local_names: Dict[str, str] = {}
+
+
+def _local_name(tag: str) -> str:
+    """Namespace-stripped tag name, memoised since feeds reuse a few dozen tags."""
+    name = _local_names.get(tag)
+    if name is None:
+        name = _local_names[tag] = tag.rpartition("}")[2]
+    return name
+
+
+def _read_pairs(container, pairs: Dict[str, List[str]]):
+    """Collects valueName/value pairs from a cap:geocode or cap:parameter element.
+
+    The NWS Atom feed writes the pairs unprefixed (Atom namespace), several to a
+    container; plain CAP uses the CAP namespace. Both are matched by local name.
+    """
+    name = None
+    for child in container:
+        tag = _local_name(child.tag)
+        if tag == "valueName":
+            name = child.text.strip() if child.text else None
+        elif tag == "value" and name:
+            if child.text:
+                pairs.setdefault(name, []).extend(child.text.split())
+            name = None
+
+
+_TEXT_FIELDS = frozenset({"id", "title", "summary", "updated", "event", "severity", "certainty", "urgency",
+                          "msgType", "status", "sent", "effective", "onset", "expires", "areaDesc", "polygon"})
+_CONTAINERS = frozenset({"content", "alert", "info", "area"})  # Nested CAP layouts
+
+
+def _walk(element, text: Dict[str, str], geocodes: Dict[str, List[str]], parameters: Dict[str, List[str]],
+          links: List[str]):
+    for child in element:
+        tag = _local_name(child.tag)
+        if tag in _TEXT_FIELDS:
+            if child.text and tag not in text:
+                text[tag] = child.text.strip()
+        elif tag == "geocode":
+            _read_pairs(child, geocodes)
+        elif tag == "parameter":
+            _read_pairs(child, parameters)
+        elif tag == "link":
+            links.append(child.get("href", ""))
+        elif tag in _CONTAINERS:
+            _walk(child, text, geocodes, parameters, links)
+
+
+def extract_alert_data(entry) -> Optional[AlertRecord]:
+    """Extracts an entry into an AlertRecord in one pass over its element tree."""
+    try:
+        text: Dict[str, str] = {}
+        geocodes: Dict[str, List[str]] = {}
+        parameters: Dict[str, List[str]] = {}
+        links: List[str] = []
+        _walk(entry, text, geocodes, parameters, links)
+
+        alert_id = text.get("id")
+        if not alert_id:
+            return None
+        get = text.get
+        event = _intern(get("event", "Unknown"))
+        severity = _intern(get("severity", "Unknown"))
+        certainty = _intern(get("certainty", "Unknown"))
+        urgency = _intern(get("urgency", "Unknown"))
+        title = get("title", "")
+        area_desc = get("areaDesc", "")
+        effective = parse_cap_time(get("effective"))
+        expires = parse_cap_time(get("expires"))
+        ugc = tuple(sorted(map(_intern, {code.upper() for code in geocodes.get("UGC", ())})))
+        fips6 = tuple(sorted(map(_intern, set(geocodes.get("FIPS6", ()) or geocodes.get("SAME", ())))))
+        return AlertRecord(
+            id=alert_id, title=title, summary=get("summary", ""), event=event,
+            severity=severity, certainty=certainty, urgency=urgency,
+            severity_level=SEVERITY_LEVELS.get(severity, 0), certainty_level=CERTAINTY_LEVELS.get(certainty, 0),
+            urgency_level=URGENCY_LEVELS.get(urgency, 0),
+            msg_type=_intern(get("msgType", "Alert")), status=_intern(get("status", "Actual")),
+            updated=parse_cap_time(get("updated")), sent=parse_cap_time(get("sent")),
+            effective=effective, onset=parse_cap_time(get("onset")), expires=expires,
+            area_desc=area_desc, polygon=get("polygon", ""), link=links[0] if links else "", ugc=ugc, fips6=fips6,
+            vtec=tuple(parameters.get("VTEC", ())),
+            fingerprint=content_fingerprint(event, title, area_desc, effective, expires, ugc + fips6))
+    except Exception as e:
+        logging.error("Failed to extract alert data: %s", e)
+        return None
+
+
+def extract_json_alert(feature: dict) -> Optional[AlertRecord]:
+    """Extracts an api.weather.gov GeoJSON alert feature into an AlertRecord.
+
+    The feature's ``id`` is the alert URL that api.weather.gov's Atom feed also uses as the entry id, so
+    the same alert from either format de-duplicates. SAME codes are the FIPS6 county codes.
+    """
+    try:
+        props = feature.get("properties") or {}
+        alert_id = feature.get("id") or props.get("@id") or props.get("id")
+        if not alert_id:
+            return None
+        get = props.get
+        event = _intern(get("event") or "Unknown")
+        severity = _intern(get("severity") or "Unknown")
+        certainty = _intern(get("certainty") or "Unknown")
+        urgency = _intern(get("urgency") or "Unknown")
+        title = get("headline") or event
+        area_desc = get("areaDesc") or ""
+        effective = parse_cap_time(get("effective"))
+        expires = parse_cap_time(get("expires"))
+        geocode = get("geocode") or {}
+        ugc = tuple(sorted(map(_intern, {code.upper() for code in geocode.get("UGC") or ()})))
+        fips6 = tuple(sorted(map(_intern, set(geocode.get("SAME") or ()))))
+        geometry = feature.get("geometry") or {}
+        polygon = ""
+        if geometry.get("type") == "Polygon" and geometry.get("coordinates"):
+            polygon = " ".join(f"{lat},{lon}" for lon, lat in geometry["coordinates"][0])
+        sent = parse_cap_time(get("sent"))
+        return AlertRecord(
+            id=alert_id, title=title, summary=get("description") or "", event=event,
+            severity=severity, certainty=certainty, urgency=urgency,
+            severity_level=SEVERITY_LEVELS.get(severity, 0), certainty_level=CERTAINTY_LEVELS.get(certainty, 0),
+            urgency_level=URGENCY_LEVELS.get(urgency, 0),
+            msg_type=_intern(get("messageType") or "Alert"), status=_intern(get("status") or "Actual"),
+            updated=sent, sent=sent, effective=effective, onset=parse_cap_time(get("onset")), expires=expires,
+            area_desc=area_desc, polygon=polygon, link=alert_id, ugc=ugc, fips6=fips6,
+            vtec=tuple((get("parameters") or {}).get("VTEC") or ()),
+            fingerprint=content_fingerprint(event, title, area_desc, effective, expires, ugc + fips6))
+    except Exception as e:
+        logging.error("Failed to extract JSON alert data: %s", e)
+        return None
+
+
+def _feed_entries(feed_content: str, limit: Optional[int] = None, fmt: str = "atom") -> list:
+    if fmt == "json":
+        import json
+        entries = json.loads(feed_content).get("features") or []
+    else:
+        import xml.etree.ElementTree as ET  # Deferred: importing AlertRecord alone shouldn't load the XML stack
+        root = ET.fromstring(feed_content)
+        entries = root.findall(f"./{ATOM_NS}entry")
+    return entries[:limit] if limit is not None else entries
+
+
+def _extractor(fmt: str):
+    return extract_json_alert if fmt == "json" else extract_alert_data
+
+
+def parse_feed(feed_content: str, limit: Optional[int] = None, fmt: str = "atom") -> List[AlertRecord]:
+    """Parses a feed document ("atom" or "json") into AlertRecords (at most ``limit`` entries)."""
+    return [record for record in map(_extractor(fmt), _feed_entries(feed_content, limit, fmt)) if record]
+
+
+def parse_and_match(feed_content: str, limit: Optional[int] = None, watched_codes: FrozenSet[str] = frozenset(),
+                    fmt: str = "atom") -> List[Tuple[AlertRecord, Tuple[str, ...]]]:
+    """Parses a feed and pairs each alert with the watched (subscribed) codes it covers.
+
+    The geocode intersection is done here so pool workers absorb it too; the
+    event loop only queries subscriptions for alerts with a non-empty match.
+    """
+    return parse_and_match_timed(feed_content, limit, watched_codes, fmt)[0]
+
+
+def parse_and_match_timed(feed_content: str, limit: Optional[int] = None, watched_codes: FrozenSet[str] = frozenset(),
+                          fmt: str = "atom"
+                          ) -> Tuple[List[Tuple[AlertRecord, Tuple[str, ...]]], Tuple[float, float, float]]:
+    """``parse_and_match`` plus the seconds spent in ``ET.fromstring``, ``extract_alert_data`` and matching.
+
+    The timings travel back with the result, so they are measured in pool workers too. For JSON
+    documents the first figure is ``json.loads``.
+    """
+    started = time.perf_counter()
+    entries = _feed_entries(feed_content, limit, fmt)
+    parsed = time.perf_counter()
+    records = [record for record in map(_extractor(fmt), entries) if record]
+    extracted = time.perf_counter()
+    results = []
+    for record in records:
+        matched = tuple(code for code in record.geocodes if code in watched_codes) if watched_codes else ()
+        results.append((record, matched))
+    return results, (parsed - started, extracted - parsed, time.perf_counter() - extracted)
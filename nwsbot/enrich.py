@@ -0,0 +1,216 @@
+"""CAP detail enrichment: full description, instructions and polygon for posted alerts.
+
+Feed entries only carry a short summary. The complete text is in each alert's
+linked CAP document, which is either CAP 1.2 XML or an api.weather.gov GeoJSON
+feature. ``CapEnricher`` fetches those documents:
+
+* A fetch starts in the background as soon as an alert passes the filters, with
+  at most ``concurrency`` requests in flight. Callers never wait on it. The
+  renderer uses a document only if it has already arrived. Otherwise the alert
+  is posted with its summary and the message is edited once the details come in.
+  An urgent alert's first post is therefore never held back.
+* Documents are cached under ``(id, updated)``, in memory (LRU) and on disk
+  (one small JSON file per document). An alert version is fetched at most once,
+  even across restarts. Concurrent requests for the same key share one fetch.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from nwsbot.cap import ATOM_NS, CAP_NS, AlertRecord
+
+DetailFetch = Callable[[str], Awaitable[Optional[str]]]  # url -> document text (None on failure)
+CacheKey = Tuple[str, int]
+
+
+@dataclass(frozen=True, slots=True)
+class CapDetail:
+    description: str = ""
+    instruction: str = ""
+    polygon: str = ""
+
+
+def parse_cap_detail(content: str) -> Optional[CapDetail]:
+    """Reads description, instruction and polygon from a CAP XML document or GeoJSON alert feature."""
+    content = content.lstrip()
+    if content.startswith("{"):
+        feature = json.loads(content)
+        props = feature.get("properties") or {}
+        geometry = feature.get("geometry") or {}
+        polygon = ""
+        if geometry.get("type") == "Polygon" and geometry.get("coordinates"):
+            polygon = " ".join(f"{lat},{lon}" for lon, lat in geometry["coordinates"][0])
+        return CapDetail((props.get("description") or "").strip(), (props.get("instruction") or "").strip(),
+                         polygon)
+    import xml.etree.ElementTree as ET
+    root = ET.fromstring(content)
+    if root.tag == f"{ATOM_NS}entry":  # Some endpoints wrap the CAP alert in an Atom entry
+        alert = root.find(f".//{CAP_NS}alert")
+        root = alert if alert is not None else root
+    info = root.find(f"{CAP_NS}info")
+    if info is None:
+        return None
+
+    def text(path: str) -> str:
+        element = info.find(path)
+        return element.text.strip() if element is not None and element.text else ""
+
+    return CapDetail(text(f"{CAP_NS}description"), text(f"{CAP_NS}instruction"),
+                     text(f"{CAP_NS}area/{CAP_NS}polygon"))
+
+
+class DetailCache:
+    """LRU of parsed details in front of a directory of JSON files, both keyed by (alert id, updated).
+
+    The memory side is not thread-safe and belongs to the event loop; ``load`` and ``store`` only touch
+    the disk, so they can run in a worker thread.
+    """
+
+    def __init__(self, capacity: int = 512, directory: Optional[str] = None):
+        self.capacity = max(1, capacity)
+        self.directory = directory
+        self._memory: "OrderedDict[CacheKey, CapDetail]" = OrderedDict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: CacheKey) -> str:
+        digest = hashlib.sha1(f"{key[0]}|{key[1]}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get_memory(self, key: CacheKey) -> Optional[CapDetail]:
+        detail = self._memory.get(key)
+        if detail is not None:
+            self._memory.move_to_end(key)
+        return detail
+
+    def load(self, key: CacheKey) -> Optional[CapDetail]:
+        """Disk lookup (blocking)."""
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                detail = CapDetail(**json.load(f)["detail"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return detail
+
+    def remember(self, key: CacheKey, detail: CapDetail):
+        self._memory[key] = detail
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def store(self, key: CacheKey, detail: CapDetail):
+        """Disk write (blocking); the file is written atomically."""
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"id": key[0], "updated": key[1], "detail": asdict(detail)}, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logging.warning("CAP detail cache write failed: %s", e)
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Deletes cache files older than `max_age_seconds`; returns how many."""
+        if not self.directory:
+            return 0
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+
+class CapEnricher:
+    """Bounded-concurrency CAP detail fetcher over a DetailCache."""
+
+    def __init__(self, fetch: DetailFetch, cache: DetailCache, concurrency: int = 4,
+                 on_outcome: Optional[Callable[[str], None]] = None):
+        self._fetch = fetch
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._pending: Dict[CacheKey, asyncio.Task] = {}
+        self._on_outcome = on_outcome
+        self.outcomes: Dict[str, int] = {"memory": 0, "disk": 0, "fetched": 0, "error": 0}
+
+    def _count(self, outcome: str):
+        self.outcomes[outcome] += 1
+        if self._on_outcome:
+            self._on_outcome(outcome)
+
+    @staticmethod
+    def key(alert_data: AlertRecord) -> CacheKey:
+        return alert_data.id, alert_data.updated or alert_data.sent or 0
+
+    @staticmethod
+    def url(alert_data: AlertRecord) -> str:
+        return alert_data.link or (alert_data.id if alert_data.id.startswith("http") else "")
+
+    def cached(self, alert_data: AlertRecord) -> Optional[CapDetail]:
+        """The detail if it is already in memory; never waits."""
+        detail = self.cache.get_memory(self.key(alert_data))
+        if detail is not None:
+            self._count("memory")
+        return detail
+
+    def prefetch(self, alert_data: AlertRecord) -> Optional[asyncio.Task]:
+        """Starts (or joins) the background lookup for an alert; None when it has no CAP link."""
+        key = self.key(alert_data)
+        task = self._pending.get(key)
+        if task is None and self.url(alert_data):
+            task = self._pending[key] = asyncio.create_task(self._lookup(key, self.url(alert_data)))
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return task
+
+    async def get(self, alert_data: AlertRecord) -> Optional[CapDetail]:
+        detail = self.cache.get_memory(self.key(alert_data))
+        if detail is not None:
+            return detail
+        task = self.prefetch(alert_data)
+        return await asyncio.shield(task) if task else None
+
+    async def _lookup(self, key: CacheKey, url: str) -> Optional[CapDetail]:
+        detail = self.cache.get_memory(key)
+        if detail is not None:
+            return detail
+        detail = await asyncio.to_thread(self.cache.load, key)
+        if detail is not None:
+            self.cache.remember(key, detail)
+            self._count("disk")
+            return detail
+        async with self._semaphore:
+            content = await self._fetch(url)
+        try:
+            detail = await asyncio.to_thread(parse_cap_detail, content) if content else None
+        except Exception as e:
+            logging.warning("CAP detail for %s unreadable: %s", key[0], e)
+            detail = None
+        if detail is None:
+            self._count("error")
+            return None
+        self._count("fetched")
+        self.cache.remember(key, detail)
+        await asyncio.to_thread(self.cache.store, key, detail)
+        return detail
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
@@ -0,0 +1,84 @@
+"""Min-heap of posted alerts' expiry times.
+
+One timer task sleeps until the earliest expiry and then edits the messages
+that are due, so there is no periodic table scan and no sleeping task per
+alert. The heap is rebuilt from ``posted_alerts`` at startup and changed on
+post, update and cancel.
+
+Rescheduling and removal are lazy. ``entries`` holds the current expiry for
+each alert id. A heap item whose time no longer matches its entry is stale and
+is skipped when it reaches the top. When stale items outnumber live ones, the
+heap is rebuilt.
+"""
+
+import heapq
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ExpiryEntry:
+    nws_id: str
+    expires: float
+    message_id: int
+    thread_id: Optional[int] = None
+    attempts: int = 0  # Failed edit attempts so far
+    webhook_id: Optional[int] = None  # Set when a pool webhook posted it (only that webhook can edit it)
+
+
+class ExpiryHeap:
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self.entries: Dict[str, ExpiryEntry] = {}
+
+    def push(self, entry: ExpiryEntry):
+        """Adds an alert, or moves it to its new expiry."""
+        self.entries[entry.nws_id] = entry
+        heapq.heappush(self._heap, (entry.expires, entry.nws_id))
+        if len(self._heap) > 2 * len(self.entries) + 64:
+            self._compact()
+
+    def reschedule(self, nws_id: str, expires: float) -> bool:
+        entry = self.entries.get(nws_id)
+        if entry is None or entry.expires == expires:
+            return False
+        self.push(replace(entry, expires=expires))
+        return True
+
+    def remove(self, nws_id: str) -> Optional[ExpiryEntry]:
+        return self.entries.pop(nws_id, None)
+
+    def _prune_top(self):
+        heap = self._heap
+        while heap:
+            expires, nws_id = heap[0]
+            entry = self.entries.get(nws_id)
+            if entry is not None and entry.expires == expires:
+                return
+            heapq.heappop(heap)
+
+    def next_due(self) -> Optional[float]:
+        self._prune_top()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: int) -> List[ExpiryEntry]:
+        """Removes and returns up to `limit` entries due at `now`, earliest first."""
+        due = []
+        while len(due) < limit:
+            self._prune_top()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, nws_id = heapq.heappop(self._heap)
+            due.append(self.entries.pop(nws_id))
+        return due
+
+    def _compact(self):
+        self._heap = [(entry.expires, entry.nws_id) for entry in self.entries.values()]
+        heapq.heapify(self._heap)
+
+    def clear(self):
+        self._heap.clear()
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
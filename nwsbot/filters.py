@@ -0,0 +1,292 @@
+"""Compiled alert filter rules.
+
+Each destination (an alert channel, or ``default``) has a ``FilterConfig``:
+minimum severity/certainty/urgency, an event blocklist and an ordered list of
+rules. Rules are written as ``<allow|block> key=value ...``, for example::
+
+    block event="*Statement"
+    allow "event=/^Tornado (Warning|Emergency)$/" areas=TXC113,TXZ119
+    block severity=Minor hours=22-06 type=Update
+
+Supported keys:
+
+* ``event``     glob (case-insensitive) or ``/regex/``
+* ``severity``, ``certainty``, ``urgency``  minimum level (e.g. ``Severe``)
+* ``areas``     comma-separated UGC/FIPS codes, matches if any overlap
+* ``hours``     ``HH-HH`` UTC window, may wrap midnight
+* ``type``      comma-separated CAP msgType values (Alert, Update, Cancel)
+
+Rules are checked in order and the first matching rule decides. If no rule
+matches, the minimum levels and blocklist apply. A config compiles into a
+``FilterSet``, whose ``allows()`` only runs pre-built predicates.
+"""
+
+import fnmatch
+import json
+import logging
+import re
+import shlex
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+SEVERITY_LEVELS = {"Unknown": 0, "Minor": 1, "Moderate": 2, "Severe": 3, "Extreme": 4}
+CERTAINTY_LEVELS = {"Unknown": 0, "Unlikely": 1, "Possible": 2, "Likely": 3, "Observed": 4}
+URGENCY_LEVELS = {"Unknown": 0, "Past": 1, "Future": 2, "Expected": 3, "Immediate": 4}
+LEVEL_TABLES = {"severity": SEVERITY_LEVELS, "certainty": CERTAINTY_LEVELS, "urgency": URGENCY_LEVELS}
+
+DEFAULT_DESTINATION = "default"
+RULE_ACTIONS = ("allow", "block")
+RULE_KEYS = ("event", "severity", "certainty", "urgency", "areas", "hours", "type")
+
+
+class FilterRuleError(ValueError):
+    """Raised when a rule string cannot be parsed or compiled."""
+
+
+class AlertView:
+    """Wraps an AlertRecord with the lazily computed values rule predicates need."""
+    __slots__ = ("alert", "event", "_now")
+
+    def __init__(self, record, now: Optional[datetime] = None):
+        self.alert = record
+        self.event = record.event.lower()
+        self._now = now
+
+    @property
+    def hour(self) -> int:
+        if self._now is None:
+            self._now = datetime.now(timezone.utc)
+        return self._now.hour
+
+
+# --- Rule Parsing & Compilation ---
+def _parse_level(key: str, value: str) -> int:
+    table = LEVEL_TABLES[key]
+    title = value.title()
+    if title not in table:
+        raise FilterRuleError(f"Invalid {key} '{value}'. Options: {', '.join(table)}")
+    return table[title]
+
+
+def _parse_hours(value: str) -> Tuple[int, int]:
+    try:
+        start_str, end_str = value.split("-", 1)
+        start, end = int(start_str), int(end_str)
+    except ValueError:
+        raise FilterRuleError(f"Invalid hours '{value}'. Use HH-HH (UTC), e.g. 22-06.") from None
+    if not (0 <= start <= 23 and 0 <= end <= 24):
+        raise FilterRuleError(f"Invalid hours '{value}'. Hours must be 0-24.")
+    return start, end
+
+
+def _event_predicate(value: str) -> Callable[[AlertView], bool]:
+    if len(value) > 1 and value.startswith("/") and value.endswith("/"):
+        try:
+            pattern = re.compile(value[1:-1], re.IGNORECASE)
+        except re.error as e:
+            raise FilterRuleError(f"Invalid event regex '{value}': {e}") from None
+    elif any(ch in value for ch in "*?["):
+        match = re.compile(fnmatch.translate(value.lower())).match  # A glob covers the whole event name
+        return lambda view: match(view.event) is not None
+    else:
+        exact = value.lower()
+        return lambda view: view.event == exact
+    search = pattern.search
+    return lambda view: search(view.event) is not None
+
+
+def _level_predicate(key: str, value: str) -> Callable[[AlertView], bool]:
+    minimum = _parse_level(key, value)
+    attribute = f"{key}_level"
+    return lambda view: getattr(view.alert, attribute) >= minimum
+
+
+def _areas_predicate(value: str) -> Callable[[AlertView], bool]:
+    areas = frozenset(code.strip().upper() for code in value.split(",") if code.strip())
+    if not areas:
+        raise FilterRuleError("areas= needs at least one code.")
+    return lambda view: not areas.isdisjoint(view.alert.geocodes)
+
+
+def _hours_predicate(value: str) -> Callable[[AlertView], bool]:
+    start, end = _parse_hours(value)
+    if start <= end:
+        return lambda view: start <= view.hour < end
+    return lambda view: view.hour >= start or view.hour < end
+
+
+def _type_predicate(value: str) -> Callable[[AlertView], bool]:
+    types = frozenset(t.strip().lower() for t in value.split(",") if t.strip())
+    if not types:
+        raise FilterRuleError("type= needs at least one msgType.")
+    return lambda view: view.alert.msg_type.lower() in types
+
+
+class CompiledRule:
+    """A parsed rule: its source text, action and predicate chain."""
+    __slots__ = ("source", "allow", "predicates", "hourly")
+
+    def __init__(self, source: str, allow: bool, predicates: Tuple[Callable[[AlertView], bool], ...],
+                 hourly: bool = False):
+        self.source = source
+        self.allow = allow
+        self.predicates = predicates
+        self.hourly = hourly  # Has an hours= window, so its result can change on the hour
+
+    def matches(self, view: AlertView) -> bool:
+        for predicate in self.predicates:
+            if not predicate(view):
+                return False
+        return True
+
+
+def compile_rule(text: str) -> CompiledRule:
+    """Parses and compiles a single ``<allow|block> key=value ...`` rule."""
+    try:
+        tokens = shlex.split(text)
+    except ValueError as e:
+        raise FilterRuleError(f"Cannot parse rule: {e}") from None
+    if not tokens or tokens[0].lower() not in RULE_ACTIONS:
+        raise FilterRuleError("Rule must start with 'allow' or 'block'.")
+    predicates = []
+    area_predicates = []  # Set intersection is the costliest check, so it always runs last.
+    hourly = False
+    for token in tokens[1:]:
+        key, sep, value = token.partition("=")
+        key = key.strip().lower()
+        value = value.strip()
+        if not sep or not value:
+            raise FilterRuleError(f"Expected key=value, got '{token}'.")
+        if key == "event":
+            predicates.append(_event_predicate(value))
+        elif key in LEVEL_TABLES:
+            predicates.append(_level_predicate(key, value))
+        elif key == "areas":
+            area_predicates.append(_areas_predicate(value))
+        elif key == "hours":
+            predicates.append(_hours_predicate(value))
+            hourly = True
+        elif key == "type":
+            predicates.append(_type_predicate(value))
+        else:
+            raise FilterRuleError(f"Unknown rule key '{key}'. Keys: {', '.join(RULE_KEYS)}")
+    predicates.extend(area_predicates)
+    if not predicates:
+        raise FilterRuleError("Rule needs at least one condition.")
+    normalized = " ".join([tokens[0].lower()] + [shlex.quote(t) for t in tokens[1:]])
+    return CompiledRule(normalized, tokens[0].lower() == "allow", tuple(predicates), hourly)
+
+
+# --- Filter Config & Compiled Sets ---
+class FilterConfig:
+    """Editable, JSON-serialisable filter settings for one destination."""
+
+    def __init__(self, min_severity: str = "Moderate", min_certainty: str = "Likely",
+                 min_urgency: str = "Expected", blocked_event_types: Iterable[str] = (),
+                 rules: Iterable[str] = ()):
+        self.min_severity = min_severity if min_severity in SEVERITY_LEVELS else "Moderate"
+        self.min_certainty = min_certainty if min_certainty in CERTAINTY_LEVELS else "Likely"
+        self.min_urgency = min_urgency if min_urgency in URGENCY_LEVELS else "Expected"
+        self.blocked_event_types = {e.lower().strip() for e in blocked_event_types if e and e.strip()}
+        self.rules = list(rules)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FilterConfig":
+        return cls(min_severity=str(data.get("min_severity", "Moderate")).title(),
+                   min_certainty=str(data.get("min_certainty", "Likely")).title(),
+                   min_urgency=str(data.get("min_urgency", "Expected")).title(),
+                   blocked_event_types=data.get("blocked_event_types", []),
+                   rules=data.get("rules", []))
+
+    def to_dict(self) -> dict:
+        return {"min_severity": self.min_severity, "min_certainty": self.min_certainty,
+                "min_urgency": self.min_urgency, "blocked_event_types": sorted(self.blocked_event_types),
+                "rules": list(self.rules)}
+
+    def copy(self) -> "FilterConfig":
+        return FilterConfig.from_dict(self.to_dict())
+
+    def compile(self) -> "FilterSet":
+        return FilterSet(self)
+
+
+def _compile_baseline(config: FilterConfig) -> Callable[..., bool]:
+    """Builds the blocklist + minimum-level check as one closure over plain ints."""
+    blocked = frozenset(config.blocked_event_types)
+    min_sev = SEVERITY_LEVELS[config.min_severity]
+    min_cert = CERTAINTY_LEVELS[config.min_certainty]
+    min_urg = URGENCY_LEVELS[config.min_urgency]
+
+    def baseline(record) -> bool:
+        return (record.severity_level >= min_sev and record.certainty_level >= min_cert
+                and record.urgency_level >= min_urg and record.event.lower() not in blocked)
+
+    return baseline
+
+
+class FilterSet:
+    """Immutable compiled form of a FilterConfig."""
+    __slots__ = ("config", "rules", "hourly", "_baseline")
+
+    def __init__(self, config: FilterConfig):
+        self.config = config
+        self.rules = tuple(compile_rule(r) for r in config.rules)
+        self.hourly = any(rule.hourly for rule in self.rules)  # Decisions may change at each UTC hour
+        self._baseline = _compile_baseline(config)
+
+    def allows(self, record, now: Optional[datetime] = None) -> bool:
+        """Whether an AlertRecord passes this destination's rules, or else its baseline."""
+        if self.rules:
+            view = AlertView(record, now)
+            for rule in self.rules:
+                if rule.matches(view):
+                    return rule.allow
+        return self._baseline(record)
+
+
+class FilterRegistry:
+    """Per-destination filter sets, swapped atomically on every change."""
+
+    def __init__(self, default: Optional[FilterConfig] = None):
+        self._sets: Dict[str, FilterSet] = {DEFAULT_DESTINATION: (default or FilterConfig()).compile()}
+
+    def destinations(self) -> List[str]:
+        return sorted(self._sets)
+
+    def get(self, destination: Optional[str] = None) -> FilterSet:
+        """Returns the filter set for a destination, falling back to the default."""
+        if destination is not None:
+            found = self._sets.get(str(destination))
+            if found is not None:
+                return found
+        return self._sets[DEFAULT_DESTINATION]
+
+    def config_for(self, destination: Optional[str] = None) -> FilterConfig:
+        """Returns an editable copy of a destination's effective config."""
+        return self.get(destination).config.copy()
+
+    def update(self, destination: Optional[str], config: FilterConfig) -> FilterSet:
+        """Compiles a config and swaps it in. Raises FilterRuleError on bad rules."""
+        compiled = config.compile()
+        self._sets[str(destination) if destination is not None else DEFAULT_DESTINATION] = compiled
+        return compiled
+
+    def remove(self, destination: str) -> bool:
+        if destination == DEFAULT_DESTINATION:
+            return False
+        return self._sets.pop(str(destination), None) is not None
+
+    def dumps(self) -> str:
+        return json.dumps({dest: fs.config.to_dict() for dest, fs in self._sets.items()}, sort_keys=True)
+
+    @classmethod
+    def loads(cls, text: str, default: Optional[FilterConfig] = None) -> "FilterRegistry":
+        """Rebuilds a registry from ``dumps()`` output. Invalid destinations are skipped."""
+        registry = cls(default)
+        data = json.loads(text)
+        for dest, raw in data.items():
+            try:
+                registry.update(dest, FilterConfig.from_dict(raw))
+            except FilterRuleError as e:
+                logging.warning(f"Skipping stored filters for '{dest}': {e}")
+        return registry
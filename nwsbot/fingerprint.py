@@ -0,0 +1,24 @@
+"""Content fingerprints for spotting reissued but unchanged alerts.
+
+NWS sometimes republishes a product under a new Atom id with the same event,
+headline, area and times. The fingerprint hashes those fields after
+normalisation (case, whitespace, epoch times) together with the sorted
+geocodes, so such a reissue hashes to the same value as the original post.
+"""
+
+import hashlib
+from typing import Iterable, Optional
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    return " ".join(value.split()).casefold() if value else ""
+
+
+def content_fingerprint(event: str, title: str, area_desc: str, effective: Optional[int],
+                        expires: Optional[int], geocodes: Iterable[str]) -> str:
+    """Returns a 32-character hex digest of an alert's meaningful content."""
+    parts = (_normalize_text(event), _normalize_text(title), _normalize_text(area_desc),
+             "" if effective is None else str(effective), "" if expires is None else str(expires),
+             " ".join(sorted(geocodes)))
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
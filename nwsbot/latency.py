@@ -0,0 +1,141 @@
+"""End-to-end alert latency histograms.
+
+Each posted alert contributes one observation per segment:
+
+* ``total``: CAP ``sent`` to Discord acknowledging the post
+* ``feed``: CAP ``sent`` to the bot first seeing it in the feed (NWS publishing plus our poll interval)
+* ``pipeline``: feed-seen to Discord ack (dedup, filter, render, send queue and rate limits)
+
+Observations go into hourly, per-severity histograms with log-spaced buckets.
+A report over the last N hours merges at most N histograms per severity;
+percentiles are interpolated within a bucket, so they are accurate to about
+half a bucket (~10%). The hourly histograms are small and are persisted as
+JSON counts, so a report never scans per-alert rows.
+"""
+
+import bisect
+import json
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SEGMENTS = ("total", "feed", "pipeline")
+HOUR = 3600
+
+# 0.5s .. ~6h, each bucket 20% wider than the last
+BOUNDS: Tuple[float, ...] = tuple(round(0.5 * 1.2 ** i, 3) for i in range(53))
+
+Key = Tuple[int, str, str]  # (hour start epoch, severity, segment)
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "total", "sum")
+
+    def __init__(self, counts: Optional[List[int]] = None, total: int = 0, sum: float = 0.0):
+        self.counts = counts if counts is not None else [0] * (len(BOUNDS) + 1)
+        self.total = total
+        self.sum = sum
+
+    def observe(self, seconds: float):
+        seconds = max(0.0, seconds)
+        self.counts[bisect.bisect_left(BOUNDS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+
+    def merge(self, other: "LatencyHistogram"):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.total += other.total
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Linear interpolation inside the bucket holding the q-th observation."""
+        if not self.total:
+            return None
+        rank = q * self.total
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = BOUNDS[i - 1] if i > 0 else 0.0
+                upper = BOUNDS[i] if i < len(BOUNDS) else lower * 1.2
+                return lower + (upper - lower) * max(0.0, rank - cumulative) / count
+            cumulative += count
+        return BOUNDS[-1]
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.total if self.total else None
+
+    def dumps(self) -> str:
+        # Trailing empty buckets are dropped; most alerts land in the first few dozen
+        last = max((i for i, c in enumerate(self.counts) if c), default=-1)
+        return json.dumps({"c": self.counts[:last + 1], "n": self.total, "s": round(self.sum, 3)})
+
+    @classmethod
+    def loads(cls, text: str) -> "LatencyHistogram":
+        data = json.loads(text)
+        counts = list(data.get("c", []))[:len(BOUNDS) + 1]
+        counts += [0] * (len(BOUNDS) + 1 - len(counts))
+        return cls(counts, int(data.get("n", sum(counts))), float(data.get("s", 0.0)))
+
+
+def hour_of(epoch: float) -> int:
+    return int(epoch) // HOUR * HOUR
+
+
+class LatencyTracker:
+    """Hourly per-severity histograms for each segment, with a dirty set for persistence."""
+
+    def __init__(self):
+        self._histograms: Dict[Key, LatencyHistogram] = {}
+        self._dirty: set = set()
+
+    def observe(self, severity: str, sent: Optional[float], seen: float, posted: float):
+        hour = hour_of(posted)
+        observations = [("pipeline", posted - seen)]
+        if sent:
+            observations += [("total", posted - sent), ("feed", seen - sent)]
+        for segment, seconds in observations:
+            key = (hour, severity, segment)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.observe(seconds)
+            self._dirty.add(key)
+
+    def load(self, rows: Iterable[Tuple[int, str, str, str]]):
+        """Rows of (hour, severity, segment, dumps()) as stored in the database."""
+        for hour, severity, segment, counts in rows:
+            try:
+                self._histograms[(hour, severity, segment)] = LatencyHistogram.loads(counts)
+            except (ValueError, TypeError):
+                continue
+
+    def take_dirty(self) -> List[Tuple[int, str, str, str]]:
+        rows = [(*key, self._histograms[key].dumps()) for key in self._dirty if key in self._histograms]
+        self._dirty.clear()
+        return rows
+
+    def prune(self, before: float):
+        cutoff = hour_of(before)
+        for key in [k for k in self._histograms if k[0] < cutoff]:
+            del self._histograms[key]
+            self._dirty.discard(key)
+
+    def window(self, hours: int, now: float, segment: str = "total") -> Dict[str, LatencyHistogram]:
+        """Merged histogram per severity over the last `hours` hours (the current hour included)."""
+        first_hour = hour_of(now) - (max(1, hours) - 1) * HOUR
+        merged: Dict[str, LatencyHistogram] = {}
+        for (hour, severity, seg), histogram in self._histograms.items():
+            if seg == segment and hour >= first_hour:
+                merged.setdefault(severity, LatencyHistogram()).merge(histogram)
+        return merged
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None or math.isnan(seconds):
+        return "n/a"
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds / 3600:.1f}h"
@@ -0,0 +1,160 @@
+"""Leader lease for running two bot instances against one database.
+
+Only the lease holder posts alerts and runs database cleanup; the standby
+keeps its caches warm and takes over once the lease lapses. Two backends:
+
+* ``SQLiteLease``: a heartbeat row in the shared SQLite database. The holder
+  renews ``expires_at`` and anyone may claim the row once it has expired.
+* ``FileLockLease``: an exclusive ``flock`` on a local file. It suits two
+  instances on one host, where the OS drops the lock as soon as the holder
+  dies.
+
+Backends are synchronous; callers run them via ``asyncio.to_thread``.
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def make_holder_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class LeaseBackend:
+    """Interface: ``try_acquire`` both acquires and renews."""
+    name = "base"
+
+    def try_acquire(self, holder: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    def release(self, holder: str):
+        raise NotImplementedError
+
+    def current_holder(self) -> Optional[str]:
+        raise NotImplementedError
+
+
+class SQLiteLease(LeaseBackend):
+    name = "sqlite"
+
+    def __init__(self, database_file: str, lease_name: str = "alert_poster"):
+        self.database_file = database_file
+        self.lease_name = lease_name
+        conn = sqlite3.connect(self.database_file)
+        try:
+            conn.execute('CREATE TABLE IF NOT EXISTS leader_lease (name TEXT PRIMARY KEY, holder TEXT NOT NULL, '
+                         'expires_at REAL NOT NULL, acquired_at REAL NOT NULL)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def try_acquire(self, holder: str, ttl: float) -> bool:
+        now = time.time()
+        conn = sqlite3.connect(self.database_file, timeout=5, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO leader_lease (name, holder, expires_at, acquired_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET "
+                "acquired_at = CASE WHEN leader_lease.holder = excluded.holder THEN leader_lease.acquired_at ELSE excluded.acquired_at END, "
+                "holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE leader_lease.holder = excluded.holder OR leader_lease.expires_at < ?",
+                (self.lease_name, holder, now + ttl, now, now))
+            row = conn.execute("SELECT holder FROM leader_lease WHERE name = ?", (self.lease_name,)).fetchone()
+            conn.execute("COMMIT")
+            return bool(row and row[0] == holder)
+        except sqlite3.Error as e:
+            logging.error(f"Lease acquire failed: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            return False
+        finally:
+            conn.close()
+
+    def release(self, holder: str):
+        conn = sqlite3.connect(self.database_file, timeout=5)
+        try:
+            conn.execute("UPDATE leader_lease SET expires_at = 0 WHERE name = ? AND holder = ?",
+                         (self.lease_name, holder))
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Lease release failed: {e}")
+        finally:
+            conn.close()
+
+    def current_holder(self) -> Optional[str]:
+        conn = sqlite3.connect(self.database_file, timeout=5)
+        try:
+            row = conn.execute("SELECT holder, expires_at FROM leader_lease WHERE name = ?",
+                               (self.lease_name,)).fetchone()
+        except sqlite3.Error:
+            return None
+        finally:
+            conn.close()
+        return row[0] if row and row[1] >= time.time() else None
+
+
+class FileLockLease(LeaseBackend):
+    name = "file"
+
+    def __init__(self, lock_path: str):
+        if fcntl is None:
+            raise RuntimeError("File-lock lease needs fcntl (POSIX).")
+        self.lock_path = lock_path
+        self._fd: Optional[int] = None
+        self._holder: Optional[str] = None
+
+    def try_acquire(self, holder: str, ttl: float) -> bool:
+        if self._fd is not None:
+            return self._holder == holder
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, holder.encode("utf-8"))
+        self._fd, self._holder = fd, holder
+        return True
+
+    def release(self, holder: str):
+        if self._fd is not None and self._holder == holder:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = self._holder = None
+
+    def current_holder(self) -> Optional[str]:
+        if self._fd is not None:
+            return self._holder
+        try:
+            with open(self.lock_path, "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+
+class AlwaysLeader(LeaseBackend):
+    """Single-instance default: leadership is never contested."""
+    name = "none"
+
+    def try_acquire(self, holder: str, ttl: float) -> bool:
+        return True
+
+    def release(self, holder: str):
+        pass
+
+    def current_holder(self) -> Optional[str]:
+        return None
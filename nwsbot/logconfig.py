@@ -0,0 +1,135 @@
+"""Non-blocking logging: a queue in front of rotating file and console handlers.
+
+Handlers on the root logger used to write to disk and stdout inside every log
+call, on the event loop. Now the root logger only has a ``DroppingQueueHandler``,
+and a ``QueueListener`` thread does the formatting and I/O:
+
+* The calling thread only merges the %-args into the message (the listener
+  can't do that safely later) and puts the record on a bounded queue. If the
+  listener falls behind, records are dropped and counted instead of blocking
+  the caller.
+* ``SizeTimeRotatingFileHandler`` rolls the single ``nwsbot.log`` over on size
+  or after ``rotate_hours``, keeps ``backup_count`` numbered files, and deletes
+  rolled-over files older than ``retention_days``.
+* ``JsonFormatter`` writes one JSON object per line for log shippers.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s [%(funcName)s:%(lineno)d] - %(message)s'
+LOG_FILE_NAME = "nwsbot.log"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {"ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+                "level": record.levelname, "logger": record.name, "func": record.funcName, "line": record.lineno,
+                "thread": record.threadName, "msg": record.getMessage()}
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class SizeTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Numbered rotation on size or age, plus deletion of old rolled-over files."""
+
+    def __init__(self, filename: str, max_bytes: int = 10_000_000, backup_count: int = 10, rotate_hours: float = 24,
+                 retention_days: float = 14, encoding: str = "utf-8"):
+        super().__init__(filename, mode="a", maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.rotate_seconds = rotate_hours * 3600
+        self.retention_seconds = retention_days * 86400
+        try:
+            opened = os.path.getmtime(filename) if os.path.getsize(filename) else time.time()
+        except OSError:
+            opened = time.time()
+        self.rollover_at = opened + self.rotate_seconds if self.rotate_seconds > 0 else float("inf")
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        if self.rotate_seconds > 0:
+            self.rollover_at = time.time() + self.rotate_seconds
+        self.prune()
+
+    def prune(self):
+        if self.retention_seconds <= 0:
+            return
+        directory, base = os.path.split(self.baseFilename)
+        cutoff = time.time() - self.retention_seconds
+        for name in os.listdir(directory or "."):
+            path = os.path.join(directory, name)
+            if name.startswith(base + ".") and name[len(base) + 1:].isdigit():
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: when the queue is full the record is dropped and counted."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+listener: Optional[logging.handlers.QueueListener] = None
+queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging(log_dir: str, level: str = "INFO", json_mode: bool = False, max_bytes: int = 10_000_000,
+                      backup_count: int = 10, rotate_hours: float = 24, retention_days: float = 14,
+                      queue_size: int = 10_000) -> str:
+    """Routes the root logger through a queue to a rotating file and stdout; returns the log file path."""
+    global listener, queue_handler
+    stop_logging()
+    os.makedirs(log_dir, exist_ok=True)
+    log_file_path = os.path.join(log_dir, LOG_FILE_NAME)
+    formatter = JsonFormatter() if json_mode else logging.Formatter(LOG_FORMAT)
+    file_handler = SizeTimeRotatingFileHandler(log_file_path, max_bytes, backup_count, rotate_hours, retention_days)
+    file_handler.setFormatter(formatter)
+    file_handler.prune()
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+    console_handler.setLevel(logging.INFO)
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=max(1, queue_size)))
+    logger = logging.getLogger()
+    logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    for h in logger.handlers[:]:
+        logger.removeHandler(h)
+    logger.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(queue_handler.queue, file_handler, console_handler,
+                                              respect_handler_level=True)
+    listener.start()
+    return log_file_path
+
+
+def stop_logging():
+    """Flushes queued records and stops the listener thread (safe to call more than once)."""
+    global listener
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        listener = None
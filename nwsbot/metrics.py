@@ -0,0 +1,257 @@
+"""Minimal in-process metrics with Prometheus text exposition.
+
+The bot only needs counters, gauges and fixed-bucket histograms, so a
+dependency like prometheus_client isn't worth it. On the hot path:
+
+* ``Counter.inc`` is an addition.
+* ``Histogram.observe`` is a ``bisect`` plus two additions.
+* Labelled children are looked up once with ``labels()`` and can be kept in a
+  variable.
+* Unlabelled metrics bind their single child's methods directly, so calling
+  them adds no extra hop.
+
+Nothing is locked. Updates come from the event loop, and occasionally from
+``asyncio.to_thread`` workers timing DB calls. There a lost increment under
+the GIL is an acceptable price for a free hot path.
+"""
+
+import bisect
+import functools
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+Sample = Tuple[str, Dict[str, str], float]
+
+# Seconds: from sub-millisecond (DB lookups, parsing small feeds) to a minute (slow fetches, long 429 waits)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List["Metric"] = []
+
+    def register(self, metric: "Metric"):
+        if any(m.name == metric.name for m in self._metrics):
+            raise ValueError(f"Metric {metric.name} already registered.")
+        self._metrics.append(metric)
+
+    def get(self, name: str) -> Optional["Metric"]:
+        return next((m for m in self._metrics if m.name == name), None)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if registry is not None:
+            registry.register(self)
+        if not self.labelnames:
+            self._bind(self.labels())
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _bind(self, child):
+        """Unlabelled metrics expose their only child's methods as their own."""
+
+    def labels(self, *values: str):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _labelled(self) -> Iterator[Tuple[Dict[str, str], object]]:
+        for values, child in self._children.items():
+            yield dict(zip(self.labelnames, values)), child
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _bind(self, child):
+        self.inc = child.inc
+
+    @property
+    def value(self) -> float:
+        return self.labels().value
+
+    def samples(self):
+        for labels, child in self._labelled():
+            yield "_total" if not self.name.endswith("_total") else "", labels, child.value
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value at scrape time instead (queue depths, ratios)."""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _bind(self, child):
+        self.set = child.set
+        self.inc = child.inc
+        self.dec = child.dec
+        self.set_function = child.set_function
+        self.get = child.get
+
+    def samples(self):
+        for labels, child in self._labelled():
+            yield "", labels, child.get()
+
+
+class _Timer:
+    __slots__ = ("child", "started")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        """``with histogram.time(): ...`` observes the block's wall time in seconds."""
+        return _Timer(self)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS,
+                 registry: Optional[Registry] = REGISTRY):
+        self.bounds = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def _bind(self, child):
+        self.observe = child.observe
+        self.time = child.time
+
+    def samples(self):
+        for labels, child in self._labelled():
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), child.counts):
+                cumulative += count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield "_sum", labels, child.sum
+            yield "_count", labels, child.count
+
+
+def timed(histogram_child) -> Callable:
+    """Decorator observing a function's wall time on a histogram (or labelled child)."""
+    observe = histogram_child.observe
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
@@ -0,0 +1,201 @@
+"""Rolling hot-path timers and a sampling profiler for ``!perf``.
+
+The Prometheus histograms in ``nwsbot.metrics`` are cumulative since startup,
+which hides a slowdown that began ten minutes ago. ``RollingHistogram`` keeps
+one bucket array per time slot (a minute by default) in a small ring. An
+observation resets a stale slot before counting, so reads only ever merge the
+live slots of the window. Recording costs a ``monotonic()`` call and a
+``bisect``.
+
+``SamplingProfiler`` is a thread that snapshots every thread's stack with
+``sys._current_frames()`` at a fixed interval and counts the stacks in
+collapsed form (``root;caller;leaf count``), which flamegraph.pl and
+speedscope read directly. Nothing is traced, so the profiled code runs at
+full speed. The cost is one stack walk per thread per sample.
+"""
+
+import bisect
+import collections
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from typing import Callable, Counter, Dict, List, Optional, Tuple
+
+# Seconds, from a fast dedup-cache hit up to a slow feed download or a 429 wait
+PERF_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                10.0, 30.0)
+
+
+class RollingHistogram:
+    __slots__ = ("bounds", "slot_seconds", "_slot_ids", "_counts", "_sums", "_maxes", "_clock")
+
+    def __init__(self, bounds: Tuple[float, ...] = PERF_BUCKETS, window_seconds: int = 900, slot_seconds: int = 60,
+                 clock: Callable[[], float] = time.monotonic):
+        slots = max(1, window_seconds // slot_seconds)
+        self.bounds = bounds
+        self.slot_seconds = slot_seconds
+        self._slot_ids = [-1] * slots
+        self._counts = [[0] * (len(bounds) + 1) for _ in range(slots)]
+        self._sums = [0.0] * slots
+        self._maxes = [0.0] * slots
+        self._clock = clock
+
+    def observe(self, value: float):
+        slot_id = int(self._clock() // self.slot_seconds)
+        i = slot_id % len(self._slot_ids)
+        if self._slot_ids[i] != slot_id:
+            self._slot_ids[i] = slot_id
+            self._counts[i] = [0] * (len(self.bounds) + 1)
+            self._sums[i] = 0.0
+            self._maxes[i] = 0.0
+        self._counts[i][bisect.bisect_left(self.bounds, value)] += 1
+        self._sums[i] += value
+        if value > self._maxes[i]:
+            self._maxes[i] = value
+
+    def summary(self) -> Dict[str, float]:
+        """count, mean, p50/p95/p99 and max over the window (zeros when idle)."""
+        oldest = int(self._clock() // self.slot_seconds) - len(self._slot_ids) + 1
+        counts = [0] * (len(self.bounds) + 1)
+        total_sum = maximum = 0.0
+        for i, slot_id in enumerate(self._slot_ids):
+            if slot_id >= oldest:
+                for j, count in enumerate(self._counts[i]):
+                    counts[j] += count
+                total_sum += self._sums[i]
+                maximum = max(maximum, self._maxes[i])
+        total = sum(counts)
+        return {"count": total, "mean": total_sum / total if total else 0.0, "max": maximum,
+                "p50": _quantile(self.bounds, counts, total, 0.5, maximum),
+                "p95": _quantile(self.bounds, counts, total, 0.95, maximum),
+                "p99": _quantile(self.bounds, counts, total, 0.99, maximum)}
+
+
+def _quantile(bounds, counts, total, q, maximum) -> float:
+    if not total:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            lower = bounds[i - 1] if i > 0 else 0.0
+            upper = min(bounds[i], maximum) if i < len(bounds) else maximum
+            return lower + (max(upper, lower) - lower) * max(0.0, rank - cumulative) / count
+        cumulative += count
+    return maximum
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: RollingHistogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class PerfTimers:
+    """Named rolling histograms, reported in registration order."""
+
+    def __init__(self, window_seconds: int = 900):
+        self.window_seconds = window_seconds
+        self._histograms: Dict[str, RollingHistogram] = {}
+
+    def histogram(self, name: str) -> RollingHistogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = RollingHistogram(window_seconds=self.window_seconds)
+        return histogram
+
+    def observe(self, name: str, seconds: float):
+        self.histogram(name).observe(seconds)
+
+    def timer(self, name: str) -> _Timer:
+        """``with PERF.timer("render"): ...``"""
+        return _Timer(self.histogram(name))
+
+    def timed(self, name: str):
+        """Decorator for plain or async functions."""
+        observe = self.histogram(name).observe
+
+        def decorator(function):
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await function(*args, **kwargs)
+                    finally:
+                        observe(time.perf_counter() - started)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    observe(time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def report(self) -> List[Tuple[str, Dict[str, float]]]:
+        return [(name, histogram.summary()) for name, histogram in self._histograms.items()]
+
+
+PERF = PerfTimers()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples all other threads' stacks every `interval` seconds for `duration` seconds."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter[str] = collections.Counter()
+
+    def run(self, duration: float) -> Counter[str]:
+        """Blocks for `duration`; call it from a worker thread (``asyncio.to_thread``)."""
+        me = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+        return self.stacks
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, heaviest stacks first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 10, thread_name: Optional[str] = None) -> List[Tuple[str, int]]:
+        """Leaf (self-time) sample counts, optionally for one thread."""
+        leaves: Counter[str] = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            if thread_name is None or frames[0] == thread_name:
+                leaves[frames[-1]] += count
+        return leaves.most_common(limit)
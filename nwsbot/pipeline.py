@@ -0,0 +1,186 @@
+"""Staged asyncio pipeline with bounded queues.
+
+Each stage owns a bounded ``asyncio.Queue`` and a number of worker tasks. A
+worker takes an item, awaits the stage handler, and passes the result to the
+next stage's queue. ``await queue.put`` blocks while that queue is full, which
+gives backpressure all the way up to ``submit()``.
+
+What a handler returns decides what happens next:
+
+* ``None``: the item is dropped and the stage's ``on_discard`` hook runs
+* a value: it is passed to the next stage. On the last stage it is dropped.
+* for stages created with ``fan_out=True``, an iterable whose values are each
+  passed on
+
+An exception is logged and treated the same as returning ``None``.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+Handler = Callable[[Any], Awaitable[Any]]
+
+
+class StageStats:
+    """Cheap running totals for one stage: handler time and queue wait."""
+    __slots__ = ("processed", "discarded", "errors", "busy_seconds", "max_seconds", "last_seconds",
+                 "wait_seconds", "max_wait_seconds")
+
+    def __init__(self):
+        self.processed = 0
+        self.discarded = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def observe(self, elapsed: float, waited: float):
+        self.processed += 1
+        self.busy_seconds += elapsed
+        self.last_seconds = elapsed
+        if elapsed > self.max_seconds:
+            self.max_seconds = elapsed
+        self.wait_seconds += waited
+        if waited > self.max_wait_seconds:
+            self.max_wait_seconds = waited
+
+    @property
+    def avg_seconds(self) -> float:
+        return self.busy_seconds / self.processed if self.processed else 0.0
+
+    @property
+    def avg_wait_seconds(self) -> float:
+        return self.wait_seconds / self.processed if self.processed else 0.0
+
+
+class Stage:
+    """One pipeline step: a bounded input queue drained by ``concurrency`` workers."""
+
+    def __init__(self, name: str, handler: Handler, concurrency: int = 1, maxsize: int = 100,
+                 fan_out: bool = False, on_discard: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.maxsize = maxsize
+        self.fan_out = fan_out
+        self.on_discard = on_discard
+        self.queue: Optional[asyncio.Queue] = None
+        self.next_stage: Optional["Stage"] = None
+        self.stats = StageStats()
+        self.active = 0
+        self._workers: List[asyncio.Task] = []
+
+    def depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+    async def put(self, item: Any):
+        await self.queue.put((time.perf_counter(), item))
+
+    def _discard(self, item: Any):
+        self.stats.discarded += 1
+        if self.on_discard:
+            try:
+                self.on_discard(item)
+            except Exception:
+                logging.exception(f"Pipeline stage '{self.name}' discard hook failed")
+
+    async def _forward(self, result: Any):
+        if self.next_stage is None:
+            return
+        if self.fan_out:
+            for value in result:
+                await self.next_stage.put(value)
+        else:
+            await self.next_stage.put(result)
+
+    async def _worker(self):
+        while True:
+            enqueued_at, item = await self.queue.get()
+            self.active += 1
+            started = time.perf_counter()
+            try:
+                result = await self.handler(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats.errors += 1
+                logging.exception(f"Pipeline stage '{self.name}' failed on item")
+                result = None
+            finally:
+                self.active -= 1
+            self.stats.observe(time.perf_counter() - started, started - enqueued_at)
+            try:
+                if result is None:
+                    self._discard(item)
+                else:
+                    await self._forward(result)
+            finally:
+                self.queue.task_done()
+
+    def start(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [asyncio.create_task(self._worker(), name=f"pipeline-{self.name}-{i}")
+                         for i in range(self.concurrency)]
+
+    def stop(self):
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
+
+    @property
+    def running(self) -> bool:
+        return any(not t.done() for t in self._workers)
+
+
+class Pipeline:
+    """An ordered chain of stages."""
+
+    def __init__(self, stages: List[Stage]):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage.")
+        self.stages = stages
+        for current, following in zip(stages, stages[1:]):
+            current.next_stage = following
+        self._by_name = {stage.name: stage for stage in stages}
+
+    def __getitem__(self, name: str) -> Stage:
+        return self._by_name[name]
+
+    @property
+    def running(self) -> bool:
+        return all(stage.running for stage in self.stages)
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        logging.info(f"Pipeline started: {' -> '.join(f'{s.name}x{s.concurrency}' for s in self.stages)}")
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+
+    async def submit(self, item: Any):
+        """Queues an item at the first stage, waiting while that queue is full."""
+        await self.stages[0].put(item)
+
+    async def drain(self):
+        """Waits until every stage's queue has been fully processed."""
+        for stage in self.stages:
+            await stage.queue.join()
+
+    def depths(self) -> Dict[str, int]:
+        return {stage.name: stage.depth() for stage in self.stages}
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per-stage queue depth, capacity, busy workers and latency totals."""
+        return [{"stage": s.name, "depth": s.depth(), "maxsize": s.maxsize, "active": s.active,
+                 "concurrency": s.concurrency, "processed": s.stats.processed, "discarded": s.stats.discarded,
+                 "errors": s.stats.errors, "avg_seconds": s.stats.avg_seconds, "max_seconds": s.stats.max_seconds,
+                 "last_seconds": s.stats.last_seconds, "avg_wait_seconds": s.stats.avg_wait_seconds,
+                 "max_wait_seconds": s.stats.max_wait_seconds}
+                for s in self.stages]
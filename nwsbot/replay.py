@@ -0,0 +1,324 @@
+"""Offline replay: captured feeds through the real pipeline into a fake channel.
+
+``python -m nwsbot --replay DIR`` (see ``bot.run_replay``) reads a directory of
+captured feed files. Each file's timestamp comes from its name (e.g.
+``us_20250501T180000Z.xml`` or ``20250501_1800.atom``), falling back to its
+mtime. The files are played back on a ``WarpClock``: feed times, the
+``post_delay_seconds`` spacing and rate-limit waits all run ``speed`` times
+faster than real time.
+
+Feeds are handed to the pipeline directly, or with ``--replay-http`` fetched
+from a ``FeedReplayServer``. That server is a local stand-in for the NWS
+endpoint which serves the feed current at the warped time and answers
+conditional GETs. Posts go to a ``FakeChannel``. It enforces a Discord-like
+per-channel bucket (5 messages per 5 s) by waiting out the retry-after like
+discord.py does, and keeps every message that would have been posted.
+
+``FeedDirectoryServer`` (``python -m nwsbot --serve-feeds DIR``) is a
+standalone stand-in for the feed endpoints used by ``feed_sources``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_STAMP = re.compile(r"(\d{8})[T_-]?(\d{4}(?:\d{2})?)")
+
+
+class SystemClock:
+    """The live bot's clock: wall time and real sleeps."""
+    warped = False
+
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+    def utcnow(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+
+class WarpClock(SystemClock):
+    """Simulated time starting at `start` (epoch) and running `speed` times faster than real time."""
+    warped = True
+
+    def __init__(self, start: float, speed: float = 60.0):
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self.start = start
+        self.speed = speed
+        self._real_start = time.monotonic()
+
+    def time(self) -> float:
+        return self.start + (time.monotonic() - self._real_start) * self.speed
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(max(0.0, seconds) / self.speed)
+
+    async def sleep_until(self, epoch: float):
+        await self.sleep(epoch - self.time())
+
+    def utcnow(self) -> datetime:
+        return datetime.fromtimestamp(self.time(), timezone.utc)
+
+
+def feed_timestamp(path: str) -> float:
+    """Epoch time encoded in a capture's file name, or its mtime."""
+    match = _STAMP.search(os.path.basename(path))
+    if match:
+        clock = match.group(2).ljust(6, "0")
+        try:
+            return datetime.strptime(match.group(1) + clock, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            pass
+    return os.path.getmtime(path)
+
+
+def load_feed_directory(directory: str) -> List[Tuple[float, str]]:
+    """(timestamp, path) for every non-hidden file in `directory`, oldest first."""
+    feeds = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not name.startswith(".") and os.path.isfile(path):
+            feeds.append((feed_timestamp(path), path))
+    return sorted(feeds)
+
+
+def read_feed(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class FeedReplayServer:
+    """Local HTTP stand-in for the NWS feed, serving the capture current at the clock's time."""
+
+    def __init__(self, feeds: List[Tuple[float, str]], clock: SystemClock):
+        self.feeds = feeds
+        self.clock = clock
+        self.requests = 0
+        self.not_modified = 0
+        self._runner = None
+
+    def current(self) -> str:
+        now = self.clock.time()
+        path = self.feeds[0][1]
+        for at, candidate in self.feeds:
+            if at > now:
+                break
+            path = candidate
+        return path
+
+    async def handle(self, request):
+        from aiohttp import web
+        self.requests += 1
+        path = self.current()
+        etag = f'"{os.path.basename(path)}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=read_feed(path), content_type="application/atom+xml", headers={"ETag": etag})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Starts serving on `host` (a free port by default) and returns the feed URL."""
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/feed", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/feed"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class FeedDirectoryServer:
+    """Local stand-in for api.weather.gov and other feed endpoints, serving the files in a directory.
+
+    ``GET /<path>?<key>=<value>...`` serves the file named after the last path segment plus the query
+    values joined by "_", with any extension (``/alerts/active?area=NY`` -> ``active_NY.json``), so an
+    ``area`` feed source can point its ``base_url`` here. Responses carry an ETag from the file's size and
+    mtime and honour If-None-Match. ``fail(name, status, count)`` makes the next `count` requests for a file
+    answer `status`, for exercising retries and the circuit breaker.
+    """
+
+    CONTENT_TYPES = {".json": "application/geo+json", ".xml": "application/atom+xml", ".atom": "application/atom+xml"}
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.requests = 0
+        self.not_modified = 0
+        self._failures: Dict[str, Tuple[int, int]] = {}
+        self._runner = None
+
+    def resolve(self, path: str, query: Dict[str, str]) -> Optional[str]:
+        name = "_".join([path.rstrip("/").rpartition("/")[2], *query.values()])
+        for candidate in sorted(os.listdir(self.directory)):
+            if candidate == name or os.path.splitext(candidate)[0] == name:
+                return os.path.join(self.directory, candidate)
+        return None
+
+    def fail(self, name: str, status: int = 503, count: int = 1):
+        self._failures[name] = (status, count)
+
+    async def handle(self, request):
+        from aiohttp import web
+        self.requests += 1
+        path = self.resolve(request.path, dict(request.query))
+        if path is None:
+            return web.Response(status=404)
+        name = os.path.basename(path)
+        status, count = self._failures.get(name, (0, 0))
+        if count > 0:
+            self._failures[name] = (status, count - 1)
+            return web.Response(status=status, headers={"Retry-After": "0"})
+        stat = os.stat(path)
+        etag = f'"{stat.st_size}-{stat.st_mtime_ns}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        content_type = self.CONTENT_TYPES.get(os.path.splitext(name)[1], "text/plain")
+        return web.Response(text=read_feed(path), content_type=content_type, headers={"ETag": etag})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Starts serving on `host` (a free port by default) and returns the base URL."""
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class FakeRole:
+    def __init__(self, name: str):
+        self.name = name
+        self.mention = f"@{name}"
+
+
+class FakeGuild:
+    """Just enough of a guild for role mentions: one role per subscribed code."""
+
+    def __init__(self, codes: Iterable[str]):
+        self.roles = [FakeRole(f"{code} Alerts") for code in sorted(codes)]
+
+
+class FakeMessage:
+    def __init__(self, channel: "FakeChannel", message_id: int, content: Optional[str], embed, at: float,
+                 reply_to: Optional[int] = None):
+        self.channel = channel
+        self.id = message_id
+        self.content = content
+        self.embed = embed
+        self.at = at
+        self.reply_to = reply_to
+        self.edits = 0
+
+    async def edit(self, content: Optional[str] = None, embed=None, **kwargs):
+        await self.channel.take_token()
+        self.content = content if content is not None else self.content
+        self.embed = embed if embed is not None else self.embed
+        self.edits += 1
+        return self
+
+    async def create_thread(self, name: str, **kwargs) -> "FakeChannel":
+        await self.channel.take_token()
+        return self.channel.thread(self.id, name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        embed = self.embed.to_dict() if self.embed is not None and hasattr(self.embed, "to_dict") else self.embed
+        return {"at": datetime.fromtimestamp(self.at, timezone.utc).isoformat(timespec="seconds"),
+                "channel_id": self.channel.id, "message_id": self.id, "reply_to": self.reply_to,
+                "content": self.content, "embed": embed, "edits": self.edits}
+
+
+class FakeChannel:
+    """In-memory alert channel with a Discord-like rate limit of `rate` messages per `per` seconds."""
+
+    def __init__(self, clock: SystemClock, guild: Optional[FakeGuild] = None, rate: int = 5, per: float = 5.0,
+                 send_seconds: float = 0.15, channel_id: int = 1, parent: Optional["FakeChannel"] = None):
+        self.clock = clock
+        self.guild = guild
+        self.id = channel_id
+        self.name = f"replay-{channel_id}"
+        self.mention = f"#{self.name}"
+        self.rate = rate
+        self.per = per
+        self.send_seconds = send_seconds
+        self.parent = parent
+        root = parent or self
+        self.messages: List[FakeMessage] = root.messages if parent else []
+        self._threads: Dict[int, "FakeChannel"] = root._threads if parent else {}
+        self._ids = root._ids if parent else iter(range(1000, 10 ** 12))
+        self._tokens = float(rate)
+        self._refilled = clock.time()
+        self.rate_limited = 0
+        self.rate_limit_wait = 0.0
+
+    async def take_token(self):
+        """Waits out a simulated 429 the way discord.py does, then spends one request."""
+        while True:
+            now = self.clock.time()
+            self._tokens = min(self.rate, self._tokens + (now - self._refilled) * self.rate / self.per)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            retry_after = (1 - self._tokens) * self.per / self.rate
+            self.rate_limited += 1
+            self.rate_limit_wait += retry_after
+            # Same wording as discord.http, so the bot's 429 metrics pick it up
+            logging.getLogger("discord.http").warning(
+                "We are being rate limited. Retrying in %.2f seconds.", retry_after)
+            await self.clock.sleep(retry_after)
+
+    async def send(self, content: Optional[str] = None, embed=None, reference=None, **kwargs) -> FakeMessage:
+        await self.take_token()
+        await self.clock.sleep(self.send_seconds)
+        reply_to = getattr(reference, "message_id", None)
+        message = FakeMessage(self, next(self._ids), content, embed, self.clock.time(), reply_to)
+        self.messages.append(message)
+        return message
+
+    def get_partial_message(self, message_id: int) -> FakeMessage:
+        for message in reversed(self.messages):
+            if message.id == message_id:
+                return message
+        return FakeMessage(self, message_id, None, None, self.clock.time())
+
+    def get_thread(self, thread_id: int) -> Optional["FakeChannel"]:
+        return self._threads.get(thread_id)
+
+    def thread(self, thread_id: int, name: str) -> "FakeChannel":
+        thread = self._threads.get(thread_id)
+        if thread is None:
+            thread = self._threads[thread_id] = FakeChannel(self.clock, self.guild, self.rate, self.per,
+                                                            self.send_seconds, thread_id, parent=self)
+            thread.name = name
+        return thread
+
+
+def write_messages(path: str, messages: List[FakeMessage]) -> int:
+    """Writes the would-be posts as JSON lines; returns how many."""
+    with open(path, "w", encoding="utf-8") as f:
+        for message in messages:
+            f.write(json.dumps(message.to_dict(), default=str) + "\n")
+    return len(messages)
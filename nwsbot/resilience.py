@@ -0,0 +1,83 @@
+"""Retry backoff and a circuit breaker for upstream HTTP calls.
+
+``backoff_delays`` yields "full jitter" exponential delays: each one is a
+uniform draw from zero to ``base * 2**attempt``, capped at ``cap``. Retries
+from several instances therefore spread out instead of arriving together.
+
+``CircuitBreaker`` goes from closed to open after ``failure_threshold``
+consecutive failures. While it is open, callers are refused without touching
+the upstream. After ``reset_seconds`` a single half-open probe is let through.
+If the probe succeeds the breaker closes. If it fails, the breaker reopens
+with the reset time doubled, up to ``max_reset_seconds``.
+"""
+
+import random
+import time
+from typing import Callable, Iterator
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half-open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def backoff_delays(base: float = 1.0, cap: float = 30.0, attempts: int = 4,
+                   rng: Callable[[], float] = random.random) -> Iterator[float]:
+    for attempt in range(attempts):
+        yield rng() * min(cap, base * 2 ** attempt)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 120, max_reset_seconds: float = 1800,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_reset_seconds = reset_seconds
+        self.max_reset_seconds = max(reset_seconds, max_reset_seconds)
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_at = 0.0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        """Whether a request may go out now; an open breaker past its reset time admits one probe.
+
+        A probe that never reported back (e.g. its task was cancelled) is replaced after `reset_seconds`.
+        """
+        if self.state == CLOSED:
+            return True
+        now = self._clock()
+        since = now - (self.opened_at if self.state == OPEN else self.probe_at)
+        if since >= self.reset_seconds:
+            self.state = HALF_OPEN
+            self.probe_at = now
+            return True
+        return False
+
+    @property
+    def probing(self) -> bool:
+        return self.state == HALF_OPEN
+
+    def record_success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.reset_seconds = self.base_reset_seconds
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self.reset_seconds = min(self.max_reset_seconds, self.reset_seconds * 2)
+            self._open()
+        elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = self._clock()
+        self.trips += 1
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker admits its next probe."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_seconds - (self._clock() - self.opened_at))
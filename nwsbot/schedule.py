@@ -0,0 +1,69 @@
+"""Adaptive fixed-cadence poll scheduling.
+
+``check_alerts`` used to sleep a fixed interval after each cycle finished, so
+the schedule drifted by however long the cycle took. ``PollScheduler`` keeps
+a due time instead. Each interval is counted from the previous due time, not
+from when the work finished, and a cycle that overruns its slot just makes
+the next one due at once. Missed slots are skipped rather than run in a burst.
+
+The interval itself adapts to what is going on:
+
+* **urgent**: a Severe/Extreme or Immediate alert is active in a subscribed
+  area. Poll at ``minimum``.
+* **quiet**: nothing active in subscribed areas. Twice the base interval.
+* **unchanged**: two or more 304s in a row. A further 1.5x per extra 304, capped
+  at four steps.
+
+Results are clamped to ``[minimum, maximum]`` and given ``jitter`` (a fraction,
+applied up or down), so several instances don't poll the feed in lockstep.
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class PollDecision:
+    interval: float
+    reason: str
+
+
+class PollScheduler:
+    def __init__(self, base: float, minimum: float, maximum: float, jitter: float = 0.1, adaptive: bool = True,
+                 rng: Callable[[], float] = random.random):
+        self.base = base
+        self.minimum = min(minimum, base)
+        self.maximum = max(maximum, base)
+        self.jitter = max(0.0, min(jitter, 0.5))
+        self.adaptive = adaptive
+        self._rng = rng
+        self.next_due = None
+        self.last = PollDecision(base, "base")
+
+    def decide(self, urgent: bool, active: int, not_modified_streak: int) -> PollDecision:
+        if not self.adaptive:
+            return PollDecision(self.base, "fixed")
+        if urgent:
+            return PollDecision(self.minimum, "urgent alerts active")
+        relax, reasons = 1.0, []
+        if active == 0:
+            relax *= 2.0
+            reasons.append("quiet")
+        if not_modified_streak >= 2:
+            relax *= 1.5 ** min(not_modified_streak - 1, 4)
+            reasons.append(f"{not_modified_streak}x 304")
+        return PollDecision(min(self.maximum, self.base * relax), ", ".join(reasons) or "base")
+
+    def schedule(self, now: float, decision: PollDecision) -> float:
+        """Advances the due time by the decided interval (with jitter); returns seconds to wait from `now`."""
+        interval = decision.interval * (1 + self.jitter * (2 * self._rng() - 1))
+        interval = max(self.minimum, min(self.maximum, interval))
+        self.last = PollDecision(interval, decision.reason)
+        self.next_due = (now if self.next_due is None else self.next_due) + interval
+        if self.next_due < now:  # Overran the slot: run now, skip the missed ones
+            self.next_due = now
+        return self.next_due - now
+
+    def seconds_until_due(self, now: float) -> float:
+        return max(0.0, self.next_due - now) if self.next_due is not None else 0.0
@@ -0,0 +1,302 @@
+"""Typed bot settings, loaded from config.json plus environment overrides.
+
+Loading has no side effects beyond reading the config file. Problems that
+used to ``sys.exit`` at import (no token, bad channel id, no feed URL) raise
+``SettingsError`` and ``main()`` decides how to exit. Relative paths
+(database, logs, snapshot, lock file) are resolved against the config file's
+directory, which matches the old behaviour of resolving them next to the
+script.
+
+``LazySettings`` is the module-level handle the bot code reads from; nothing is
+loaded until the first attribute access or an explicit ``configure()``.
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+SCRIPT_VERSION = "3.4.1"
+DEFAULT_CONFIG_FILE = "config.json"
+CONFIG_PATH_ENV = "NWSBOT_CONFIG"
+
+
+class SettingsError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Settings:
+    config_path: str
+    base_dir: str
+    discord_token: str
+    channel_id: int
+    nws_atom_url: str
+    feed_sources: Tuple[Dict[str, Any], ...] = ()
+    error_channel_id: Optional[int] = None
+    changelog_channel_id: Optional[int] = None
+    owner_ids: FrozenSet[int] = frozenset()
+    check_interval_seconds: int = 900
+    poll_adaptive: bool = True
+    poll_min_seconds: int = 60
+    poll_max_seconds: int = 1800
+    poll_jitter: float = 0.1
+    fetch_connect_timeout: float = 10
+    fetch_read_timeout: float = 30
+    fetch_max_retries: int = 3
+    fetch_retry_budget_seconds: float = 60
+    fetch_backoff_seconds: float = 2
+    breaker_failure_threshold: int = 3
+    breaker_reset_seconds: float = 120
+    breaker_max_reset_seconds: float = 1800
+    post_delay_seconds: int = 10
+    expiry_enabled: bool = True
+    expiry_batch_size: int = 10
+    expiry_edit_spacing_seconds: float = 1.0
+    expiry_backfill_hours: float = 24
+    catchup_enabled: bool = True
+    catchup_min_gap_seconds: int = 900
+    catchup_digest: bool = True
+    catchup_digest_below: str = "Moderate"  # Severity under which missed alerts are collapsed into the digest
+    enrich_enabled: bool = True
+    enrich_concurrency: int = 4
+    enrich_cache_size: int = 512
+    enrich_cache_dir: str = "cap_cache"
+    user_agent: str = f"NWSAlertBot/{SCRIPT_VERSION} (Discord; +ContactInfo)"
+    database_file: str = "alerts_v3.db"
+    max_process_per_cycle: int = 50
+    status_rotation_minutes: int = 15
+    database_retention_days: int = 30
+    process_pool_min_bytes: int = 1_000_000
+    process_pool_workers: int = 2
+    reissue_mode: str = "suppress"  # 'suppress' or 'edit'
+    vtec_threading: str = "reply"  # 'reply', 'thread' or 'off'
+    output_mode: str = "bot"  # 'bot' or 'webhook'
+    webhook_count: int = 2
+    webhook_name: str = "NWS Alerts"
+    runtime_snapshot_file: str = "runtime_snapshot.bin"
+    snapshot_save_seconds: int = 300
+    ha_backend: str = "none"  # 'none', 'sqlite' or 'file'
+    lease_ttl_seconds: int = 45
+    ha_lock_file: str = "nwsbot.lock"
+    instance_id: str = ""
+    log_dir: str = "logs"
+    log_level: str = "INFO"
+    log_json: bool = False
+    log_max_bytes: int = 10_000_000
+    log_backup_count: int = 10
+    log_rotate_hours: float = 24
+    log_retention_days: float = 14
+    metrics_enabled: bool = False
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9108
+    api_enabled: bool = False
+    api_host: str = "127.0.0.1"
+    api_port: int = 9110
+    filtering: Dict[str, Any] = field(default_factory=dict)
+    raw: Dict[str, Any] = field(default_factory=dict, repr=False)  # The parsed config.json
+
+
+def read_config_file(path: str) -> Dict[str, Any]:
+    """Parses config.json; a missing or invalid file is logged and treated as empty."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logging.warning(f"Config file '{path}' not found.")
+    except json.JSONDecodeError as e:
+        logging.error(f"Invalid JSON in {path}: {e}. Fix!")
+    except OSError as e:
+        logging.exception(f"Error loading config {path}: {e}")
+    return {}
+
+
+def _optional_id(value: Any, name: str) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        logging.warning(f"Invalid Discord {name} ('{value}').")
+        return None
+
+
+def _owner_ids(value: Any) -> FrozenSet[int]:
+    if isinstance(value, str):
+        parts = value.split(",")
+    elif isinstance(value, (list, tuple)):
+        parts = [str(v) for v in value]
+    else:
+        if value:
+            logging.error(f"Invalid owner_ids format: {type(value).__name__}")
+        return frozenset()
+    return frozenset(int(p.strip()) for p in parts if p.strip().isdigit())
+
+
+def _feed_sources(value: Any, default_url: str, base_dir: str) -> Tuple[Dict[str, Any], ...]:
+    """The ``feed_sources`` entries (a list, or a JSON string from the environment), checked by building them."""
+    from nwsbot.sources import build_sources  # Deferred: loads the CAP parser
+    if isinstance(value, str):
+        value = json.loads(value) if value.strip() else []
+    entries = tuple(dict(entry) for entry in value or ())
+    build_sources(entries, default_url, base_dir)
+    return entries
+
+
+def _flag(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _choice(value: str, choices, default: str) -> str:
+    value = str(value).lower()
+    return value if value in choices else default
+
+
+def load_settings(config_path: Optional[str] = None, environ: Optional[Mapping[str, str]] = None,
+                  offline: bool = False) -> Settings:
+    """Builds Settings from the config file and environment (environment wins).
+
+    `offline` (replay mode) doesn't require the Discord token, channel or feed URL.
+    """
+    env = os.environ if environ is None else environ
+    config_path = os.path.abspath(config_path or env.get(CONFIG_PATH_ENV) or DEFAULT_CONFIG_FILE)
+    base_dir = os.path.dirname(config_path)
+    config = read_config_file(config_path)
+    discord_config = config.get("discord", {})
+    ha_config = config.get("ha", {})
+    metrics_config = config.get("metrics", {})
+    api_config = config.get("api", {})
+    logging_config = config.get("logging", {})
+    polling_config = config.get("polling", {})
+    fetch_config = config.get("fetch", {})
+    enrich_config = config.get("enrichment", {})
+    expiry_config = config.get("expiry", {})
+    catchup_config = config.get("catchup", {})
+
+    def get(env_name: str, key: str, default: Any, section: Mapping[str, Any] = config) -> Any:
+        return env.get(env_name, section.get(key, default))
+
+    def path(value: str) -> str:
+        return os.path.join(base_dir, value)
+
+    token = get("DISCORD_TOKEN", "token", None, discord_config)
+    if not token and not offline:
+        raise SettingsError("Discord token missing.")
+    channel_id = get("DISCORD_CHANNEL_ID", "channel_id", None, discord_config)
+    if not channel_id and not offline:
+        raise SettingsError("Discord channel_id missing.")
+    try:
+        channel_id = int(channel_id or 0)
+    except (ValueError, TypeError):
+        if not offline:
+            raise SettingsError("Invalid Discord channel_id. Must be an integer.") from None
+        channel_id = 0
+    nws_atom_url = get("NWS_ATOM_URL", "nws_atom_url", None)
+    feed_sources = get("FEED_SOURCES", "feed_sources", [])
+    if not nws_atom_url and not feed_sources and not offline:
+        raise SettingsError("NWS_ATOM_URL not set (and no feed_sources).")
+
+    try:
+        return Settings(
+            config_path=config_path, base_dir=base_dir, discord_token=token or "", channel_id=channel_id,
+            nws_atom_url=nws_atom_url or "",
+            feed_sources=_feed_sources(feed_sources, nws_atom_url or "", base_dir),
+            error_channel_id=_optional_id(get("DISCORD_ERROR_CHANNEL_ID", "error_channel_id", None, discord_config),
+                                          "error_channel_id"),
+            changelog_channel_id=_optional_id(
+                get("DISCORD_CHANGELOG_CHANNEL_ID", "changelog_channel_id", None, discord_config),
+                "changelog_channel_id"),
+            owner_ids=_owner_ids(get("DISCORD_OWNER_IDS", "owner_ids", "", discord_config)),
+            check_interval_seconds=int(get("CHECK_INTERVAL_SECONDS", "check_interval_seconds", 900)),
+            poll_adaptive=_flag(get("POLL_ADAPTIVE", "adaptive", True, polling_config)),
+            poll_min_seconds=int(get("POLL_MIN_SECONDS", "min_seconds", 60, polling_config)),
+            poll_max_seconds=int(get("POLL_MAX_SECONDS", "max_seconds", 1800, polling_config)),
+            poll_jitter=float(get("POLL_JITTER", "jitter", 0.1, polling_config)),
+            fetch_connect_timeout=float(get("FETCH_CONNECT_TIMEOUT", "connect_timeout", 10, fetch_config)),
+            fetch_read_timeout=float(get("FETCH_READ_TIMEOUT", "read_timeout", 30, fetch_config)),
+            fetch_max_retries=int(get("FETCH_MAX_RETRIES", "max_retries", 3, fetch_config)),
+            fetch_retry_budget_seconds=float(get("FETCH_RETRY_BUDGET_SECONDS", "retry_budget_seconds", 60,
+                                                 fetch_config)),
+            fetch_backoff_seconds=float(get("FETCH_BACKOFF_SECONDS", "backoff_seconds", 2, fetch_config)),
+            breaker_failure_threshold=int(get("BREAKER_FAILURE_THRESHOLD", "breaker_failure_threshold", 3,
+                                              fetch_config)),
+            breaker_reset_seconds=float(get("BREAKER_RESET_SECONDS", "breaker_reset_seconds", 120, fetch_config)),
+            breaker_max_reset_seconds=float(get("BREAKER_MAX_RESET_SECONDS", "breaker_max_reset_seconds", 1800,
+                                                fetch_config)),
+            post_delay_seconds=int(get("POST_DELAY_SECONDS", "post_delay_seconds", 10)),
+            catchup_enabled=_flag(get("CATCHUP_ENABLED", "enabled", True, catchup_config)),
+            catchup_min_gap_seconds=int(get("CATCHUP_MIN_GAP_SECONDS", "min_gap_seconds", 900, catchup_config)),
+            catchup_digest=_flag(get("CATCHUP_DIGEST", "digest", True, catchup_config)),
+            catchup_digest_below=_choice(get("CATCHUP_DIGEST_BELOW", "digest_below", "Moderate", catchup_config),
+                                         ("unknown", "minor", "moderate", "severe", "extreme"),
+                                         "moderate").capitalize(),
+            expiry_enabled=_flag(get("EXPIRY_ENABLED", "enabled", True, expiry_config)),
+            expiry_batch_size=int(get("EXPIRY_BATCH_SIZE", "batch_size", 10, expiry_config)),
+            expiry_edit_spacing_seconds=float(get("EXPIRY_EDIT_SPACING_SECONDS", "edit_spacing_seconds", 1.0,
+                                                  expiry_config)),
+            expiry_backfill_hours=float(get("EXPIRY_BACKFILL_HOURS", "backfill_hours", 24, expiry_config)),
+            enrich_enabled=_flag(get("ENRICH_ENABLED", "enabled", True, enrich_config)),
+            enrich_concurrency=int(get("ENRICH_CONCURRENCY", "concurrency", 4, enrich_config)),
+            enrich_cache_size=int(get("ENRICH_CACHE_SIZE", "cache_size", 512, enrich_config)),
+            enrich_cache_dir=path(get("ENRICH_CACHE_DIR", "cache_dir", "cap_cache", enrich_config)),
+            user_agent=get("USER_AGENT", "user_agent", Settings.user_agent),
+            database_file=path(get("DATABASE_FILE", "database_file", "alerts_v3.db")),
+            max_process_per_cycle=int(get("MAX_PROCESS_PER_CYCLE", "max_process_per_cycle", 50)),
+            status_rotation_minutes=int(get("STATUS_ROTATION_MINUTES", "status_rotation_minutes", 15)),
+            database_retention_days=int(get("DATABASE_RETENTION_DAYS", "database_retention_days", 30)),
+            process_pool_min_bytes=int(get("PROCESS_POOL_MIN_BYTES", "process_pool_min_bytes", 1_000_000)),
+            process_pool_workers=int(get("PROCESS_POOL_WORKERS", "process_pool_workers", 2)),
+            reissue_mode=_choice(get("REISSUE_MODE", "reissue_mode", "suppress"), ("suppress", "edit"), "suppress"),
+            vtec_threading=_choice(get("VTEC_THREADING", "vtec_threading", "reply"), ("reply", "thread", "off"),
+                                   "reply"),
+            output_mode=_choice(get("OUTPUT_MODE", "output_mode", "bot", discord_config), ("bot", "webhook"), "bot"),
+            webhook_count=max(1, int(get("WEBHOOK_COUNT", "webhook_count", 2, discord_config))),
+            webhook_name=str(get("WEBHOOK_NAME", "webhook_name", "NWS Alerts", discord_config))[:80],
+            runtime_snapshot_file=path(get("RUNTIME_SNAPSHOT_FILE", "runtime_snapshot_file", "runtime_snapshot.bin")),
+            snapshot_save_seconds=int(get("SNAPSHOT_SAVE_SECONDS", "snapshot_save_seconds", 300)),
+            ha_backend=_choice(get("HA_BACKEND", "backend", "none", ha_config), ("none", "sqlite", "file"), "none"),
+            lease_ttl_seconds=int(get("LEASE_TTL_SECONDS", "lease_ttl_seconds", 45, ha_config)),
+            ha_lock_file=path(get("HA_LOCK_FILE", "lock_file", "nwsbot.lock", ha_config)),
+            instance_id=get("INSTANCE_ID", "instance_id", "", ha_config) or "",
+            log_dir=path(get("LOG_DIR", "log_dir", "logs")),
+            log_level=str(get("LOG_LEVEL", "level", "INFO", logging_config)).upper(),
+            log_json=_flag(get("LOG_JSON", "json", False, logging_config)),
+            log_max_bytes=int(get("LOG_MAX_BYTES", "max_bytes", 10_000_000, logging_config)),
+            log_backup_count=int(get("LOG_BACKUP_COUNT", "backup_count", 10, logging_config)),
+            log_rotate_hours=float(get("LOG_ROTATE_HOURS", "rotate_hours", 24, logging_config)),
+            log_retention_days=float(get("LOG_RETENTION_DAYS", "retention_days", 14, logging_config)),
+            metrics_enabled=_flag(get("METRICS_ENABLED", "enabled", False, metrics_config)),
+            metrics_host=get("METRICS_HOST", "host", "127.0.0.1", metrics_config),
+            metrics_port=int(get("METRICS_PORT", "port", 9108, metrics_config)),
+            api_enabled=_flag(get("API_ENABLED", "enabled", False, api_config)),
+            api_host=get("API_HOST", "host", "127.0.0.1", api_config),
+            api_port=int(get("API_PORT", "port", 9110, api_config)),
+            filtering=config.get("filtering", {}),
+            raw=config,
+        )
+    except (ValueError, TypeError) as e:
+        raise SettingsError(f"Invalid setting in {config_path}: {e}") from e
+
+
+class LazySettings:
+    """Settings handle that loads on first attribute access unless ``configure()`` was called first."""
+
+    def __init__(self):
+        self._settings: Optional[Settings] = None
+
+    def configure(self, settings: Settings):
+        self._settings = settings
+
+    @property
+    def loaded(self) -> bool:
+        return self._settings is not None
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._settings is None:
+            self._settings = load_settings()
+        return getattr(self._settings, name)
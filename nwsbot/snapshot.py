@@ -0,0 +1,131 @@
+"""Versioned on-disk runtime snapshot for warm restarts.
+
+A snapshot file holds the last parsed feed, the conditional-GET validators,
+the posted-id cache and the outbox (alerts claimed for posting but not yet
+sent). With it, a restarted bot can send ``If-None-Match`` on its first fetch
+and skip the full posted_alerts load. With several feed sources, the ids each
+source contributed are kept as well, so their 304s can reuse the restored records.
+
+The layout is a fixed header followed by a zlib-compressed ``marshal`` payload
+of builtin types only::
+
+    magic "NWSB" | format version (u16) | reserved (u16) | payload length (u32) | crc32 (u32)
+
+Records are stored as value tuples alongside the ``AlertRecord`` field names
+they were written with. Loading maps values by name, so adding a field with a
+default does not invalidate existing snapshots. Anything unreadable (wrong
+magic or version, bad CRC, truncation) raises ``SnapshotError``, and the
+caller falls back to a cold start.
+"""
+
+import dataclasses
+import marshal
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from nwsbot.cap import AlertRecord
+from nwsbot.state import FeedSnapshot
+
+MAGIC = b"NWSB"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+
+RECORD_FIELDS = tuple(f.name for f in dataclasses.fields(AlertRecord))
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+@dataclass
+class RuntimeSnapshot:
+    feed: FeedSnapshot = field(default_factory=FeedSnapshot)
+    validators: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    posted_ids: List[str] = field(default_factory=list)
+    posted_synced_until: Optional[str] = None
+    outbox: List[AlertRecord] = field(default_factory=list)
+    saved_at: float = 0.0
+    source_ids: Dict[str, List[str]] = field(default_factory=dict)  # Which feed records came from which source
+
+
+def _record_values(record: AlertRecord) -> tuple:
+    return tuple(getattr(record, name) for name in RECORD_FIELDS)
+
+
+def _records_from(names: Tuple[str, ...], rows: List[tuple]) -> List[AlertRecord]:
+    known = [(i, name) for i, name in enumerate(names) if name in RECORD_FIELDS]
+    records = []
+    for row in rows:
+        try:
+            records.append(AlertRecord(**{name: row[i] for i, name in known}))
+        except (TypeError, IndexError):
+            continue  # A required field was added since this was written
+    return records
+
+
+def encode_snapshot(snapshot: RuntimeSnapshot) -> bytes:
+    feed = snapshot.feed
+    payload = {
+        "fields": RECORD_FIELDS,
+        "feed": {"records": [_record_values(r) for r in feed.records], "fetched_at": feed.fetched_at,
+                 "version": feed.version, "source_url": feed.source_url},
+        "validators": snapshot.validators,
+        "posted_ids": list(snapshot.posted_ids),
+        "posted_synced_until": snapshot.posted_synced_until,
+        "outbox": [_record_values(r) for r in snapshot.outbox],
+        "saved_at": snapshot.saved_at or time.time(),
+        "source_ids": snapshot.source_ids,
+    }
+    body = zlib.compress(marshal.dumps(payload), 6)
+    return HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(body), zlib.crc32(body)) + body
+
+
+def decode_snapshot(data: bytes) -> RuntimeSnapshot:
+    if len(data) < HEADER.size:
+        raise SnapshotError("Snapshot truncated (no header).")
+    magic, version, _, length, crc = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError("Not a runtime snapshot file.")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format {version} (expected {FORMAT_VERSION}).")
+    body = data[HEADER.size:HEADER.size + length]
+    if len(body) != length or zlib.crc32(body) != crc:
+        raise SnapshotError("Snapshot checksum mismatch.")
+    try:
+        payload = marshal.loads(zlib.decompress(body))
+        names = tuple(payload["fields"])
+        feed = payload["feed"]
+        return RuntimeSnapshot(
+            feed=FeedSnapshot.build(_records_from(names, feed["records"]), feed["version"], feed["source_url"],
+                                    feed["fetched_at"]),
+            validators=payload["validators"], posted_ids=payload["posted_ids"],
+            posted_synced_until=payload["posted_synced_until"], outbox=_records_from(names, payload["outbox"]),
+            saved_at=payload["saved_at"], source_ids=payload.get("source_ids", {}))
+    except (KeyError, TypeError, ValueError, EOFError, zlib.error) as e:
+        raise SnapshotError(f"Snapshot payload unreadable: {e}") from e
+
+
+def save_snapshot(path: str, snapshot: RuntimeSnapshot) -> int:
+    """Writes atomically (temp file + rename); returns the file size."""
+    data = encode_snapshot(snapshot)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def load_snapshot(path: str) -> Optional[RuntimeSnapshot]:
+    """Returns None when there is no snapshot file; raises SnapshotError when it is unusable."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return decode_snapshot(data)
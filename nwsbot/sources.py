@@ -0,0 +1,140 @@
+"""Feed sources: where alert documents come from.
+
+The bot used to poll one Atom URL. ``feed_sources`` in config.json now lists
+any number of sources. The poll cycle fetches them concurrently, and their
+alerts are merged into one stream with duplicates removed by alert id. Each
+source has a ``key``, which is its URL or ``file:`` path. Its conditional-GET
+validators are stored under that key, so every source gets its own 304s. A
+single Atom source keyed by ``nws_atom_url`` is what the bot always did, so
+existing snapshots and validators carry over.
+
+Source types (``type`` in each config entry):
+
+* ``atom``: an Atom/CAP feed URL (``url``).
+* ``json``: an api.weather.gov GeoJSON alerts URL (``url``).
+* ``area``: one source per state/marine area in ``areas``. ``format`` picks
+  ``json`` (default) or ``atom``, and ``base_url`` defaults to
+  ``https://api.weather.gov/alerts/active``.
+* ``zone``: one source for the comma-joined ``zones`` (UGC zone or county codes),
+  with the same ``format`` and ``base_url`` options.
+* ``file``: a local document (``path``, ``format``), re-read only when its
+  size or mtime changes.
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from nwsbot.cap import AlertRecord
+
+API_ALERTS_URL = "https://api.weather.gov/alerts/active"
+FORMATS = ("atom", "json")
+
+# (url, validators) -> (status, text, validators): the bot's retrying, breaker-guarded fetch
+HttpFetch = Callable[[str, Optional[Dict[str, str]]], Awaitable[Tuple[int, Optional[str], Dict[str, str]]]]
+
+
+class FeedSourceError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class FeedSource:
+    """An HTTP feed. `fmt` is "atom" or "json"."""
+    name: str
+    url: str
+    fmt: str = "atom"
+
+    @property
+    def key(self) -> str:
+        return self.url
+
+    async def fetch(self, http_fetch: HttpFetch, validators: Optional[Dict[str, str]] = None
+                    ) -> Tuple[int, Optional[str], Dict[str, str]]:
+        return await http_fetch(self.url, validators)
+
+
+@dataclass(frozen=True)
+class LocalFileSource(FeedSource):
+    """A document on disk; answers 304 while its size and mtime are unchanged."""
+
+    @property
+    def key(self) -> str:
+        return f"file:{self.url}"
+
+    def _read(self, validators: Optional[Dict[str, str]]) -> Tuple[int, Optional[str], Dict[str, str]]:
+        try:
+            stat = os.stat(self.url)
+            stamp = {"etag": f"{stat.st_size}-{stat.st_mtime_ns}"}
+            if validators and validators.get("etag") == stamp["etag"]:
+                return 304, None, validators
+            with open(self.url, "r", encoding="utf-8") as f:
+                return 200, f.read(), stamp
+        except OSError:
+            return 0, None, validators or {}
+
+    async def fetch(self, http_fetch: HttpFetch, validators: Optional[Dict[str, str]] = None
+                    ) -> Tuple[int, Optional[str], Dict[str, str]]:
+        return await asyncio.to_thread(self._read, validators)
+
+
+def _format(entry: Mapping[str, Any], default: str) -> str:
+    fmt = str(entry.get("format", default)).lower()
+    if fmt not in FORMATS:
+        raise FeedSourceError(f"Unknown feed format '{fmt}' (expected one of {', '.join(FORMATS)}).")
+    return fmt
+
+
+def _api_url(base_url: str, fmt: str, query: str) -> str:
+    # api.weather.gov serves Atom from the same path with a .atom suffix
+    return f"{base_url}{'.atom' if fmt == 'atom' else ''}?{query}"
+
+
+def build_sources(entries: Sequence[Mapping[str, Any]], default_url: str = "",
+                  base_dir: str = "") -> List[FeedSource]:
+    """Feed sources from the ``feed_sources`` config; a lone Atom source for `default_url` if there are none."""
+    sources: List[FeedSource] = []
+    for entry in entries:
+        kind = str(entry.get("type", "atom")).lower()
+        base_url = str(entry.get("base_url", API_ALERTS_URL)).rstrip("/")
+        if kind in FORMATS:
+            if not entry.get("url"):
+                raise FeedSourceError(f"Feed source of type '{kind}' needs a url.")
+            sources.append(FeedSource(entry.get("name") or kind, entry["url"], kind))
+        elif kind == "area":
+            fmt = _format(entry, "json")
+            for area in entry.get("areas") or ():
+                area = str(area).strip().upper()
+                sources.append(FeedSource(f"area {area}", _api_url(base_url, fmt, f"area={area}"), fmt))
+        elif kind == "zone":
+            fmt = _format(entry, "json")
+            zones = sorted({str(zone).strip().upper() for zone in entry.get("zones") or () if str(zone).strip()})
+            if zones:
+                sources.append(FeedSource(entry.get("name") or f"zones {','.join(zones[:3])}",
+                                          _api_url(base_url, fmt, f"zone={','.join(zones)}"), fmt))
+        elif kind == "file":
+            if not entry.get("path"):
+                raise FeedSourceError("Feed source of type 'file' needs a path.")
+            path = os.path.join(base_dir, entry["path"])
+            sources.append(LocalFileSource(entry.get("name") or os.path.basename(path), path,
+                                           _format(entry, "atom")))
+        else:
+            raise FeedSourceError(f"Unknown feed source type '{kind}'.")
+    if not sources and default_url:
+        sources.append(FeedSource("atom", default_url, "atom"))
+    keys = [source.key for source in sources]
+    if len(set(keys)) != len(keys):
+        raise FeedSourceError("Feed sources must not repeat a URL or path.")
+    return sources
+
+
+def merge_records(groups: Iterable[Iterable[AlertRecord]]) -> List[AlertRecord]:
+    """One record per alert id across sources, keeping the most recently updated copy (first seen on ties)."""
+    merged: Dict[str, AlertRecord] = {}
+    for records in groups:
+        for record in records:
+            current = merged.get(record.id)
+            if current is None or (record.updated or 0) > (current.updated or 0):
+                merged[record.id] = record
+    return list(merged.values())
@@ -0,0 +1,86 @@
+"""In-memory alert state shared by the pipeline, the HA standby and commands.
+
+``PostedIdCache`` mirrors ``posted_alerts.nws_id``. This lets the diff stage
+answer "already posted?" for the usual case (an id seen before) without a
+query. A standby instance keeps it in step by reading rows changed since the
+last sync. ``FeedSnapshot`` is the most recently parsed feed, indexed by id,
+geocode and UGC state.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from nwsbot.cap import AlertRecord
+
+
+class PostedIdCache:
+    """Set of posted alert ids plus the ``last_updated_utc`` high-water mark of the last sync."""
+    __slots__ = ("_ids", "synced_until")
+
+    def __init__(self):
+        self._ids: Set[str] = set()
+        self.synced_until: Optional[str] = None
+
+    def __contains__(self, nws_id: str) -> bool:
+        return nws_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, nws_id: str):
+        self._ids.add(nws_id)
+
+    def merge(self, rows: Iterable[Tuple[str, str]]) -> int:
+        """Adds ``(nws_id, last_updated_utc)`` rows and advances the sync mark; returns rows seen."""
+        count = 0
+        for nws_id, updated in rows:
+            self._ids.add(nws_id)
+            if updated and (self.synced_until is None or updated > self.synced_until):
+                self.synced_until = updated
+            count += 1
+        return count
+
+    def replace(self, rows: Iterable[Tuple[str, str]]) -> int:
+        """Full resync, dropping ids that were cleaned out of the database."""
+        self._ids = set()
+        self.synced_until = None
+        return self.merge(rows)
+
+    def restore(self, ids: Iterable[str], synced_until: Optional[str]):
+        """Loads a persisted copy; follow with an incremental sync from ``synced_until``."""
+        self._ids = set(ids)
+        self.synced_until = synced_until
+
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+
+@dataclass(frozen=True)
+class FeedSnapshot:
+    records: Tuple[AlertRecord, ...] = ()
+    fetched_at: float = 0.0
+    version: int = 0
+    source_url: str = ""
+    by_id: dict = field(default_factory=dict, compare=False, repr=False)
+    by_code: dict = field(default_factory=dict, compare=False, repr=False)  # UGC/FIPS6 code -> records
+    by_state: dict = field(default_factory=dict, compare=False, repr=False)  # UGC state prefix -> records
+
+    @classmethod
+    def build(cls, records: Iterable[AlertRecord], version: int, source_url: str = "",
+              fetched_at: Optional[float] = None) -> "FeedSnapshot":
+        records = tuple(records)
+        by_code: Dict[str, List[AlertRecord]] = {}
+        by_state: Dict[str, List[AlertRecord]] = {}
+        for record in records:
+            for code in record.geocodes:
+                by_code.setdefault(code, []).append(record)
+            for state in {code[:2] for code in record.ugc}:
+                by_state.setdefault(state, []).append(record)
+        return cls(records=records, fetched_at=time.time() if fetched_at is None else fetched_at, version=version,
+                   source_url=source_url, by_id={record.id: record for record in records}, by_code=by_code,
+                   by_state=by_state)
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.fetched_at if self.fetched_at else float("inf")
@@ -0,0 +1,75 @@
+"""P-VTEC parsing and event lifecycle transitions.
+
+A P-VTEC string such as ``/O.NEW.KOUN.TO.W.0012.250501T2140Z-250501T2215Z/``
+identifies one hazard event by office, phenomena, significance and event
+tracking number (ETN). ETNs restart every year, so the lifecycle key also
+carries the year. Each product advances that event's state via its action code.
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Tuple
+
+VTEC_PATTERN = re.compile(
+    r"/([OTEX])\.([A-Z]{3})\.([A-Z]{4})\.([A-Z]{2})\.([A-Z])\.(\d{4})\.(\d{6}T\d{4}Z)-(\d{6}T\d{4}Z)/")
+
+ACTION_NAMES = {"NEW": "New", "CON": "Continued", "EXT": "Extended (time)", "EXA": "Extended (area)",
+                "EXB": "Extended (time & area)", "UPG": "Upgraded", "CAN": "Cancelled", "EXP": "Expired",
+                "COR": "Corrected", "ROU": "Routine"}
+ENDING_ACTIONS = frozenset({"CAN", "EXP", "UPG"})
+CONTINUING_ACTIONS = frozenset({"CON", "EXT", "EXA", "EXB", "COR", "ROU"})
+
+VtecKey = Tuple[str, str, str, int, int]
+
+
+def _parse_vtec_time(value: str) -> Optional[datetime]:
+    if value.startswith("000000"):  # Event already in progress / until further notice
+        return None
+    return datetime.strptime(value, "%y%m%dT%H%MZ").replace(tzinfo=timezone.utc)
+
+
+class VtecCode(NamedTuple):
+    product_class: str
+    action: str
+    office: str
+    phenomena: str
+    significance: str
+    etn: int
+    begins: Optional[datetime]
+    ends: Optional[datetime]
+
+    def key(self, fallback_year: int) -> VtecKey:
+        """Lifecycle key; uses the begin year when known, else the product's issue year."""
+        year = self.begins.year if self.begins else fallback_year
+        return self.office, self.phenomena, self.significance, self.etn, year
+
+    @property
+    def action_name(self) -> str:
+        return ACTION_NAMES.get(self.action, self.action)
+
+
+def parse_vtec(values: List[str]) -> List[VtecCode]:
+    """Parses every operational P-VTEC string found in the given parameter values."""
+    codes = []
+    for value in values or ():
+        for m in VTEC_PATTERN.finditer(value):
+            if m.group(1) != "O":  # Skip test/experimental products
+                continue
+            codes.append(VtecCode(m.group(1), m.group(2), m.group(3), m.group(4), m.group(5), int(m.group(6)),
+                                  _parse_vtec_time(m.group(7)), _parse_vtec_time(m.group(8))))
+    return codes
+
+
+def next_state(current_state: Optional[str], action: str) -> Tuple[str, bool]:
+    """Returns ``(state, is_active)`` after applying an action to an event.
+
+    Ended events (CAN/EXP/UPG) stay ended, whatever comes after. A new event is
+    issued under a new ETN, so a NEW for an ended key is a stale product.
+    """
+    if current_state in ENDING_ACTIONS:
+        return current_state, False
+    if action in ENDING_ACTIONS:
+        return action, False
+    if action == "NEW" or action in CONTINUING_ACTIONS:
+        return action, True
+    return current_state or action, current_state not in ENDING_ACTIONS
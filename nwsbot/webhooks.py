@@ -0,0 +1,119 @@
+"""Webhook output: alert posts spread over a pool of bot-managed channel webhooks.
+
+Messages sent with the bot token share its global rate limit with command
+replies, role edits and DMs. A webhook execute request carries no bot
+authorization. Each webhook has its own rate-limit bucket, so alert throughput
+during an outbreak does not depend on command traffic.
+
+``WebhookPool`` paces each webhook locally at ``rate`` sends per ``per``
+seconds. Every send goes to the webhook that frees up first, so a burst is
+spread across the pool rather than queued behind one bucket. discord.py's
+webhook adapter still handles any 429 it gets. A webhook that answers 404 has
+been deleted. It is dropped from the pool and the send moves on to the next
+webhook. Once the pool is empty, ``send`` raises ``WebhookPoolEmpty`` and the
+caller posts with the bot token instead.
+
+Discord also limits each channel to about 30 webhook messages a minute
+however many webhooks it has. More webhooks smooth bursts, but they cannot
+go past that ceiling.
+
+discord is only imported once a request is made. Importing this module does
+not load it.
+"""
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import discord
+
+
+class WebhookPoolEmpty(RuntimeError):
+    pass
+
+
+class WebhookSlot:
+    __slots__ = ("webhook", "next_free", "sends")
+
+    def __init__(self, webhook: "discord.Webhook"):
+        self.webhook = webhook
+        self.next_free = 0.0
+        self.sends = 0
+
+    def reserve(self, now: float, spacing: float) -> float:
+        """Books this webhook's next send slot; returns how long to wait for it."""
+        start = max(now, self.next_free)
+        self.next_free = start + spacing
+        self.sends += 1
+        return start - now
+
+
+class WebhookPool:
+    def __init__(self, webhooks: Iterable["discord.Webhook"], rate: int = 5, per: float = 2.0,
+                 on_removed: Optional[Callable[["discord.Webhook"], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self._slots: Dict[int, WebhookSlot] = {webhook.id: WebhookSlot(webhook) for webhook in webhooks}
+        self.spacing = per / max(1, rate)
+        self._on_removed = on_removed
+        self._clock = clock
+
+    def _pick(self) -> WebhookSlot:
+        if not self._slots:
+            raise WebhookPoolEmpty("No webhooks left in the pool")
+        return min(self._slots.values(), key=lambda slot: (slot.next_free, slot.sends))
+
+    def remove(self, webhook_id: int) -> Optional["discord.Webhook"]:
+        slot = self._slots.pop(webhook_id, None)
+        if slot is None:
+            return None
+        logging.warning("Webhook %s was deleted; %d left in the pool", webhook_id, len(self._slots))
+        if self._on_removed:
+            self._on_removed(slot.webhook)
+        return slot.webhook
+
+    async def send(self, **kwargs) -> "discord.WebhookMessage":
+        """Executes on the next free webhook and waits for the created message (its ``webhook_id`` says which)."""
+        import discord
+        while True:
+            slot = self._pick()
+            delay = slot.reserve(self._clock(), self.spacing)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                return await slot.webhook.send(wait=True, **kwargs)
+            except discord.NotFound:
+                self.remove(slot.webhook.id)
+
+    async def edit(self, webhook_id: int, message_id: int, **kwargs) -> bool:
+        """Edits a message the pool posted; False when its webhook is gone (only the sender can edit it)."""
+        import discord
+        slot = self._slots.get(webhook_id)
+        if slot is None:
+            return False
+        delay = slot.reserve(self._clock(), self.spacing)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            await slot.webhook.edit_message(message_id, **kwargs)
+            return True
+        except discord.NotFound:
+            # Either the message or the webhook was deleted; only the latter takes it out of the pool
+            try:
+                await slot.webhook.fetch()
+            except discord.NotFound:
+                self.remove(webhook_id)
+            except discord.HTTPException:
+                pass
+            return False
+
+    def stats(self) -> List[Tuple[int, int]]:
+        """(webhook id, sends) per webhook in the pool."""
+        return [(webhook_id, slot.sends) for webhook_id, slot in self._slots.items()]
+
+    def __contains__(self, webhook_id: int) -> bool:
+        return webhook_id in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)